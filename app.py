@@ -3,11 +3,25 @@ CodeMentor - Using Google Gemini (Free!)
 """
 
 import streamlit as st
-import google.generativeai as genai
 import os
 from dotenv import load_dotenv
 import warnings
 import logging
+import uuid
+import threading
+from core.llm_handler import LLMHandler
+from core.session import SessionManager
+from core.review_cache import ReviewCache
+from core.semantic_cache import SemanticCache
+from core import model_registry
+from core.static_analysis import analyze_python, format_hints, HINTS_INSTRUCTION
+from core.sandbox import SandboxRunner
+from features.exercise_generator import ExerciseGenerator
+from features.exercise_bank import ExerciseBank
+from core.streaming import stream_metrics
+
+# Same model as RAGEngine's default, so both share one loaded instance
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
 
 # Suppress warnings and logging
 warnings.filterwarnings('ignore')
@@ -309,52 +323,116 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Configure Gemini with proper error handling
+@st.cache_resource
+def get_llm_handler():
+    """Initialize the shared LLM handler (Gemini unless LLM_PROVIDER says otherwise)"""
+    handler = LLMHandler(
+        provider=os.getenv('LLM_PROVIDER', 'gemini'),
+        temperature=0.7,
+        max_tokens=2048
+    )
+    # Import the provider SDK in the background instead of on the first click
+    threading.Thread(target=handler.provider.warmup, daemon=True).start()
+    return handler
+
+# Configure the LLM provider with proper error handling
 try:
-    GOOGLE_API_KEY = os.getenv('OPENAI_API_KEY')  # Your key is here
-    if not GOOGLE_API_KEY:
-        st.error("❌ API Key not found! Please check your .env file.")
-        st.stop()
-    
-    genai.configure(api_key=GOOGLE_API_KEY)
+    get_llm_handler()
+except ValueError as e:
+    st.error(f"❌ API Key not found! Please check your .env file. ({str(e)})")
+    st.stop()
 except Exception as e:
     st.error(f"❌ Configuration error: {str(e)}")
     st.stop()
 
 @st.cache_resource
-def get_model():
-    """Initialize Gemini model - using the latest free model"""
-    try:
-        # gemini-2.0-flash-exp is the latest free model as of Oct 2024
-        return genai.GenerativeModel('gemini-2.0-flash-exp')
-    except:
-        # Fallback to stable version
-        return genai.GenerativeModel('gemini-2.0-flash')
-
-def generate_response(prompt):
-    """Generate AI response with error handling"""
+def get_session_manager():
+    """Conversation history for follow-up questions, shared across reruns"""
+    return SessionManager(get_llm_handler(), store_path="./data/cache/sessions.sqlite3")
+
+@st.cache_resource
+def get_semantic_cache():
+    """Answers to near-duplicate first questions; None when embeddings are unavailable"""
     try:
-        model = get_model()
-        response = model.generate_content(
-            prompt,
-            generation_config=genai.types.GenerationConfig(
-                temperature=0.7,
-                top_p=0.95,
-                top_k=40,
-                max_output_tokens=2048,
-            )
-        )
-        return response.text
+        model = model_registry.get_embedding_model(EMBEDDING_MODEL)
     except Exception as e:
-        error_msg = str(e)
-        if "API key" in error_msg:
-            return "❌ **API Key Error:** Your API key seems invalid. Please check your .env file."
-        elif "quota" in error_msg.lower():
-            return "❌ **Quota Exceeded:** You've reached your API limit. Try again later."
-        elif "not found" in error_msg.lower():
-            return f"❌ **Model Error:** The model couldn't be found. Error: {error_msg}"
-        else:
-            return f"❌ **Error:** {error_msg}\n\n💡 Try refreshing the page or checking your internet connection."
+        print(f"Semantic cache disabled: {str(e)}")
+        return None
+    return SemanticCache(model, cache_path="./data/cache/ask_cache.sqlite3")
+
+# Load the embedding model in the background instead of on the first question
+model_registry.registry.prewarm([model_registry.embedding_model_key(EMBEDDING_MODEL)])
+
+@st.cache_resource
+def get_review_cache():
+    """Reviews keyed on normalized code, so reformatted resubmissions are free"""
+    return ReviewCache()
+
+@st.cache_resource
+def get_exercise_generator():
+    """Python exercises are checked in a sandbox before they are shown"""
+    return ExerciseGenerator(get_llm_handler(), runner=SandboxRunner())
+
+@st.cache_resource
+def get_exercise_bank():
+    """Ready-made exercises for popular topics, refilled in the background"""
+    bank = ExerciseBank(get_exercise_generator())
+    bank.prewarm()
+    return bank
+
+def render_exercise(exercise):
+    """Render a structured (verified) exercise"""
+    st.markdown(f"#### 📋 Problem\n{exercise['problem_statement']}")
+    for requirement in exercise['requirements']:
+        st.markdown(f"- {requirement}")
+    if exercise['examples']:
+        st.markdown("#### 📥 Examples")
+        for example in exercise['examples']:
+            st.markdown(f"`{example.get('input', '')}` → `{example.get('output', '')}`")
+    with st.expander("💡 Hints"):
+        for i, hint in enumerate(exercise['hints'], start=1):
+            st.markdown(f"{i}. {hint}")
+    with st.expander("🧪 Test cases"):
+        st.code(exercise['test_cases'], language="python")
+    with st.expander("✅ Solution"):
+        st.code(exercise['solution'], language="python")
+        st.markdown(exercise['explanation'])
+    if exercise.get('verified'):
+        st.caption(f"✔️ Solution passes all {exercise['verification']['n_tests']} test cases")
+    elif 'verification' in exercise:
+        st.caption("⚠️ This exercise could not be fully verified; its tests may contain mistakes")
+
+def format_error(e):
+    """Turn a generation error into a user-facing message"""
+    error_msg = str(e)
+    if "API key" in error_msg:
+        return "❌ **API Key Error:** Your API key seems invalid. Please check your .env file."
+    elif "quota" in error_msg.lower():
+        return "❌ **Quota Exceeded:** You've reached your API limit. Try again later."
+    elif "not found" in error_msg.lower():
+        return f"❌ **Model Error:** The model couldn't be found. Error: {error_msg}"
+    else:
+        return f"❌ **Error:** {error_msg}\n\n💡 Try refreshing the page or checking your internet connection."
+
+def render_stream(prompt, label, messages=None):
+    """Render a streamed response into the page and record time-to-first-token"""
+    if messages is not None:
+        stream = get_llm_handler().chat_streaming(messages, label=label)
+    else:
+        stream = get_llm_handler().generate_streaming(prompt, label=label)
+    
+    def chunks():
+        try:
+            yield from stream
+        except Exception as e:
+            yield format_error(e)
+    
+    text = st.write_stream(chunks())
+    
+    ttft = stream.metrics.get('ttft')
+    if ttft is not None:
+        st.caption(f"⚡ First token in {ttft:.2f}s · complete in {stream.metrics['total_time']:.2f}s")
+    return text
 
 # Header
 st.title("🎓 CodeMentor AI")
@@ -420,6 +498,30 @@ with st.sidebar:
         <p>🔒 100% free to use</p>
     </div>
     """, unsafe_allow_html=True)
+    
+    latency = stream_metrics.summary()
+    if latency['requests']:
+        st.caption(f"⚡ Time to first token: p50 {latency['ttft_p50']:.2f}s · "
+                   f"p95 {latency['ttft_p95']:.2f}s ({latency['requests']} requests)")
+    
+    bank_stats = get_exercise_bank().get_stats()
+    if bank_stats['requests']:
+        st.caption(f"📚 Exercise bank hit rate: {bank_stats['hit_rate']:.0%} · "
+                   f"{bank_stats['exercises']} ready · {bank_stats['queue_depth']} refilling")
+    
+    # Don't wait for the embedding model just to render the sidebar
+    embedding_ready = model_registry.registry.is_loaded(model_registry.embedding_model_key(EMBEDDING_MODEL))
+    answer_cache = get_semantic_cache() if embedding_ready else None
+    if answer_cache is not None:
+        answer_stats = answer_cache.get_stats()
+        if answer_stats['hits'] + answer_stats['misses']:
+            st.caption(f"♻️ Answer cache hit rate: {answer_stats['hit_rate']:.0%} "
+                       f"({answer_stats['entries']} answers stored)")
+    
+    review_stats = get_review_cache().get_stats()
+    if review_stats['hits'] + review_stats['misses']:
+        st.caption(f"♻️ Review cache hit rate: {review_stats['hit_rate']:.0%} "
+                   f"({review_stats['entries']} reviews stored)")
 
 # Main Content Area
 if feature == "💬 Ask Questions":
@@ -433,6 +535,20 @@ if feature == "💬 Ask Questions":
         help="Be specific for better answers"
     )
     
+    # Follow-up questions continue the same conversation until reset
+    sessions = get_session_manager()
+    session_id = st.session_state.setdefault('session_id', str(uuid.uuid4()))
+    session = sessions.get_session(session_id)
+    if session.turn_count:
+        col_info, col_reset = st.columns([3, 1])
+        with col_info:
+            st.caption(f"🧵 Continuing your conversation ({session.turn_count} earlier questions)")
+        with col_reset:
+            if st.button("🆕 New conversation"):
+                sessions.reset_session(session_id)
+                st.session_state['session_id'] = str(uuid.uuid4())
+                st.rerun()
+    
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
         if st.button("🚀 Get Answer", use_container_width=True):
@@ -452,11 +568,30 @@ Please provide a comprehensive answer that includes:
 
 Format your response with proper markdown for excellent readability. Use code blocks with syntax highlighting."""
 
-                    answer = generate_response(prompt)
-                    
                     st.markdown("---")
                     st.markdown("### 📚 Your Answer")
-                    st.markdown(answer)
+                    # Follow-ups depend on the conversation, so only first
+                    # questions are served from (and stored in) the cache.
+                    # No documentation is retrieved here, hence n_context_docs=0.
+                    cache = get_semantic_cache() if not session.turn_count else None
+                    cached = cache.lookup(question, language, user_level, 0) if cache else None
+                    if cached is not None:
+                        answer = cached['answer']
+                        st.markdown(answer)
+                        st.caption(f"♻️ Answered from cache (similarity {cached['cache_similarity']:.2f})")
+                        sessions.record_turn(session, question, answer)
+                    else:
+                        messages = sessions.build_messages(session, prompt)
+                        answer = render_stream(prompt, "ask", messages=messages)
+                        if isinstance(answer, str) and not answer.startswith("❌"):
+                            sessions.record_turn(session, question, answer)
+                            if cache is not None:
+                                cache.store(question, language, user_level, 0, {
+                                    'answer': answer,
+                                    'sources': [],
+                                    'language': language,
+                                    'level': user_level
+                                })
                     
                     # Feedback buttons
                     col_a, col_b, col_c = st.columns([1, 1, 2])
@@ -503,11 +638,30 @@ Please provide a comprehensive code review with:
 
 Be constructive, educational, and provide specific examples. Use proper markdown formatting."""
 
-                    review = generate_response(prompt)
-                    
+                    # Instant local findings, also handed to the model as hints
+                    analysis = analyze_python(code) if language == "Python" else None
+                    if analysis is not None:
+                        prompt += f"\n\n{format_hints(analysis)}\n\n{HINTS_INSTRUCTION}"
+
                     st.markdown("---")
+                    if analysis is not None:
+                        st.markdown(f"### 🧪 Static Analysis · score {analysis['quality_score']}/100")
+                        for finding in analysis['findings']:
+                            icon = {'error': '❌', 'warning': '⚠️'}.get(finding['severity'], 'ℹ️')
+                            st.markdown(f"{icon} **Line {finding['line']}** · {finding['message']}")
+                        if not analysis['findings']:
+                            st.success("No issues found by static analysis")
+                        st.caption(f"Analyzed in {analysis['elapsed_ms']:.1f} ms")
                     st.markdown("### 📋 Code Review Results")
-                    st.markdown(review)
+                    review_cache = get_review_cache()
+                    cached = review_cache.lookup(code, language, "app", user_level)
+                    if cached is not None:
+                        st.markdown(cached['review'])
+                        st.caption("♻️ Same code as an earlier submission (ignoring formatting and comments)")
+                    else:
+                        review = render_stream(prompt, "code_review")
+                        if isinstance(review, str) and not review.startswith("❌"):
+                            review_cache.store(code, language, "app", user_level, {'review': review})
             else:
                 st.warning("⚠️ Please paste your code first!")
 
@@ -547,11 +701,18 @@ Structure the exercise as follows:
 
 Make it educational, engaging, and appropriately challenging. Use proper markdown formatting with code blocks."""
 
-                    exercise = generate_response(prompt)
-                    
                     st.markdown("---")
                     st.markdown("### 🎯 Your Coding Exercise")
-                    st.markdown(exercise)
+                    exercise = None
+                    if language == "Python":
+                        exercise = get_exercise_bank().get_exercise(
+                            topic, language=language, difficulty=difficulty, level=user_level,
+                            user_id=st.session_state.setdefault('session_id', str(uuid.uuid4()))
+                        )
+                    if exercise is not None and 'verification' in exercise:
+                        render_exercise(exercise)
+                    else:
+                        render_stream(prompt, "exercise")
                     
                     st.markdown("---")
                     st.info("💡 **Tip:** Try solving it yourself first before looking at the solution!")
@@ -612,11 +773,9 @@ Please provide detailed debugging help:
 
 Be clear, educational, and thorough. Use proper markdown formatting with code blocks."""
 
-                    debug_help = generate_response(prompt)
-                    
                     st.markdown("---")
                     st.markdown("### 🔧 Debug Analysis & Solution")
-                    st.markdown(debug_help)
+                    render_stream(prompt, "debug")
             else:
                 st.warning("⚠️ Please paste your buggy code first!")
 
@@ -0,0 +1,181 @@
+"""
+BM25 Index - Incrementally maintained lexical index for hybrid retrieval
+"""
+
+import os
+import re
+import json
+import math
+import sqlite3
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+_CAMEL_PART = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Code-aware tokenizer
+
+    Identifiers are kept whole (so `ZeroDivisionError` matches exactly) and
+    also split into their camelCase / snake_case parts, so `division error`
+    still finds them. Punctuation such as `append(x)` or `async/await`
+    splits into its identifiers.
+    """
+    tokens = []
+    for identifier in _IDENTIFIER.findall(text):
+        lowered = identifier.lower()
+        tokens.append(lowered)
+        parts = [p.lower() for piece in identifier.split('_') for p in _CAMEL_PART.findall(piece)]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class BM25Index:
+    """
+    In-memory Okapi BM25 index over chunk IDs.
+
+    Documents can be added and removed one at a time; collection statistics
+    (document frequencies, average length) are kept up to date incrementally,
+    so nothing has to be rebuilt when the corpus changes. With a store_path,
+    each document's term counts are written through to SQLite and loaded
+    back on start, so a restart does not re-read and re-tokenize the corpus.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, store_path: Optional[str] = None):
+        """
+        Initialize BM25 Index
+
+        Args:
+            k1: Term frequency saturation
+            b: Document length normalization
+            store_path: Optional SQLite file persisting the indexed terms
+        """
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_terms: Dict[str, Counter] = {}
+        self._doc_lengths: Dict[str, int] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+        self._conn = None
+        if store_path:
+            directory = os.path.dirname(store_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(store_path, check_same_thread=False)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS terms (doc_id TEXT PRIMARY KEY, terms TEXT NOT NULL)")
+            self._conn.commit()
+            for doc_id, terms in self._conn.execute("SELECT doc_id, terms FROM terms"):
+                self._add_locked(doc_id, Counter(json.loads(terms)))
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_lengths
+
+    def add(self, doc_id: str, text: str):
+        """Index one document (re-adding an ID replaces it)"""
+        self.add_many([(doc_id, text)])
+
+    def add_many(self, documents: Iterable[Tuple[str, str]]):
+        """Index (doc_id, text) pairs, persisting them in one transaction"""
+        tokenized = [(doc_id, Counter(tokenize(text or ""))) for doc_id, text in documents]
+        with self._lock:
+            for doc_id, terms in tokenized:
+                self._add_locked(doc_id, terms)
+            if self._conn is not None:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO terms (doc_id, terms) VALUES (?, ?)",
+                    [(doc_id, json.dumps(terms)) for doc_id, terms in tokenized]
+                )
+                self._conn.commit()
+
+    def _add_locked(self, doc_id: str, terms: Counter):
+        if doc_id in self._doc_lengths:
+            self._remove_locked(doc_id)
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+        self._doc_terms[doc_id] = terms
+        length = sum(terms.values())
+        self._doc_lengths[doc_id] = length
+        self._total_length += length
+
+    def remove(self, doc_id: str):
+        """Drop one document from the index"""
+        self.remove_many([doc_id])
+
+    def remove_many(self, doc_ids: Iterable[str]):
+        """Drop documents from the index"""
+        doc_ids = list(doc_ids)
+        with self._lock:
+            for doc_id in doc_ids:
+                if doc_id in self._doc_lengths:
+                    self._remove_locked(doc_id)
+            if self._conn is not None:
+                self._conn.executemany("DELETE FROM terms WHERE doc_id = ?", [(doc_id,) for doc_id in doc_ids])
+                self._conn.commit()
+
+    def clear(self):
+        """Drop every document (and the persisted terms)"""
+        with self._lock:
+            self._postings.clear()
+            self._doc_terms.clear()
+            self._doc_lengths.clear()
+            self._total_length = 0
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM terms")
+                self._conn.commit()
+
+    def _remove_locked(self, doc_id: str):
+        for term in self._doc_terms.pop(doc_id):
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(doc_id)
+
+    def search(self, query: str, n_results: int = 10,
+               candidate_ids: Optional[Set[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Score documents against a query
+
+        Args:
+            query: Query text
+            n_results: Number of results to return
+            candidate_ids: Optional set restricting which documents may match
+
+        Returns:
+            (doc_id, score) pairs, best first
+        """
+        query_terms = set(tokenize(query))
+        scores: Dict[str, float] = {}
+
+        with self._lock:
+            n_docs = len(self._doc_lengths)
+            if not n_docs or not query_terms:
+                return []
+            avg_length = self._total_length / n_docs
+
+            for term in query_terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    if candidate_ids is not None and doc_id not in candidate_ids:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return sorted(scores.items(), key=lambda item: -item[1])[:n_results]
+
+    def search_many(self, queries: Iterable[str], n_results: int = 10,
+                    candidate_ids: Optional[Set[str]] = None) -> List[List[Tuple[str, float]]]:
+        """Score several queries against the index"""
+        return [self.search(query, n_results, candidate_ids) for query in queries]
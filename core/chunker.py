@@ -0,0 +1,313 @@
+"""
+Chunker - Structure-aware, token-sized streaming document chunker
+"""
+
+import re
+from typing import Callable, Dict, Iterable, Iterator, List, Any, Optional, Tuple
+
+from core.model_registry import get_module
+
+_FENCE = re.compile(r"^\s*(```+|~~~+)\s*([\w+-]*)")
+_MD_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_RST_UNDERLINE = re.compile(r"^([=\-~^\"'`#*+]){3,}\s*$")
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+
+# RST has no fixed heading levels; these are the conventional ones
+_RST_LEVELS = {'=': 1, '-': 2, '~': 3, '^': 4, '"': 5}
+
+
+class _Block:
+    """A paragraph, code block or heading together with its token count"""
+
+    __slots__ = ('kind', 'text', 'tokens', 'fence', 'level')
+
+    def __init__(self, kind: str, text: str, tokens: int, fence: str = "", level: int = 0):
+        self.kind = kind
+        self.text = text
+        self.tokens = tokens
+        self.fence = fence
+        self.level = level
+
+
+class StructuredChunker:
+    """
+    Splits Markdown / reStructuredText / plain text into token-sized chunks.
+
+    Input is consumed line by line, so arbitrarily large files are chunked
+    in constant memory and chunks are yielded as soon as they are complete.
+    Fenced code blocks are never split mid-line (an oversized block is cut
+    at line boundaries and every piece is re-fenced), headings start new
+    chunks once the current chunk is big enough, and every chunk records
+    its heading path. Consecutive chunks of one section share up to
+    overlap_tokens of trailing paragraphs.
+    """
+
+    def __init__(self,
+                 max_tokens: int = 256,
+                 overlap_tokens: int = 32,
+                 min_tokens: Optional[int] = None,
+                 count_tokens: Optional[Callable[[str], int]] = None):
+        """
+        Initialize Structured Chunker
+
+        Args:
+            max_tokens: Upper bound on tokens per chunk
+            overlap_tokens: Trailing tokens repeated at the start of the next
+                chunk of the same section (0 disables overlap)
+            min_tokens: A heading only closes the current chunk once it has
+                at least this many tokens (default max_tokens // 4)
+            count_tokens: Tokenizer (defaults to tiktoken cl100k_base)
+        """
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens must be smaller than max_tokens")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.min_tokens = max_tokens // 4 if min_tokens is None else min_tokens
+        self._count_tokens = count_tokens
+        self._encoding = None
+
+    def count_tokens(self, text: str) -> int:
+        if self._count_tokens is not None:
+            return self._count_tokens(text)
+        if self._encoding is None:
+            self._encoding = get_module('tiktoken').get_encoding("cl100k_base")
+        return len(self._encoding.encode_ordinary(text))
+
+    def _blocks(self, lines: Iterable[str]) -> Iterator[_Block]:
+        """Group lines into headings, fenced code blocks and paragraphs"""
+        paragraph: List[str] = []
+        code: List[str] = []
+        fence = ""
+
+        def paragraph_block() -> Optional[_Block]:
+            if not paragraph:
+                return None
+            # Lines keep their indentation (unfenced code, RST literal blocks)
+            text = "\n".join(paragraph).rstrip()
+            paragraph.clear()
+            return _Block('text', text, self.count_tokens(text)) if text else None
+
+        for raw_line in lines:
+            line = raw_line.rstrip("\r\n")
+
+            if fence:
+                code.append(line)
+                if line.strip().startswith(fence) and len(code) > 1:
+                    text = "\n".join(code)
+                    yield _Block('code', text, self.count_tokens(text), fence=code[0].strip())
+                    code = []
+                    fence = ""
+                continue
+
+            fence_match = _FENCE.match(line)
+            if fence_match:
+                block = paragraph_block()
+                if block:
+                    yield block
+                fence = fence_match.group(1)
+                code = [line]
+                continue
+
+            heading = _MD_HEADING.match(line)
+            if heading:
+                block = paragraph_block()
+                if block:
+                    yield block
+                yield _Block('heading', line.strip(), self.count_tokens(line), level=len(heading.group(1)))
+                continue
+
+            # RST heading: a single text line underlined with punctuation
+            if (len(paragraph) == 1 and _RST_UNDERLINE.match(line)
+                    and len(line.strip()) >= len(paragraph[0].strip()) > 0):
+                title = paragraph.pop().strip()
+                text = f"{title}\n{line.strip()}"
+                yield _Block('heading', text, self.count_tokens(text),
+                             level=_RST_LEVELS.get(line.strip()[0], 6))
+                continue
+
+            if line.strip():
+                paragraph.append(line)
+            else:
+                block = paragraph_block()
+                if block:
+                    yield block
+
+        if code:
+            # Unterminated fence at end of input: keep it as code
+            text = "\n".join(code)
+            yield _Block('code', text, self.count_tokens(text), fence=code[0].strip())
+        block = paragraph_block()
+        if block:
+            yield block
+
+    def _split_block(self, block: _Block, budget: int) -> Iterator[_Block]:
+        """Cut a block larger than budget tokens into pieces that fit"""
+        if block.kind == 'code':
+            lines = block.text.split("\n")
+            opening = lines[0]
+            closing = lines[-1] if len(lines) > 1 and lines[-1].strip().startswith(block.fence[:3]) else None
+            body = lines[1:-1] if closing else lines[1:]
+            closing = closing or block.fence[:3]
+            # Leave room for the re-added fence lines
+            pieces = self._pack_units(body, budget - self.count_tokens(f"{opening}\n{closing}") - 1, "\n")
+            for piece in pieces:
+                text = f"{opening}\n{piece}\n{closing}"
+                yield _Block('code', text, self.count_tokens(text), fence=block.fence)
+            return
+
+        units = _SENTENCE_BOUNDARY.split(block.text)
+        for piece in self._pack_units(units, budget, " "):
+            yield _Block('text', piece, self.count_tokens(piece))
+
+    def _pack_units(self, units: List[str], budget: int, joiner: str) -> List[str]:
+        """Greedily join units (lines or sentences) into pieces of at most budget tokens"""
+        budget = max(budget, 1)
+        pieces: List[str] = []
+        current: List[str] = []
+        used = 0
+        for unit in units:
+            tokens = self.count_tokens(unit) + 1
+            if tokens > budget:
+                # A single unit larger than the budget: split it by words, or
+                # by characters as a last resort
+                if current:
+                    pieces.append(joiner.join(current))
+                    current, used = [], 0
+                words = unit.split(" ")
+                if len(words) > 1:
+                    pieces.extend(self._pack_units(words, budget, " "))
+                else:
+                    step = max(1, len(unit) * budget // tokens)
+                    pieces.extend(unit[i:i + step] for i in range(0, len(unit), step))
+                continue
+            if used + tokens > budget and current:
+                pieces.append(joiner.join(current))
+                current, used = [], 0
+            current.append(unit)
+            used += tokens
+        if current:
+            pieces.append(joiner.join(current))
+        return pieces
+
+    def chunk_lines(self, lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """
+        Chunk a stream of lines
+
+        Args:
+            lines: Any iterable of lines, e.g. an open file
+
+        Yields:
+            {'text', 'section', 'tokens'} per chunk, in document order
+        """
+        headings: List[Tuple[int, str]] = []
+        current: List[_Block] = []
+        used = 0
+        section = ""
+
+        def emit() -> Optional[Dict[str, Any]]:
+            if not any(block.kind != 'heading' for block in current):
+                return None
+            return {
+                'text': "\n\n".join(block.text for block in current),
+                'section': section,
+                'tokens': used
+            }
+
+        def overlap_tail() -> List[_Block]:
+            tail: List[_Block] = []
+            budget = self.overlap_tokens
+            for block in reversed(current):
+                if block.kind != 'text':
+                    break
+                if block.tokens > budget:
+                    # Carry over the trailing sentences of a long paragraph
+                    sentences: List[str] = []
+                    for sentence in reversed(_SENTENCE_BOUNDARY.split(block.text)):
+                        tokens = self.count_tokens(sentence) + 1
+                        if tokens > budget:
+                            break
+                        sentences.insert(0, sentence)
+                        budget -= tokens
+                    if sentences:
+                        text = " ".join(sentences)
+                        tail.insert(0, _Block('text', text, self.count_tokens(text)))
+                    break
+                tail.insert(0, block)
+                budget -= block.tokens
+            return tail
+
+        for block in self._blocks(lines):
+            if block.kind == 'heading':
+                if used >= self.min_tokens:
+                    chunk = emit()
+                    if chunk:
+                        yield chunk
+                    current, used = [], 0
+                while headings and headings[-1][0] >= block.level:
+                    headings.pop()
+                headings.append((block.level, block.text.split("\n")[0].lstrip("#").strip()))
+                if not current:
+                    section = " > ".join(title for _, title in headings)
+                current.append(block)
+                used += block.tokens
+                continue
+
+            # Headings waiting for content count against the first piece
+            budget = self.max_tokens - (used if all(b.kind == 'heading' for b in current) else 0)
+            pieces = [block] if block.tokens <= budget else list(self._split_block(block, budget))
+            for piece in pieces:
+                if used + piece.tokens > self.max_tokens and current:
+                    chunk = emit()
+                    if chunk:
+                        yield chunk
+                    current = overlap_tail()
+                    used = sum(b.tokens for b in current)
+                    if used + piece.tokens > self.max_tokens:
+                        current, used = [], 0
+                    section = " > ".join(title for _, title in headings)
+                current.append(piece)
+                used += piece.tokens
+
+        chunk = emit()
+        if chunk:
+            yield chunk
+
+    def chunk_text(self, text: str) -> Iterator[Dict[str, Any]]:
+        """Chunk an in-memory string"""
+        return self.chunk_lines(text.splitlines())
+
+    def chunk_file(self, path: str, encoding: str = 'utf-8') -> Iterator[Dict[str, Any]]:
+        """Chunk a file without reading it into memory"""
+        with open(path, 'r', encoding=encoding, errors='replace') as f:
+            yield from self.chunk_lines(f)
+
+    def chunk_document(self, doc: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        Chunk a {'text', 'metadata'} document into RAGEngine-ready chunks
+
+        Each chunk keeps the document metadata plus 'chunk' (1-based index)
+        and, when it falls under a heading, 'section'. A document that fits
+        in one chunk is passed through byte-for-byte (text and metadata), so
+        its chunk ID is the same as before chunking was introduced.
+        """
+        metadata = doc.get('metadata', {})
+        chunks = self.chunk_text(doc['text'])
+        first = next(chunks, None)
+        if first is None:
+            return
+        second = next(chunks, None)
+        if second is None:
+            yield {'text': doc['text'], 'metadata': dict(metadata)}
+            return
+
+        for i, chunk in enumerate(self._chain(first, second, chunks)):
+            chunk_metadata = {**metadata, 'chunk': i + 1}
+            if chunk['section']:
+                chunk_metadata['section'] = chunk['section']
+            yield {'text': chunk['text'], 'metadata': chunk_metadata}
+
+    @staticmethod
+    def _chain(*heads_and_rest) -> Iterator[Dict[str, Any]]:
+        *heads, rest = heads_and_rest
+        yield from heads
+        yield from rest
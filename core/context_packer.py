@@ -0,0 +1,145 @@
+"""
+Context Packer - Fit retrieved chunks into a prompt token budget
+"""
+
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Any, Optional, Set
+
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?:])\s+|\n{2,}")
+_WORD = re.compile(r"\w+")
+
+
+class ContextPacker:
+    """
+    Packs the most relevant chunks into a token budget.
+
+    Chunks are taken in the order given (best first, as retrieval, fusion
+    or reranking ranked them), near-duplicates of already packed
+    chunks are dropped, and the first chunk that does not fit is trimmed at
+    a sentence boundary. Token counts are cached per chunk ID so repeated
+    retrievals of the same chunk are not re-tokenized.
+    """
+
+    def __init__(self,
+                 count_tokens: Callable[[str], int],
+                 token_budget: int = 1500,
+                 duplicate_threshold: float = 0.8,
+                 separator_tokens: int = 6,
+                 min_tail_tokens: int = 40,
+                 max_cached_counts: int = 50000):
+        """
+        Initialize Context Packer
+
+        Args:
+            count_tokens: Tokenizer function (e.g. LLMHandler.count_tokens)
+            token_budget: Default token budget for packed context
+            duplicate_threshold: Shingle Jaccard similarity above which a
+                chunk counts as a near-duplicate
+            separator_tokens: Tokens reserved per chunk for numbering/separators
+            min_tail_tokens: Smallest remaining budget worth trimming a chunk into
+            max_cached_counts: Maximum cached token counts (LRU)
+        """
+        self.count_tokens = count_tokens
+        self.token_budget = token_budget
+        self.duplicate_threshold = duplicate_threshold
+        self.separator_tokens = separator_tokens
+        self.min_tail_tokens = min_tail_tokens
+        self.max_cached_counts = max_cached_counts
+
+        self._token_counts: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _chunk_key(doc: Dict[str, Any]) -> str:
+        if doc.get('id'):
+            return doc['id']
+        return hashlib.sha1(doc['content'].encode('utf-8')).hexdigest()
+
+    def token_count(self, doc: Dict[str, Any]) -> int:
+        """Token count of a chunk, cached by chunk ID"""
+        key = self._chunk_key(doc)
+        with self._lock:
+            count = self._token_counts.get(key)
+            if count is not None:
+                self._token_counts.move_to_end(key)
+                return count
+
+        count = self.count_tokens(doc['content'])
+        with self._lock:
+            self._token_counts[key] = count
+            while len(self._token_counts) > self.max_cached_counts:
+                self._token_counts.popitem(last=False)
+        return count
+
+    @staticmethod
+    def _shingles(text: str, size: int = 3) -> Set[tuple]:
+        words = _WORD.findall(text.lower())
+        if len(words) < size:
+            return {tuple(words)}
+        return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+    def _is_duplicate(self, shingles: Set[tuple], packed_shingles: List[Set[tuple]]) -> bool:
+        for other in packed_shingles:
+            union = len(shingles | other)
+            if union and len(shingles & other) / union >= self.duplicate_threshold:
+                return True
+        return False
+
+    def _trim(self, text: str, budget: int) -> str:
+        """Keep the leading whole sentences of text that fit in budget tokens"""
+        boundaries = list(_SENTENCE_BOUNDARY.finditer(text))
+        cut = 0
+        used = 0
+        start = 0
+        for match in boundaries + [None]:
+            end = match.start() if match else len(text)
+            used += self.count_tokens(text[start:end]) + 1
+            if used > budget:
+                break
+            cut = end
+            start = match.end() if match else len(text)
+        return text[:cut].rstrip()
+
+    def pack(self, docs: List[Dict[str, Any]], token_budget: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Select and trim chunks to fit the token budget
+
+        Args:
+            docs: Retrieved chunks with 'content' and optionally 'id', best
+                first. The order is kept: 'relevance' is a dense similarity
+                and would undo hybrid fusion or reranking.
+            token_budget: Override the default budget
+
+        Returns:
+            Packed chunks (copies) in input order; a trimmed chunk is
+            marked with 'truncated': True
+        """
+        budget = self.token_budget if token_budget is None else token_budget
+
+        packed: List[Dict[str, Any]] = []
+        packed_shingles: List[Set[tuple]] = []
+        remaining = budget
+
+        for doc in docs:
+            shingles = self._shingles(doc['content'])
+            if self._is_duplicate(shingles, packed_shingles):
+                continue
+
+            cost = self.token_count(doc) + self.separator_tokens
+            if cost <= remaining:
+                packed.append(dict(doc))
+                packed_shingles.append(shingles)
+                remaining -= cost
+                continue
+
+            tail_budget = remaining - self.separator_tokens
+            if tail_budget >= self.min_tail_tokens:
+                trimmed = self._trim(doc['content'], tail_budget)
+                if trimmed:
+                    packed.append({**doc, 'content': trimmed, 'truncated': True})
+            break
+
+        return packed
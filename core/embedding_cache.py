@@ -0,0 +1,258 @@
+"""
+Embedding Cache - Persistent memoization of SentenceTransformer encodes
+"""
+
+import os
+import re
+import json
+import time
+import atexit
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Any, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def _try_lock(lock_file) -> bool:
+    """Take a non-blocking exclusive lock on an open file (held until it is closed)"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache keyed by (model name, text hash).
+
+    Vectors live in a memory-mapped float32 matrix with a fixed number of
+    rows; a hash -> row index (kept in LRU order) is persisted alongside it.
+    New vectors are persisted every flush_every inserts, every
+    flush_interval seconds and at exit, not on every miss. When the matrix
+    is full, the least recently used rows are reused, but only after an
+    index that no longer references them is on disk.
+
+    Each cache directory has a single writer: the first process to lock it
+    owns the files. Other processes would keep their own row allocation
+    over the same matrix and hand out each other's vectors, so they fall
+    back to an in-memory cache of memory_entries rows instead. Within a
+    process, share one instance per directory (model_registry.get_embedding_cache).
+    """
+
+    def __init__(self,
+                 model_name: str,
+                 cache_dir: str = "./data/cache/embeddings",
+                 max_entries: int = 200000,
+                 flush_every: int = 1024,
+                 flush_interval: float = 30.0,
+                 memory_entries: int = 10000):
+        """
+        Initialize Embedding Cache
+
+        Args:
+            model_name: Embedding model the vectors belong to
+            cache_dir: Root directory for cache files
+            max_entries: Maximum number of cached vectors (matrix rows)
+            flush_every: Persist after this many new vectors
+            flush_interval: Persist new vectors at least this often (seconds)
+            memory_entries: Capacity of the in-memory fallback used when
+                another process owns the directory
+        """
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.flush_every = max(flush_every, 1)
+        self.flush_interval = flush_interval
+        self.directory = os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.-]", "_", model_name))
+        self.vectors_path = os.path.join(self.directory, "vectors.f32")
+        self.index_path = os.path.join(self.directory, "index.json")
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock_file = open(os.path.join(self.directory, "owner.lock"), 'a+')
+        self.owner = _try_lock(self._lock_file)
+        if not self.owner:
+            print(f"Embedding cache {self.directory} is in use by another process; caching in memory only")
+            self._lock_file.close()
+            self.max_entries = memory_entries
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._rows: "OrderedDict[str, int]" = OrderedDict()
+        self._free_rows: List[int] = []
+        self._matrix: Optional[np.memmap] = None
+        self._dim: Optional[int] = None
+        self._dirty = False
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+        self._load()
+        atexit.register(self.flush)
+
+    def _load(self):
+        """Load the persisted index and map the vector matrix"""
+        if not self.owner or not os.path.exists(self.index_path) or not os.path.exists(self.vectors_path):
+            return
+
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+
+        if index.get('model') != self.model_name or index.get('capacity') != self.max_entries:
+            # Incompatible layout: start over rather than misread rows
+            return
+
+        self._dim = index['dim']
+        self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode='r+',
+                                 shape=(self.max_entries, self._dim))
+        for text_hash, row in index['entries']:
+            self._rows[text_hash] = row
+        used = set(self._rows.values())
+        self._free_rows = [row for row in range(self.max_entries - 1, -1, -1) if row not in used]
+
+    def _allocate(self, dim: int):
+        """Create the memory-mapped matrix (in-memory one if not the owner) on first write"""
+        self._dim = dim
+        if self.owner:
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode='w+',
+                                     shape=(self.max_entries, dim))
+        else:
+            self._matrix = np.zeros((self.max_entries, dim), dtype=np.float32)
+        self._free_rows = list(range(self.max_entries - 1, -1, -1))
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def _take_row(self) -> int:
+        if not self._free_rows:
+            # Evict a batch and persist the index first: a row overwritten
+            # while the on-disk index still maps its old hash would return
+            # the wrong vector after a crash
+            for _ in range(min(self.flush_every, len(self._rows))):
+                _, row = self._rows.popitem(last=False)
+                self._free_rows.append(row)
+                self.evictions += 1
+            self._dirty = True
+            self._write()
+        return self._free_rows.pop()
+
+    def encode(self, texts: List[str], encode_fn: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Encode texts, running encode_fn only for texts not already cached
+
+        Args:
+            texts: Texts to embed
+            encode_fn: Batch encoder returning an (n, dim) array
+
+        Returns:
+            float32 array of shape (len(texts), dim)
+        """
+        hashes = [self.text_hash(text) for text in texts]
+        result: List[Optional[np.ndarray]] = [None] * len(texts)
+        missing: Dict[str, List[int]] = {}
+
+        with self._lock:
+            for i, text_hash in enumerate(hashes):
+                row = self._rows.get(text_hash)
+                if row is None:
+                    missing.setdefault(text_hash, []).append(i)
+                else:
+                    self._rows.move_to_end(text_hash)
+                    result[i] = np.array(self._matrix[row])
+            n_missing = sum(len(positions) for positions in missing.values())
+            self.hits += len(texts) - n_missing
+            self.misses += n_missing
+
+        if missing:
+            miss_hashes = list(missing)
+            vectors = np.asarray(
+                encode_fn([texts[missing[h][0]] for h in miss_hashes]), dtype=np.float32
+            )
+
+            with self._lock:
+                if self._matrix is None:
+                    self._allocate(vectors.shape[1])
+                for text_hash, vector in zip(miss_hashes, vectors):
+                    for i in missing[text_hash]:
+                        result[i] = vector
+                    if text_hash in self._rows:
+                        continue
+                    row = self._take_row()
+                    self._matrix[row] = vector
+                    self._rows[text_hash] = row
+                    self._unflushed += 1
+                self._dirty = True
+                if (self._unflushed >= self.flush_every
+                        or time.monotonic() - self._last_flush >= self.flush_interval):
+                    self._write()
+
+        if not result:
+            return np.zeros((0, self._dim or 0), dtype=np.float32)
+        return np.vstack(result)
+
+    def flush(self):
+        """Persist the index and sync the matrix to disk"""
+        with self._lock:
+            self._write()
+
+    def _write(self):
+        # Caller holds the lock. Vectors are synced before the index that
+        # references them.
+        if not self._dirty or self._matrix is None or not self.owner:
+            return
+        self._matrix.flush()
+
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'model': self.model_name,
+                'dim': self._dim,
+                'capacity': self.max_entries,
+                'entries': list(self._rows.items())
+            }, f)
+        os.replace(tmp_path, self.index_path)
+        self._dirty = False
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+    def clear(self):
+        """Drop every cached vector"""
+        with self._lock:
+            self._rows.clear()
+            self._free_rows = list(range(self.max_entries - 1, -1, -1))
+            for path in (self.index_path, self.vectors_path):
+                if self.owner and os.path.exists(path):
+                    os.remove(path)
+            self._matrix = None
+            self._dim = None
+            self._dirty = False
+            self._unflushed = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        lookups = self.hits + self.misses
+        return {
+            'model': self.model_name,
+            'owner': self.owner,
+            'entries': len(self._rows),
+            'capacity': self.max_entries,
+            'dim': self._dim,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'disk_bytes': self.max_entries * self._dim * 4 if self._dim and self.owner else 0
+        }
@@ -0,0 +1,618 @@
+"""
+Ingestion - Parallel, resumable bulk loading of documentation into RAGEngine
+"""
+
+import os
+import json
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from core.chunker import StructuredChunker
+from core.rag_engine import RAGEngine
+
+# File extensions the reader understands, mapped to a format name
+SOURCE_FORMATS = {
+    '.md': 'markdown',
+    '.markdown': 'markdown',
+    '.rst': 'rst',
+    '.txt': 'text',
+    '.html': 'html',
+    '.htm': 'html',
+    '.jsonl': 'jsonl',
+}
+
+
+def html_to_text(html: str) -> str:
+    """Visible text of an HTML page, with headings kept as Markdown"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    for tag in soup(['script', 'style', 'noscript']):
+        tag.decompose()
+    for level in range(1, 7):
+        for heading in soup.find_all(f'h{level}'):
+            heading.replace_with(f"\n\n{'#' * level} {heading.get_text(' ', strip=True)}\n\n")
+    for pre in soup.find_all('pre'):
+        pre.replace_with(f"\n\n```\n{pre.get_text()}\n```\n\n")
+    return soup.get_text("\n")
+
+
+def iter_source_files(paths: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """Yield (root, file path) for every supported file under paths, in sorted order"""
+    for path in paths:
+        if os.path.isfile(path):
+            yield os.path.dirname(path), path
+            continue
+        for directory, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if os.path.splitext(filename)[1].lower() in SOURCE_FORMATS:
+                    yield path, os.path.join(directory, filename)
+
+
+def _clean_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Vector stores only accept scalar metadata values"""
+    return {
+        key: value if isinstance(value, (str, int, float, bool)) else json.dumps(value)
+        for key, value in metadata.items() if value is not None
+    }
+
+
+def _title_of(text: str, fallback: str) -> str:
+    for line in text.splitlines()[:50]:
+        stripped = line.strip()
+        if stripped.startswith('#'):
+            return stripped.lstrip('#').strip() or fallback
+    return fallback
+
+
+# Per-process chunker, created by the pool initializer
+_worker_chunker: Optional[StructuredChunker] = None
+
+
+def _init_worker(chunker_options: Dict[str, Any]):
+    global _worker_chunker
+    _worker_chunker = StructuredChunker(**chunker_options)
+
+
+def _process_task(task: Dict[str, Any]) -> Tuple[str, int, List[Dict[str, Any]]]:
+    """
+    Parse and chunk one unit of work (runs in a worker process)
+
+    Returns:
+        (checkpoint key, number of source documents, chunks)
+    """
+    chunker = _worker_chunker or StructuredChunker()
+    defaults = task.get('defaults', {})
+
+    if task['kind'] == 'file':
+        path = task['path']
+        source_format = SOURCE_FORMATS[os.path.splitext(path)[1].lower()]
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            text = f.read()
+        if source_format == 'html':
+            text = html_to_text(text)
+        relative = os.path.relpath(path, task['root'])
+        stem = os.path.splitext(os.path.basename(path))[0]
+        docs = [{
+            'text': text,
+            'metadata': {'type': 'documentation', **defaults,
+                         'source': relative, 'title': _title_of(text, stem), 'format': source_format}
+        }]
+    else:
+        docs = [
+            {'text': doc['text'], 'metadata': {**defaults, **doc.get('metadata', {})}}
+            for doc in task['docs'] if doc.get('text')
+        ]
+
+    chunks = [
+        {'text': chunk['text'], 'metadata': _clean_metadata(chunk['metadata'])}
+        for doc in docs
+        for chunk in chunker.chunk_document(doc)
+    ]
+    return task['key'], len(docs), chunks
+
+
+class AdaptiveBatchSizer:
+    """
+    Hill-climbs the embedding batch size on measured throughput.
+
+    The size doubles while chunks/sec keeps improving, backs off when it
+    drops, and halves on out-of-memory errors.
+    """
+
+    def __init__(self, initial: int = 64, minimum: int = 8, maximum: int = 1024,
+                 tolerance: float = 0.05):
+        self.size = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.tolerance = tolerance
+        self._best_rate = 0.0
+        self._growing = True
+
+    def record(self, n_items: int, seconds: float):
+        """Feed the throughput of one full-size batch"""
+        if n_items < self.size or seconds <= 0:
+            return
+        rate = n_items / seconds
+        if rate > self._best_rate * (1 + self.tolerance):
+            self._best_rate = rate
+            if self._growing:
+                self.size = min(self.size * 2, self.maximum)
+        elif rate < self._best_rate * (1 - self.tolerance):
+            self._growing = False
+            self.size = max(self.size // 2, self.minimum)
+        else:
+            self._growing = False
+
+    def shrink(self):
+        """Halve the batch after an out-of-memory failure"""
+        self._growing = False
+        self.size = max(self.size // 2, self.minimum)
+
+
+class IngestionPipeline:
+    """
+    Bulk ingestion: parallel parsing/chunking, adaptive embedding batches,
+    and vector-store writes overlapped with embedding.
+
+    Sources are parsed and chunked in a process pool (bounded number of
+    in-flight tasks, so inputs stream through in constant memory). The main
+    thread embeds batches and hands them to a writer thread through a
+    bounded queue. A source is checkpointed once all of its chunks are
+    stored, so an interrupted run resumes where it stopped; chunk IDs are
+    content hashes, so partially written sources are never duplicated.
+    Stored chunks are recorded in the engine's ingest manifest per source,
+    so re-ingesting a changed file drops its stale chunks and deleted files
+    are pruned.
+    """
+
+    def __init__(self,
+                 rag_engine: RAGEngine,
+                 workers: Optional[int] = None,
+                 chunker_options: Optional[Dict[str, Any]] = None,
+                 queue_size: int = 4,
+                 initial_batch_size: int = 64,
+                 max_batch_size: int = 1024,
+                 jsonl_batch_lines: int = 500,
+                 checkpoint_path: Optional[str] = None,
+                 progress_interval: float = 5.0):
+        """
+        Initialize Ingestion Pipeline
+
+        Args:
+            rag_engine: Target engine
+            workers: Parser processes (0 parses in-process; default CPUs - 1)
+            chunker_options: StructuredChunker arguments
+            queue_size: Embedded batches allowed to wait for the writer
+            initial_batch_size: First embedding batch size
+            max_batch_size: Upper bound for adaptive batch sizes
+            jsonl_batch_lines: JSONL records per parsing task
+            checkpoint_path: Progress file (default: next to the collection)
+            progress_interval: Seconds between progress lines
+        """
+        self.rag_engine = rag_engine
+        self.workers = max((os.cpu_count() or 2) - 1, 1) if workers is None else workers
+        self.chunker_options = chunker_options or {}
+        self.queue_size = queue_size
+        self.batch_sizer = AdaptiveBatchSizer(initial=initial_batch_size, maximum=max_batch_size)
+        self.jsonl_batch_lines = jsonl_batch_lines
+        self.checkpoint_path = checkpoint_path or os.path.join(
+            rag_engine.persist_directory, f"{rag_engine.collection_name}_ingest_checkpoint.json"
+        )
+        self.progress_interval = progress_interval
+
+    def _load_checkpoint(self) -> Set[str]:
+        if not os.path.exists(self.checkpoint_path):
+            return set()
+        with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+            return set(json.load(f).get('completed', []))
+
+    def _save_checkpoint(self, completed: Set[str]):
+        directory = os.path.dirname(self.checkpoint_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'completed': sorted(completed)}, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def reset_checkpoint(self):
+        """Forget progress so the next run re-reads every source"""
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    def _file_tasks(self, paths: Iterable[str], defaults: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        for root, path in iter_source_files(paths):
+            stat = os.stat(path)
+            origin = os.path.abspath(path)
+            key = f"{origin}:{stat.st_size}:{stat.st_mtime_ns}"
+            if not path.lower().endswith('.jsonl'):
+                yield {'kind': 'file', 'key': key, 'origin': origin, 'path': path, 'root': root,
+                       'defaults': defaults}
+                continue
+
+            with open(path, 'r', encoding='utf-8') as f:
+                batch: List[Dict[str, Any]] = []
+                start_line = 0
+                for line_number, line in enumerate(f):
+                    if line.strip():
+                        record = json.loads(line)
+                        metadata = record.get('metadata') or {
+                            k: v for k, v in record.items() if k != 'text'
+                        }
+                        batch.append({'text': record.get('text', ''), 'metadata': metadata})
+                    if len(batch) >= self.jsonl_batch_lines:
+                        yield {'kind': 'docs', 'key': f"{key}#{start_line}", 'origin': origin,
+                               'docs': batch, 'defaults': defaults}
+                        batch, start_line = [], line_number + 1
+                if batch:
+                    yield {'kind': 'docs', 'key': f"{key}#{start_line}", 'origin': origin,
+                           'docs': batch, 'defaults': defaults}
+
+    def run(self, paths: Iterable[str], resume: bool = True,
+            defaults: Optional[Dict[str, Any]] = None, prune: bool = True) -> Dict[str, Any]:
+        """
+        Ingest directory trees / files of Markdown, HTML, rst, text or JSONL
+
+        Args:
+            paths: Files or directories
+            resume: Skip sources completed by an earlier run
+            defaults: Metadata applied to every chunk (e.g. {'language': 'Python'})
+            prune: Delete the chunks of files under paths that no longer exist
+
+        Returns:
+            Ingestion statistics
+        """
+        paths = list(paths)
+        prune_roots = [os.path.abspath(path) for path in paths] if prune else []
+        tracker = _SourceTracker(complete_origins=True)
+        return self._run_tasks(self._file_tasks(paths, defaults or {}), resume, tracker, prune_roots)
+
+    def ingest_documents(self, documents: Iterable[Dict[str, Any]], source: str = "stream",
+                         batch_docs: int = 50, resume: bool = True,
+                         on_stored: Optional[Callable[[List[Dict[str, Any]]], None]] = None) -> Dict[str, Any]:
+        """
+        Ingest a (possibly endless) stream of {'text', 'metadata'} documents
+
+        Documents are grouped into tasks of batch_docs; a task is
+        checkpointed under "<source>#<index>" once fully stored. Each
+        document's chunks replace the ones stored for its metadata source
+        by earlier runs; sources missing from the stream are kept.
+
+        Args:
+            on_stored: Called with a task's documents once all of their
+                chunks are written (from the writer or the calling thread)
+        """
+        def tasks() -> Iterator[Dict[str, Any]]:
+            batch: List[Dict[str, Any]] = []
+            index = 0
+            for doc in documents:
+                batch.append(doc)
+                if len(batch) >= batch_docs:
+                    yield {'kind': 'docs', 'key': f"{source}#{index}", 'origin': source, 'docs': batch}
+                    batch, index = [], index + 1
+            if batch:
+                yield {'kind': 'docs', 'key': f"{source}#{index}", 'origin': source, 'docs': batch}
+
+        return self._run_tasks(tasks(), resume, _SourceTracker(complete_origins=False),
+                               on_stored=on_stored)
+
+    def _run_tasks(self, tasks: Iterable[Dict[str, Any]], resume: bool,
+                   tracker: "_SourceTracker", prune_roots: Iterable[str] = (),
+                   on_stored: Optional[Callable[[List[Dict[str, Any]]], None]] = None) -> Dict[str, Any]:
+        completed = self._load_checkpoint() if resume else set()
+        # Documents of in-flight tasks, handed to on_stored when their task completes
+        task_docs: Dict[str, List[Dict[str, Any]]] = {}
+        stats = {'sources': 0, 'skipped_sources': 0, 'docs': 0, 'chunks': 0,
+                 'embedded_chunks': 0, 'existing_chunks': 0, 'batches': 0,
+                 'removed_sources': 0, 'deleted_chunks': 0}
+        state = _RunState(completed,
+                          on_complete=(lambda key: on_stored(task_docs.pop(key, []))) if on_stored else None)
+        write_queue: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        writer = threading.Thread(target=self._write_loop, args=(write_queue, state, stats),
+                                  name="ingest-writer", daemon=True)
+        writer.start()
+
+        buffer: Deque[Tuple[str, Dict[str, Any]]] = deque()
+        start = time.perf_counter()
+        last_report = start
+
+        def accept(result: Tuple[str, int, List[Dict[str, Any]]]):
+            key, n_docs, chunks = result
+            stats['sources'] += 1
+            stats['docs'] += n_docs
+            stats['chunks'] += len(chunks)
+            tracker.add_chunks(key, chunks)
+            state.open_source(key, len(chunks))
+            buffer.extend((key, chunk) for chunk in chunks)
+            while len(buffer) >= self.batch_sizer.size:
+                self._embed([buffer.popleft() for _ in range(self.batch_sizer.size)],
+                            write_queue, state, stats)
+
+        def report():
+            nonlocal last_report
+            now = time.perf_counter()
+            if now - last_report >= self.progress_interval:
+                last_report = now
+                self._print_progress(stats, now - start)
+
+        finished = False
+        try:
+            if self.workers == 0:
+                _init_worker(self.chunker_options)
+                for task in tasks:
+                    if task['key'] in completed:
+                        tracker.skip(task)
+                        stats['skipped_sources'] += 1
+                        continue
+                    tracker.submit(task)
+                    if on_stored:
+                        task_docs[task['key']] = task.get('docs', [])
+                    accept(_process_task(task))
+                    report()
+            else:
+                with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                         initargs=(self.chunker_options,)) as pool:
+                    pending = set()
+                    for task in tasks:
+                        if task['key'] in completed:
+                            tracker.skip(task)
+                            stats['skipped_sources'] += 1
+                            continue
+                        tracker.submit(task)
+                        if on_stored:
+                            task_docs[task['key']] = task.get('docs', [])
+                        pending.add(pool.submit(_process_task, task))
+                        # Bound in-flight tasks so huge inputs stream through
+                        while len(pending) >= self.workers * 4:
+                            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                            for future in done:
+                                accept(future.result())
+                            report()
+                    for future in pending:
+                        accept(future.result())
+
+            while buffer:
+                size = min(self.batch_sizer.size, len(buffer))
+                self._embed([buffer.popleft() for _ in range(size)], write_queue, state, stats)
+            finished = True
+        finally:
+            write_queue.put(None)
+            writer.join()
+            finished = finished and state.error is None
+            self._sync_manifest(tracker, state, finished, prune_roots if finished else (), stats)
+            self._save_checkpoint(state.completed)
+
+        if state.error is not None:
+            raise state.error
+
+        elapsed = time.perf_counter() - start
+        stats.update({
+            'seconds': elapsed,
+            'docs_per_sec': stats['docs'] / elapsed if elapsed else 0.0,
+            'chunks_per_sec': stats['chunks'] / elapsed if elapsed else 0.0,
+            'final_batch_size': self.batch_sizer.size
+        })
+        return stats
+
+    def _embed(self, items: List[Tuple[str, Dict[str, Any]]], write_queue: "queue.Queue",
+               state: "_RunState", stats: Dict[str, Any]):
+        """Embed one batch of new chunks and queue it for the writer"""
+        if state.error is not None:
+            raise state.error
+
+        by_id: Dict[str, Dict[str, Any]] = {}
+        keys_by_id: Dict[str, List[str]] = {}
+        for key, chunk in items:
+            doc_id = RAGEngine.chunk_id(chunk)
+            by_id.setdefault(doc_id, chunk)
+            keys_by_id.setdefault(doc_id, []).append(key)
+
+        existing = self.rag_engine.existing_ids(list(by_id))
+        stats['existing_chunks'] += sum(len(keys_by_id[doc_id]) for doc_id in existing)
+        for doc_id in existing:
+            state.chunks_done(keys_by_id.pop(doc_id))
+            del by_id[doc_id]
+        if not by_id:
+            return
+
+        ids = list(by_id)
+        texts = [by_id[doc_id]['text'] for doc_id in ids]
+        started = time.perf_counter()
+        try:
+            embeddings = self.rag_engine.encode(texts)
+        except (MemoryError, RuntimeError) as e:
+            if not isinstance(e, MemoryError) and 'out of memory' not in str(e).lower():
+                raise
+            # Out of (GPU) memory: back off and embed this batch in smaller pieces
+            self.batch_sizer.shrink()
+            step = self.batch_sizer.size
+            embeddings = np.vstack([
+                self.rag_engine.encode(texts[i:i + step]) for i in range(0, len(texts), step)
+            ])
+        else:
+            self.batch_sizer.record(len(texts), time.perf_counter() - started)
+
+        write_queue.put({
+            'ids': ids,
+            'texts': texts,
+            'metadatas': [by_id[doc_id]['metadata'] for doc_id in ids],
+            'embeddings': embeddings,
+            'keys': [key for doc_id in ids for key in keys_by_id[doc_id]]
+        })
+
+    def _write_loop(self, write_queue: "queue.Queue", state: "_RunState", stats: Dict[str, Any]):
+        """Writer thread: store embedded batches while the next ones are embedded"""
+        last_checkpoint = time.perf_counter()
+        while True:
+            batch = write_queue.get()
+            if batch is None:
+                return
+            if state.error is not None:
+                continue
+            try:
+                self.rag_engine.write_chunks(batch['ids'], batch['texts'],
+                                             batch['metadatas'], batch['embeddings'])
+                stats['embedded_chunks'] += len(batch['ids'])
+                stats['batches'] += 1
+                state.chunks_done(batch['keys'])
+                if time.perf_counter() - last_checkpoint >= self.progress_interval:
+                    self._save_checkpoint(state.snapshot())
+                    last_checkpoint = time.perf_counter()
+            except Exception as e:
+                state.error = e
+
+    def _sync_manifest(self, tracker: "_SourceTracker", state: "_RunState", finished: bool,
+                       prune_roots: Iterable[str], stats: Dict[str, Any]):
+        """Record stored sources in the manifest and delete chunks that disappeared"""
+        known = self.rag_engine.manifest_sources()
+        replace, merge, removed = tracker.updates(state.snapshot(), finished, known)
+
+        roots = [root.rstrip(os.sep) for root in prune_roots]
+        removed.update(
+            source for source, entry in known.items()
+            if entry.get('origin') and entry['origin'] not in tracker.seen
+            and any(entry['origin'] == root or entry['origin'].startswith(root + os.sep) for root in roots)
+        )
+
+        if merge:
+            self.rag_engine.sync_manifest(merge, merge=True)
+        if replace or removed:
+            stats['deleted_chunks'] += self.rag_engine.sync_manifest(replace, removed)
+            stats['removed_sources'] += len(removed)
+
+        # Forget checkpoints of deleted files so they are read again if restored
+        gone = {known[source]['origin'] for source in removed} - tracker.seen
+        if gone:
+            with state.lock:
+                state.completed -= {key for key in state.completed if key.rsplit(':', 2)[0] in gone}
+
+    @staticmethod
+    def _print_progress(stats: Dict[str, Any], elapsed: float):
+        print(f"  {stats['docs']} docs ({stats['docs'] / elapsed:.1f}/s), "
+              f"{stats['chunks']} chunks ({stats['chunks'] / elapsed:.1f}/s), "
+              f"{stats['embedded_chunks']} embedded, {stats['skipped_sources']} sources skipped")
+
+
+class _RunState:
+    """Per-source outstanding chunk counts shared by the embedder and writer"""
+
+    def __init__(self, completed: Set[str], on_complete: Optional[Callable[[str], None]] = None):
+        self.completed = completed
+        self.error: Optional[BaseException] = None
+        self._outstanding: Dict[str, int] = {}
+        self._on_complete = on_complete
+        self.lock = threading.Lock()
+
+    def open_source(self, key: str, n_chunks: int):
+        with self.lock:
+            if n_chunks:
+                self._outstanding[key] = self._outstanding.get(key, 0) + n_chunks
+                return
+            self.completed.add(key)
+        self._notify([key])
+
+    def chunks_done(self, keys: List[str]):
+        finished = []
+        with self.lock:
+            for key in keys:
+                self._outstanding[key] -= 1
+                if self._outstanding[key] == 0:
+                    del self._outstanding[key]
+                    self.completed.add(key)
+                    finished.append(key)
+        self._notify(finished)
+
+    def _notify(self, keys: List[str]):
+        # Outside the lock: callbacks may be slow (e.g. a database write)
+        if self._on_complete:
+            for key in keys:
+                self._on_complete(key)
+
+    def snapshot(self) -> Set[str]:
+        with self.lock:
+            return set(self.completed)
+
+
+class _SourceTracker:
+    """
+    Chunk IDs each task produced, by manifest source, grouped by origin
+    (the file or stream the task was read from).
+
+    A file's chunks are recorded under its absolute path; documents from
+    JSONL files and streams under "<origin>#<metadata source>".
+    """
+
+    def __init__(self, complete_origins: bool):
+        """
+        Args:
+            complete_origins: Each origin holds all of its sources (files), so
+                sources missing from a fully re-read origin are removed
+        """
+        self.complete_origins = complete_origins
+        self.seen: Set[str] = set()
+        self._partial: Set[str] = set()
+        self._tasks: Dict[str, Dict[str, Any]] = {}
+        self._keys_by_origin: Dict[str, List[str]] = {}
+        self._chunk_ids: Dict[str, Dict[str, List[str]]] = {}
+
+    def skip(self, task: Dict[str, Any]):
+        """A task completed by an earlier run; its origin is only partly seen"""
+        self.seen.add(task['origin'])
+        self._partial.add(task['origin'])
+
+    def submit(self, task: Dict[str, Any]):
+        self.seen.add(task['origin'])
+        self._tasks[task['key']] = {'origin': task['origin'], 'kind': task['kind']}
+        self._keys_by_origin.setdefault(task['origin'], []).append(task['key'])
+
+    def add_chunks(self, key: str, chunks: List[Dict[str, Any]]):
+        task = self._tasks[key]
+        by_source = self._chunk_ids.setdefault(key, {})
+        for chunk in chunks:
+            if task['kind'] == 'file':
+                source = task['origin']
+            else:
+                source = f"{task['origin']}#{RAGEngine.source_of(chunk)}"
+            by_source.setdefault(source, []).append(RAGEngine.chunk_id(chunk))
+
+    def updates(self, completed: Set[str], finished: bool,
+                known: Dict[str, Dict[str, Any]]) -> Tuple[Dict[str, Dict[str, Any]],
+                                                           Dict[str, Dict[str, Any]], Set[str]]:
+        """
+        Manifest changes for the stored tasks
+
+        Returns:
+            (entries replacing recorded ones, entries merged into recorded
+            ones, sources to remove). Only origins whose every task was read
+            and stored in this run are replaced; the rest are merged.
+        """
+        replace: Dict[str, Dict[str, Any]] = {}
+        merge: Dict[str, Dict[str, Any]] = {}
+        removed: Set[str] = set()
+
+        for origin, keys in self._keys_by_origin.items():
+            stored = [key for key in keys if key in completed]
+            chunk_ids: Dict[str, List[str]] = {}
+            for key in stored:
+                for source, ids in self._chunk_ids.get(key, {}).items():
+                    chunk_ids.setdefault(source, []).extend(ids)
+            entries = {source: {'chunk_ids': list(dict.fromkeys(ids)), 'origin': origin}
+                       for source, ids in chunk_ids.items()}
+
+            if finished and len(stored) == len(keys) and origin not in self._partial:
+                replace.update(entries)
+                if self.complete_origins:
+                    removed.update(source for source, entry in known.items()
+                                   if entry.get('origin') == origin and source not in entries)
+            else:
+                merge.update(entries)
+
+        return replace, merge, removed
@@ -1,39 +1,81 @@
 """
-LLM Handler - OpenAI API Integration
-Handles all interactions with OpenAI's GPT models
+LLM Handler - Provider-agnostic LLM Integration
+Handles all interactions with chat models (OpenAI, Gemini, or a local fake)
 """
 
 import os
-from typing import List, Dict, Any, Optional
-from openai import OpenAI
+import time
+import asyncio
+import threading
+import weakref
+from typing import List, Dict, Any, Optional, AsyncIterator, Iterator, Union
 import tiktoken
 from tenacity import retry, stop_after_attempt, wait_exponential
+from core.streaming import TimedStream
+from core.context_packer import ContextPacker
+from core.providers import LLMProvider, create_provider
+from core.single_flight import SingleFlight, AsyncSingleFlight, request_key
+from core.structured_output import IncrementalJSONParser, conform, loads
+
+
+def _count_retry(retry_state):
+    """tenacity hook: record a retry on the handler (first positional arg)"""
+    retry_state.args[0]._record('retries')
+
 
 class LLMHandler:
     """
-    Handler for OpenAI GPT models
+    Handler for chat models behind a pluggable provider
     """
     
     def __init__(self, 
                  model: str = None,
                  temperature: float = 0.7,
-                 max_tokens: int = 2000):
+                 max_tokens: int = 2000,
+                 max_concurrency: int = 64,
+                 request_timeout: float = 60.0,
+                 context_token_budget: int = 1500,
+                 provider: Union[str, LLMProvider, None] = None,
+                 coalesce_requests: bool = True):
         """
         Initialize LLM Handler
         
         Args:
-            model: OpenAI model name
+            model: Model name (defaults to the provider's model env var, e.g.
+                $MODEL_NAME for OpenAI, then the provider default)
             temperature: Sampling temperature
             max_tokens: Maximum tokens in response
+            max_concurrency: Maximum async requests in flight at once
+            request_timeout: Default per-request timeout in seconds
+            context_token_budget: Default token budget for packed RAG context
+            provider: Provider instance or name ('openai', 'gemini', 'fake');
+                defaults to $LLM_PROVIDER, then 'openai'
+            coalesce_requests: Share one upstream call between concurrent
+                identical requests (same model, messages, temperature, max_tokens)
         """
-        self.api_key = os.getenv('OPENAI_API_KEY')
-        if not self.api_key:
-            raise ValueError("OPENAI_API_KEY not found in environment variables")
+        if isinstance(provider, LLMProvider):
+            self.provider = provider
+        else:
+            self.provider = create_provider(provider)
         
-        self.client = OpenAI(api_key=self.api_key)
-        self.model = model or os.getenv('MODEL_NAME', 'gpt-4o')
+        self.model = (model
+                      or (self.provider.model_env and os.getenv(self.provider.model_env))
+                      or self.provider.default_model)
         self.temperature = temperature
         self.max_tokens = max_tokens
+        self.max_concurrency = max_concurrency
+        self.request_timeout = request_timeout
+        
+        # Semaphores are bound to an event loop, so keep one per loop
+        self._semaphores = weakref.WeakKeyDictionary()
+        
+        self.coalesce_requests = coalesce_requests
+        self._flight = SingleFlight()
+        self._aflight = AsyncSingleFlight()
+        
+        self._metrics_lock = threading.Lock()
+        self._metrics = {'requests': 0, 'errors': 0, 'retries': 0, 'streams': 0,
+                         'json_repairs': 0, 'schema_fixes': 0, 'total_latency': 0.0}
         
         # Initialize tokenizer
         try:
@@ -41,46 +83,137 @@ class LLMHandler:
         except:
             self.encoding = tiktoken.get_encoding("cl100k_base")
         
-        print(f"✅ LLM Handler initialized with model: {self.model}")
+        self.context_packer = ContextPacker(self.count_tokens, token_budget=context_token_budget)
+        
+        print(f"✅ LLM Handler initialized with {self.provider.name} model: {self.model}")
     
     def count_tokens(self, text: str) -> int:
         """Count tokens in text"""
         return len(self.encoding.encode(text))
     
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
-    def generate(self,
-                prompt: str,
-                system_message: Optional[str] = None,
-                temperature: Optional[float] = None,
-                max_tokens: Optional[int] = None) -> str:
+    def pack_context(self,
+                     docs: List[Dict[str, Any]],
+                     token_budget: Optional[int] = None) -> List[Dict[str, Any]]:
         """
-        Generate text using OpenAI API
+        Fit retrieved chunks into a token budget
         
         Args:
-            prompt: User prompt
-            system_message: System message for context
-            temperature: Override default temperature
-            max_tokens: Override default max_tokens
+            docs: Retrieved chunks with 'content' (and 'id' if known), best first
+            token_budget: Override the default context token budget
             
         Returns:
-            Generated text
+            Deduplicated chunks in input order, trimmed to the budget
         """
+        return self.context_packer.pack(docs, token_budget=token_budget)
+    
+    @staticmethod
+    def _build_messages(prompt: str, system_message: Optional[str] = None) -> List[Dict[str, str]]:
+        """Build a chat message list from a prompt and optional system message"""
         messages = []
         
         if system_message:
             messages.append({"role": "system", "content": system_message})
         
         messages.append({"role": "user", "content": prompt})
+        return messages
+    
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+    
+    def _record(self, counter: str, amount: float = 1):
+        with self._metrics_lock:
+            self._metrics[counter] = self._metrics.get(counter, 0) + amount
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get request/error/retry counters and mean latency"""
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        completed = metrics['requests'] - metrics['errors']
+        metrics['mean_latency'] = metrics['total_latency'] / completed if completed else 0.0
+        metrics['provider'] = self.provider.name
+        metrics['model'] = self.model
+        
+        sync_flight = self._flight.get_stats()
+        async_flight = self._aflight.get_stats()
+        calls = sync_flight['calls'] + async_flight['calls']
+        coalesced = sync_flight['coalesced'] + async_flight['coalesced']
+        metrics['coalesced'] = coalesced
+        metrics['coalesce_rate'] = coalesced / calls if calls else 0.0
+        return metrics
+    
+    def _request_key(self, messages: List[Dict[str, str]], temperature: float,
+                     max_tokens: int, **extra) -> str:
+        return request_key(model=self.model, messages=messages, temperature=temperature,
+                           max_tokens=max_tokens, **extra)
+    
+    # ------------------------------------------------------------------
+    # Sync API
+    # ------------------------------------------------------------------
+    
+    def _complete(self,
+                  messages: List[Dict[str, str]],
+                  temperature: Optional[float] = None,
+                  max_tokens: Optional[int] = None,
+                  json_mode: bool = False) -> str:
+        """Run a completion, sharing it with identical in-flight requests"""
+        temperature = temperature or self.temperature
+        max_tokens = max_tokens or self.max_tokens
+        
+        def upstream():
+            return self._complete_upstream(messages, temperature, max_tokens, json_mode)
         
+        if not self.coalesce_requests:
+            return upstream()
+        key = self._request_key(messages, temperature, max_tokens, json_mode=json_mode)
+        return self._flight.do(key, upstream)
+    
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10),
+           before_sleep=_count_retry, reraise=True)
+    def _complete_upstream(self,
+                           messages: List[Dict[str, str]],
+                           temperature: float,
+                           max_tokens: int,
+                           json_mode: bool) -> str:
+        """Run one completion through the provider, with retries and metrics"""
+        self._record('requests')
+        start = time.perf_counter()
         try:
-            response = self.client.chat.completions.create(
+            text = self.provider.complete(
                 model=self.model,
                 messages=messages,
-                temperature=temperature or self.temperature,
-                max_tokens=max_tokens or self.max_tokens
+                temperature=temperature,
+                max_tokens=max_tokens,
+                json_mode=json_mode,
+                timeout=self.request_timeout
             )
+        except Exception:
+            self._record('errors')
+            raise
+        self._record('total_latency', time.perf_counter() - start)
+        return text
+    
+    def generate(self,
+                prompt: str,
+                system_message: Optional[str] = None,
+                temperature: Optional[float] = None,
+                max_tokens: Optional[int] = None) -> str:
+        """
+        Generate text using the configured provider
+        
+        Args:
+            prompt: User prompt
+            system_message: System message for context
+            temperature: Override default temperature
+            max_tokens: Override default max_tokens
             
-            return response.choices[0].message.content
+        Returns:
+            Generated text
+        """
+        messages = self._build_messages(prompt, system_message)
+        
+        try:
+            return self._complete(messages, temperature=temperature, max_tokens=max_tokens)
             
         except Exception as e:
             print(f"Error generating response: {str(e)}")
@@ -89,18 +222,25 @@ class LLMHandler:
     def generate_with_context(self,
                             prompt: str,
                             context: List[str],
-                            system_message: Optional[str] = None) -> str:
+                            system_message: Optional[str] = None,
+                            token_budget: Optional[int] = None) -> str:
         """
         Generate text with context from RAG
         
         Args:
             prompt: User prompt
-            context: Retrieved context documents
+            context: Retrieved context documents, most relevant first
             system_message: System message
+            token_budget: Override the default context token budget
             
         Returns:
             Generated text with context
         """
+        context = [
+            doc['content']
+            for doc in self.pack_context([{'content': c} for c in context], token_budget)
+        ]
+        
         # Build context string
         context_str = "\n\n---\n\n".join([
             f"Document {i+1}:\n{doc}" 
@@ -124,77 +264,146 @@ Please provide a comprehensive answer based on the context provided. If the cont
     
     def generate_streaming(self,
                           prompt: str,
-                          system_message: Optional[str] = None):
+                          system_message: Optional[str] = None,
+                          label: str = "generate_streaming") -> TimedStream:
         """
         Generate text with streaming response
         
         Args:
             prompt: User prompt
             system_message: System message
+            label: Name recorded with the stream's latency metrics
             
-        Yields:
-            Text chunks
+        Returns:
+            Iterable of text chunks; time-to-first-token is recorded in
+            core.streaming.stream_metrics
         """
-        messages = []
-        
-        if system_message:
-            messages.append({"role": "system", "content": system_message})
-        
-        messages.append({"role": "user", "content": prompt})
+        messages = self._build_messages(prompt, system_message)
+        return TimedStream(self._stream_chunks(messages), label=label)
+    
+    def chat_streaming(self,
+                       messages: List[Dict[str, str]],
+                       label: str = "chat_streaming") -> TimedStream:
+        """
+        Multi-turn chat conversation with streaming response
         
-        try:
-            stream = self.client.chat.completions.create(
+        Args:
+            messages: List of message dictionaries
+            label: Name recorded with the stream's latency metrics
+            
+        Returns:
+            Iterable of text chunks (see generate_streaming)
+        """
+        return TimedStream(self._stream_chunks(messages), label=label)
+    
+    def _stream_chunks(self, messages: List[Dict[str, str]]):
+        """Yield text chunks, fanning one upstream stream out to identical requests"""
+        def upstream():
+            self._record('streams')
+            return self.provider.stream(
                 model=self.model,
                 messages=messages,
                 temperature=self.temperature,
                 max_tokens=self.max_tokens,
-                stream=True
+                timeout=self.request_timeout
             )
-            
-            for chunk in stream:
-                if chunk.choices[0].delta.content:
-                    yield chunk.choices[0].delta.content
+        
+        try:
+            if self.coalesce_requests:
+                key = self._request_key(messages, self.temperature, self.max_tokens, stream=True)
+                yield from self._flight.do_stream(key, upstream)
+            else:
+                yield from upstream()
                     
         except Exception as e:
+            self._record('errors')
             print(f"Error in streaming: {str(e)}")
             raise
     
+    def _parse_json(self, text: str, schema: Optional[Dict[str, Any]] = None) -> Any:
+        """Parse a JSON response, repairing it locally and conforming it to schema"""
+        value, repaired = loads(text)
+        if repaired:
+            self._record('json_repairs')
+        if schema is not None:
+            value, fixes = conform(value, schema)
+            if fixes:
+                self._record('schema_fixes')
+        return value
+    
     def generate_json(self,
                      prompt: str,
-                     system_message: Optional[str] = None) -> Dict[str, Any]:
+                     system_message: Optional[str] = None,
+                     schema: Optional[Dict[str, Any]] = None,
+                     max_tokens: Optional[int] = None) -> Dict[str, Any]:
         """
         Generate JSON response
         
         Args:
             prompt: User prompt
             system_message: System message
+            schema: Optional schema (see core.structured_output.conform) the
+                result is coerced to; missing fields get defaults
+            max_tokens: Override the handler's max_tokens
             
         Returns:
-            JSON response as dictionary
+            JSON response as dictionary. Malformed or truncated JSON is
+            repaired locally rather than re-requested.
         """
-        messages = []
-        
-        if system_message:
-            messages.append({"role": "system", "content": system_message})
-        
-        messages.append({"role": "user", "content": prompt})
+        messages = self._build_messages(prompt, system_message)
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-                response_format={"type": "json_object"}
-            )
-            
-            import json
-            return json.loads(response.choices[0].message.content)
+            return self._parse_json(self._complete(messages, max_tokens=max_tokens, json_mode=True), schema)
             
         except Exception as e:
             print(f"Error generating JSON: {str(e)}")
             raise
     
+    def stream_json(self,
+                    prompt: str,
+                    system_message: Optional[str] = None,
+                    schema: Optional[Dict[str, Any]] = None,
+                    label: str = "stream_json") -> Iterator[Dict[str, Any]]:
+        """
+        Generate JSON with streaming, yielding each section as it completes
+        
+        Args:
+            prompt: User prompt (should ask for JSON, see schema_prompt)
+            system_message: System message
+            schema: Optional schema top-level fields and the final value are
+                conformed to
+            label: Name recorded with the stream's latency metrics
+            
+        Yields:
+            {'path': (...), 'value': ...} for each top-level field and each
+            item of a top-level list as soon as its text has arrived, then
+            {'path': (), 'value': <whole object>, 'done': True}
+        """
+        parser = IncrementalJSONParser()
+        properties = (schema or {}).get('properties', {})
+        messages = self._build_messages(prompt, system_message)
+        
+        def settle(event):
+            path = event['path']
+            if event.get('done'):
+                if parser.repaired:
+                    self._record('json_repairs')
+                if schema is not None:
+                    event['value'], fixes = conform(event['value'], schema)
+                    if fixes:
+                        self._record('schema_fixes')
+            elif len(path) == 1 and path[0] in properties:
+                event['value'], _ = conform(event['value'], properties[path[0]])
+            elif len(path) == 2 and properties.get(path[0], {}).get('items'):
+                event['value'], _ = conform(event['value'], properties[path[0]]['items'])
+            return event
+        
+        for chunk in TimedStream(self._stream_chunks(messages), label=label):
+            for event in parser.feed(chunk):
+                yield settle(event)
+        for event in parser.close():
+            yield settle(event)
+    
     def chat(self,
             messages: List[Dict[str, str]],
             temperature: Optional[float] = None) -> str:
@@ -209,14 +418,7 @@ Please provide a comprehensive answer based on the context provided. If the cont
             Assistant's response
         """
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=temperature or self.temperature,
-                max_tokens=self.max_tokens
-            )
-            
-            return response.choices[0].message.content
+            return self._complete(messages, temperature=temperature)
             
         except Exception as e:
             print(f"Error in chat: {str(e)}")
@@ -233,16 +435,173 @@ Please provide a comprehensive answer based on the context provided. If the cont
             Embedding vector
         """
         try:
-            response = self.client.embeddings.create(
-                model="text-embedding-ada-002",
-                input=text
+            return self.provider.embed(text)
+            
+        except Exception as e:
+            print(f"Error generating embedding: {str(e)}")
+            raise
+    
+    # ------------------------------------------------------------------
+    # Async API
+    # ------------------------------------------------------------------
+    
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Get the concurrency semaphore for the running loop"""
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphores[loop] = semaphore
+        return semaphore
+    
+    async def _acomplete(self,
+                         messages: List[Dict[str, str]],
+                         temperature: Optional[float] = None,
+                         max_tokens: Optional[int] = None,
+                         json_mode: bool = False,
+                         timeout: Optional[float] = None) -> str:
+        """Run a completion, sharing it with identical in-flight requests"""
+        temperature = temperature or self.temperature
+        max_tokens = max_tokens or self.max_tokens
+        timeout = timeout or self.request_timeout
+        
+        def upstream():
+            return self._acomplete_upstream(messages, temperature, max_tokens, json_mode, timeout)
+        
+        if not self.coalesce_requests:
+            return await upstream()
+        key = self._request_key(messages, temperature, max_tokens, json_mode=json_mode)
+        return await self._aflight.do(key, upstream)
+    
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10),
+           before_sleep=_count_retry, reraise=True)
+    async def _acomplete_upstream(self,
+                                  messages: List[Dict[str, str]],
+                                  temperature: float,
+                                  max_tokens: int,
+                                  json_mode: bool,
+                                  timeout: float) -> str:
+        """Run one completion under the concurrency limit"""
+        async with self._get_semaphore():
+            self._record('requests')
+            start = time.perf_counter()
+            try:
+                text = await self.provider.acomplete(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    json_mode=json_mode,
+                    timeout=timeout
+                )
+            except Exception:
+                self._record('errors')
+                raise
+            self._record('total_latency', time.perf_counter() - start)
+            return text
+    
+    async def achat(self,
+                    messages: List[Dict[str, str]],
+                    temperature: Optional[float] = None,
+                    max_tokens: Optional[int] = None,
+                    timeout: Optional[float] = None) -> str:
+        """
+        Async multi-turn chat conversation
+        
+        Args:
+            messages: List of message dictionaries
+            temperature: Override default temperature
+            max_tokens: Override default max_tokens
+            timeout: Override default per-request timeout in seconds
+            
+        Returns:
+            Assistant's response
+        """
+        try:
+            return await self._acomplete(
+                messages, temperature=temperature, max_tokens=max_tokens, timeout=timeout
             )
             
-            return response.data[0].embedding
+        except Exception as e:
+            print(f"Error in async chat: {str(e)}")
+            raise
+    
+    async def agenerate(self,
+                        prompt: str,
+                        system_message: Optional[str] = None,
+                        temperature: Optional[float] = None,
+                        max_tokens: Optional[int] = None,
+                        timeout: Optional[float] = None) -> str:
+        """Async counterpart of generate()"""
+        return await self.achat(
+            self._build_messages(prompt, system_message),
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=timeout
+        )
+    
+    async def agenerate_json(self,
+                             prompt: str,
+                             system_message: Optional[str] = None,
+                             timeout: Optional[float] = None,
+                             schema: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Async counterpart of generate_json()"""
+        try:
+            text = await self._acomplete(
+                self._build_messages(prompt, system_message),
+                json_mode=True,
+                timeout=timeout
+            )
+            return self._parse_json(text, schema)
             
         except Exception as e:
-            print(f"Error generating embedding: {str(e)}")
+            print(f"Error generating JSON: {str(e)}")
             raise
+    
+    async def astream(self,
+                      prompt: str,
+                      system_message: Optional[str] = None,
+                      timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """
+        Async streaming generation
+        
+        Identical concurrent streams share one upstream stream, which holds
+        a concurrency slot until it is exhausted.
+        
+        Yields:
+            Text chunks
+        """
+        messages = self._build_messages(prompt, system_message)
+        
+        async def upstream():
+            self._record('streams')
+            async with self._get_semaphore():
+                async for chunk in self.provider.astream(
+                    model=self.model,
+                    messages=messages,
+                    temperature=self.temperature,
+                    max_tokens=self.max_tokens,
+                    timeout=timeout or self.request_timeout
+                ):
+                    yield chunk
+        
+        try:
+            if self.coalesce_requests:
+                key = self._request_key(messages, self.temperature, self.max_tokens, stream=True)
+                chunks = self._aflight.do_stream(key, upstream)
+            else:
+                chunks = upstream()
+            async for chunk in chunks:
+                yield chunk
+                        
+        except Exception as e:
+            self._record('errors')
+            print(f"Error in async streaming: {str(e)}")
+            raise
+    
+    async def aclose(self):
+        """Close the provider's async resources for the running loop"""
+        await self.provider.aclose()
 
 
 class PromptTemplate:
@@ -0,0 +1,174 @@
+"""
+Model Registry - Process-wide lazy loading of heavy models and clients
+"""
+
+import os
+import time
+import importlib
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+
+class ModelRegistry:
+    """
+    Loads heavy resources (embedding models, vector store clients, SDK
+    modules) on first use and shares them across every caller in the
+    process. Each key is loaded at most once, even under concurrent
+    first use, and can be pre-warmed in a background thread.
+    """
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._load_seconds: Dict[str, float] = {}
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def register(self, key: str, loader: Callable[[], Any]):
+        """Register a loader for key (no-op if key is already registered)"""
+        with self._lock:
+            if key not in self._loaders:
+                self._loaders[key] = loader
+                self._key_locks[key] = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        """Get the instance for key, loading it on first use"""
+        instance = self._instances.get(key)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            if key not in self._loaders:
+                raise KeyError(f"No loader registered for '{key}'")
+            key_lock = self._key_locks[key]
+
+        with key_lock:
+            instance = self._instances.get(key)
+            if instance is None:
+                start = time.perf_counter()
+                instance = self._loaders[key]()
+                self._load_seconds[key] = time.perf_counter() - start
+                self._instances[key] = instance
+        return instance
+
+    def is_loaded(self, key: str) -> bool:
+        return key in self._instances
+
+    def prewarm(self, keys: List[str], background: bool = True) -> Optional[threading.Thread]:
+        """
+        Load keys ahead of first use
+
+        Args:
+            keys: Registered keys to load
+            background: Load in a daemon thread instead of blocking
+
+        Returns:
+            The loader thread when background is True
+        """
+        def load_all():
+            for key in keys:
+                try:
+                    self.get(key)
+                except Exception as e:
+                    print(f"Pre-warm of {key} failed: {str(e)}")
+
+        if not background:
+            load_all()
+            return None
+
+        thread = threading.Thread(target=load_all, name="model-prewarm", daemon=True)
+        thread.start()
+        return thread
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get registered/loaded keys and their load times"""
+        return {
+            'registered': sorted(self._loaders),
+            'loaded': sorted(self._instances),
+            'load_seconds': dict(self._load_seconds)
+        }
+
+
+# Process-wide registry shared by RAGEngine instances, providers and sessions
+registry = ModelRegistry()
+
+
+def embedding_model_key(name: str) -> str:
+    key = f"embedding:{name}"
+
+    def load():
+        print(f"Loading embedding model: {name}")
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(name)
+
+    registry.register(key, load)
+    return key
+
+
+def cross_encoder_key(name: str) -> str:
+    key = f"cross_encoder:{name}"
+
+    def load():
+        print(f"Loading cross-encoder: {name}")
+        from sentence_transformers import CrossEncoder
+        return CrossEncoder(name)
+
+    registry.register(key, load)
+    return key
+
+
+def chroma_client_key(path: str) -> str:
+    key = f"chroma:{path}"
+
+    def load():
+        import chromadb
+        from chromadb.config import Settings
+        return chromadb.PersistentClient(
+            path=path,
+            settings=Settings(anonymized_telemetry=False, allow_reset=True)
+        )
+
+    registry.register(key, load)
+    return key
+
+
+def embedding_cache_key(model_name: str, cache_dir: str) -> str:
+    key = f"embedding_cache:{os.path.abspath(cache_dir)}:{model_name}"
+
+    def load():
+        from core.embedding_cache import EmbeddingCache
+        return EmbeddingCache(model_name, cache_dir=cache_dir)
+
+    registry.register(key, load)
+    return key
+
+
+def module_key(name: str) -> str:
+    key = f"module:{name}"
+    registry.register(key, lambda: importlib.import_module(name))
+    return key
+
+
+def get_embedding_model(name: str):
+    """Shared SentenceTransformer for a model name"""
+    return registry.get(embedding_model_key(name))
+
+
+def get_cross_encoder(name: str):
+    """Shared CrossEncoder for a model name"""
+    return registry.get(cross_encoder_key(name))
+
+
+def get_embedding_cache(model_name: str, cache_dir: str):
+    """Shared EmbeddingCache for a model and cache directory (one owner of its files)"""
+    return registry.get(embedding_cache_key(model_name, cache_dir))
+
+
+def get_chroma_client(path: str):
+    """Shared ChromaDB PersistentClient for a storage path"""
+    return registry.get(chroma_client_key(path))
+
+
+def get_module(name: str):
+    """Import a heavy module once, possibly already pre-warmed"""
+    return registry.get(module_key(name))
@@ -0,0 +1,368 @@
+"""
+LLM Providers - Pluggable chat completion backends for LLMHandler
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import weakref
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Iterator, AsyncIterator
+
+import httpx
+from core.model_registry import get_module
+
+
+class LLMProvider:
+    """
+    Base class for chat completion providers.
+
+    Providers own their client and connection pool; LLMHandler layers
+    retries, concurrency limits, caching and metrics on top of them.
+    """
+
+    name = "base"
+    default_model = ""
+    # Environment variable that overrides default_model
+    model_env: Optional[str] = None
+
+    def complete(self,
+                 model: str,
+                 messages: List[Dict[str, str]],
+                 temperature: float,
+                 max_tokens: int,
+                 json_mode: bool = False,
+                 timeout: Optional[float] = None) -> str:
+        """Return the full completion text"""
+        raise NotImplementedError
+
+    def stream(self,
+               model: str,
+               messages: List[Dict[str, str]],
+               temperature: float,
+               max_tokens: int,
+               timeout: Optional[float] = None) -> Iterator[str]:
+        """Yield completion text chunks"""
+        raise NotImplementedError
+
+    async def acomplete(self,
+                        model: str,
+                        messages: List[Dict[str, str]],
+                        temperature: float,
+                        max_tokens: int,
+                        json_mode: bool = False,
+                        timeout: Optional[float] = None) -> str:
+        """Async counterpart of complete()"""
+        raise NotImplementedError
+
+    async def astream(self,
+                      model: str,
+                      messages: List[Dict[str, str]],
+                      temperature: float,
+                      max_tokens: int,
+                      timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Async counterpart of stream()"""
+        raise NotImplementedError
+
+    def embed(self, text: str) -> List[float]:
+        """Return an embedding vector for text"""
+        raise NotImplementedError(f"Provider '{self.name}' does not support embeddings")
+
+    async def aclose(self):
+        """Release async resources bound to the running loop"""
+
+    def warmup(self):
+        """Load the provider SDK ahead of the first request"""
+
+
+class OpenAIProvider(LLMProvider):
+    """OpenAI chat completions over pooled HTTP connections"""
+
+    name = "openai"
+    default_model = "gpt-4o"
+    model_env = "MODEL_NAME"
+
+    def __init__(self, api_key: Optional[str] = None, max_connections: int = 64,
+                 timeout: float = 60.0):
+        self.api_key = api_key or os.getenv('OPENAI_API_KEY')
+        if not self.api_key:
+            raise ValueError("OPENAI_API_KEY not found in environment variables")
+
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.client = get_module('openai').OpenAI(
+            api_key=self.api_key,
+            http_client=httpx.Client(limits=self._limits(), timeout=timeout)
+        )
+        # Async clients are bound to an event loop, so keep one per loop
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(max_connections=self.max_connections,
+                            max_keepalive_connections=self.max_connections)
+
+    def _async_client(self):
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = get_module('openai').AsyncOpenAI(
+                api_key=self.api_key,
+                http_client=httpx.AsyncClient(limits=self._limits(), timeout=self.timeout)
+            )
+            self._async_clients[loop] = client
+        return client
+
+    @staticmethod
+    def _request(model, messages, temperature, max_tokens, json_mode=False, timeout=None,
+                 stream=False) -> Dict[str, Any]:
+        request = {
+            'model': model,
+            'messages': messages,
+            'temperature': temperature,
+            'max_tokens': max_tokens
+        }
+        if json_mode:
+            request['response_format'] = {"type": "json_object"}
+        if timeout:
+            request['timeout'] = timeout
+        if stream:
+            request['stream'] = True
+        return request
+
+    def complete(self, model, messages, temperature, max_tokens, json_mode=False, timeout=None):
+        response = self.client.chat.completions.create(
+            **self._request(model, messages, temperature, max_tokens, json_mode, timeout)
+        )
+        return response.choices[0].message.content
+
+    def stream(self, model, messages, temperature, max_tokens, timeout=None):
+        stream = self.client.chat.completions.create(
+            **self._request(model, messages, temperature, max_tokens, timeout=timeout, stream=True)
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def acomplete(self, model, messages, temperature, max_tokens, json_mode=False, timeout=None):
+        response = await self._async_client().chat.completions.create(
+            **self._request(model, messages, temperature, max_tokens, json_mode, timeout)
+        )
+        return response.choices[0].message.content
+
+    async def astream(self, model, messages, temperature, max_tokens, timeout=None):
+        stream = await self._async_client().chat.completions.create(
+            **self._request(model, messages, temperature, max_tokens, timeout=timeout, stream=True)
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def embed(self, text: str) -> List[float]:
+        response = self.client.embeddings.create(
+            model="text-embedding-ada-002",
+            input=text
+        )
+        return response.data[0].embedding
+
+    async def aclose(self):
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.close()
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini via google-generativeai (imported on first use)"""
+
+    name = "gemini"
+    default_model = "gemini-2.0-flash-exp"
+    model_env = "GEMINI_MODEL"
+
+    def __init__(self, api_key: Optional[str] = None, top_p: float = 0.95, top_k: int = 40,
+                 max_cached_models: int = 16):
+        # The app has historically read the Gemini key from OPENAI_API_KEY
+        self.api_key = api_key or os.getenv('GOOGLE_API_KEY') or os.getenv('OPENAI_API_KEY')
+        if not self.api_key:
+            raise ValueError("GOOGLE_API_KEY not found in environment variables")
+
+        self.top_p = top_p
+        self.top_k = top_k
+        self._genai = None
+        # system_instruction is fixed per GenerativeModel, and system messages
+        # vary (e.g. rolling session summaries), so keep only the recent ones
+        self.max_cached_models = max_cached_models
+        self._models: "OrderedDict[tuple, Any]" = OrderedDict()
+        self._models_lock = threading.Lock()
+
+    @property
+    def genai(self):
+        if self._genai is None:
+            genai = get_module('google.generativeai')
+            genai.configure(api_key=self.api_key)
+            self._genai = genai
+        return self._genai
+
+    def warmup(self):
+        self.genai
+
+    def _prepare(self, model: str, messages: List[Dict[str, str]], temperature: float,
+                 max_tokens: int, json_mode: bool = False):
+        """Map chat messages onto a (GenerativeModel, contents, config) triple"""
+        system = "\n\n".join(m['content'] for m in messages if m['role'] == 'system') or None
+        contents = [
+            {'role': 'model' if m['role'] == 'assistant' else 'user', 'parts': [m['content']]}
+            for m in messages if m['role'] != 'system'
+        ]
+
+        key = (model, system)
+        with self._models_lock:
+            generative_model = self._models.get(key)
+            if generative_model is not None:
+                self._models.move_to_end(key)
+        if generative_model is None:
+            generative_model = self.genai.GenerativeModel(model, system_instruction=system)
+            with self._models_lock:
+                self._models[key] = generative_model
+                while len(self._models) > self.max_cached_models:
+                    self._models.popitem(last=False)
+
+        config = self.genai.types.GenerationConfig(
+            temperature=temperature,
+            top_p=self.top_p,
+            top_k=self.top_k,
+            max_output_tokens=max_tokens,
+            response_mime_type="application/json" if json_mode else None
+        )
+        return generative_model, contents, config
+
+    @staticmethod
+    def _request_options(timeout: Optional[float]) -> Dict[str, Any]:
+        return {'timeout': timeout} if timeout else {}
+
+    @staticmethod
+    def _chunk_text(chunk) -> str:
+        try:
+            return chunk.text
+        except ValueError:
+            # Chunks carrying only a finish reason or safety data have no text
+            return ""
+
+    def complete(self, model, messages, temperature, max_tokens, json_mode=False, timeout=None):
+        generative_model, contents, config = self._prepare(
+            model, messages, temperature, max_tokens, json_mode
+        )
+        response = generative_model.generate_content(
+            contents, generation_config=config, request_options=self._request_options(timeout)
+        )
+        return response.text
+
+    def stream(self, model, messages, temperature, max_tokens, timeout=None):
+        generative_model, contents, config = self._prepare(model, messages, temperature, max_tokens)
+        response = generative_model.generate_content(
+            contents, generation_config=config, stream=True,
+            request_options=self._request_options(timeout)
+        )
+        for chunk in response:
+            text = self._chunk_text(chunk)
+            if text:
+                yield text
+
+    async def acomplete(self, model, messages, temperature, max_tokens, json_mode=False, timeout=None):
+        generative_model, contents, config = self._prepare(
+            model, messages, temperature, max_tokens, json_mode
+        )
+        response = await generative_model.generate_content_async(
+            contents, generation_config=config, request_options=self._request_options(timeout)
+        )
+        return response.text
+
+    async def astream(self, model, messages, temperature, max_tokens, timeout=None):
+        generative_model, contents, config = self._prepare(model, messages, temperature, max_tokens)
+        response = await generative_model.generate_content_async(
+            contents, generation_config=config, stream=True,
+            request_options=self._request_options(timeout)
+        )
+        async for chunk in response:
+            text = self._chunk_text(chunk)
+            if text:
+                yield text
+
+
+class FakeProvider(LLMProvider):
+    """
+    Deterministic offline provider for benchmarks and local development.
+
+    The same messages always produce the same text, after an optional
+    simulated latency and per-chunk delay.
+    """
+
+    name = "fake"
+    default_model = "fake-model"
+
+    def __init__(self, latency: float = 0.0, chunk_delay: float = 0.0, n_words: int = 60):
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.n_words = n_words
+        self.calls = 0
+
+    def _text(self, model: str, messages: List[Dict[str, str]], json_mode: bool = False) -> str:
+        digest = hashlib.sha256(json.dumps([model, messages], sort_keys=True).encode('utf-8')).hexdigest()
+        prompt = messages[-1]['content'] if messages else ""
+        if json_mode:
+            return json.dumps({'echo': prompt[:200], 'digest': digest[:16]})
+        words = [f"w{digest[i % 60:i % 60 + 4]}" for i in range(self.n_words)]
+        return f"Answer to: {prompt[:80]}\n\n" + " ".join(words)
+
+    def complete(self, model, messages, temperature, max_tokens, json_mode=False, timeout=None):
+        self.calls += 1
+        time.sleep(self.latency)
+        return self._text(model, messages, json_mode)
+
+    def stream(self, model, messages, temperature, max_tokens, timeout=None):
+        self.calls += 1
+        time.sleep(self.latency)
+        for word in self._text(model, messages).split(" "):
+            time.sleep(self.chunk_delay)
+            yield word + " "
+
+    async def acomplete(self, model, messages, temperature, max_tokens, json_mode=False, timeout=None):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return self._text(model, messages, json_mode)
+
+    async def astream(self, model, messages, temperature, max_tokens, timeout=None):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        for word in self._text(model, messages).split(" "):
+            await asyncio.sleep(self.chunk_delay)
+            yield word + " "
+
+    def embed(self, text: str) -> List[float]:
+        digest = hashlib.sha256(text.encode('utf-8')).digest()
+        return [b / 255.0 for b in digest]
+
+
+PROVIDERS = {
+    'openai': OpenAIProvider,
+    'gemini': GeminiProvider,
+    'fake': FakeProvider,
+}
+
+
+def create_provider(name: Optional[str] = None, **kwargs) -> LLMProvider:
+    """
+    Create a provider by name
+
+    Args:
+        name: 'openai', 'gemini' or 'fake' (defaults to $LLM_PROVIDER, then 'openai')
+        **kwargs: Provider constructor arguments
+
+    Returns:
+        Provider instance
+    """
+    name = (name or os.getenv('LLM_PROVIDER', 'openai')).lower()
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown LLM provider '{name}'. Choose from: {sorted(PROVIDERS)}")
+    return PROVIDERS[name](**kwargs)
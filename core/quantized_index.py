@@ -0,0 +1,422 @@
+"""
+Quantized Index - Memory-mapped int8 vector index with float32 re-ranking
+"""
+
+import os
+import re
+import json
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+_FIELD = re.compile(r"^[A-Za-z0-9_]+$")
+
+
+class QuantizedCollection:
+    """
+    Local vector index that stores embeddings as memory-mapped int8 codes.
+
+    Each vector is quantized symmetrically with its own scale, so the scan
+    matrix is a quarter of the float32 size and is read through the page
+    cache: any number of worker processes opening the same directory share
+    one copy of it. Queries scan the codes in blocks with numpy, keep a
+    shortlist per query and (optionally) re-rank it exactly against the
+    float32 vectors, of which only the shortlisted rows are ever paged in.
+
+    Documents and metadata live in SQLite next to the vectors. The class
+    implements the subset of the ChromaDB Collection API RAGEngine uses
+    (get/upsert/delete/query/count), so it can be swapped in as a backend.
+    One process should write; readers open it with read_only=True and call
+    refresh() to pick up new chunks.
+    """
+
+    def __init__(self,
+                 directory: str,
+                 name: str = "quantized",
+                 rerank: bool = True,
+                 rerank_factor: int = 4,
+                 block_rows: int = 4096,
+                 initial_capacity: int = 1024,
+                 read_only: bool = False):
+        """
+        Initialize Quantized Collection
+
+        Args:
+            directory: Directory holding the SQLite store and vector files
+            name: Collection name (for stats)
+            rerank: Keep float32 vectors and re-rank the shortlist exactly
+            rerank_factor: Shortlist size as a multiple of n_results
+            block_rows: Rows scored per block (bounds temporary memory)
+            initial_capacity: Rows allocated when the index is created
+            read_only: Open an existing index without write access
+        """
+        self.directory = directory
+        self.name = name
+        self.rerank = rerank
+        self.rerank_factor = rerank_factor
+        self.block_rows = block_rows
+        self.initial_capacity = initial_capacity
+        self.read_only = read_only
+
+        self.db_path = os.path.join(directory, "chunks.sqlite3")
+        self.codes_path = os.path.join(directory, "codes.i8")
+        self.scales_path = os.path.join(directory, "scales.f32")
+        self.norms_path = os.path.join(directory, "norms.f32")
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+
+        self._lock = threading.RLock()
+        self._dim: Optional[int] = None
+        self._capacity = 0
+        self._n_rows = 0
+        self._live = np.zeros(0, dtype=bool)
+        self._free_rows: List[int] = []
+        self._codes: Optional[np.memmap] = None
+        self._scales: Optional[np.memmap] = None
+        self._norms: Optional[np.memmap] = None
+        self._vectors: Optional[np.memmap] = None
+
+        if read_only:
+            self._conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True,
+                                         check_same_thread=False)
+        else:
+            os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS chunks (
+                    row INTEGER PRIMARY KEY,
+                    id TEXT UNIQUE NOT NULL,
+                    document TEXT,
+                    metadata TEXT
+                )"""
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._conn.commit()
+
+        self.refresh()
+
+    def _get_meta(self) -> Dict[str, Any]:
+        return {key: json.loads(value) for key, value in self._conn.execute("SELECT key, value FROM meta")}
+
+    def _set_meta(self, **values):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [(key, json.dumps(value)) for key, value in values.items()]
+        )
+
+    def _map(self, mode: str):
+        """Map the vector files at the current capacity"""
+        shape = (self._capacity, self._dim)
+        self._codes = np.memmap(self.codes_path, dtype=np.int8, mode=mode, shape=shape)
+        self._scales = np.memmap(self.scales_path, dtype=np.float32, mode=mode, shape=(self._capacity,))
+        self._norms = np.memmap(self.norms_path, dtype=np.float32, mode=mode, shape=(self._capacity,))
+        self._vectors = (
+            np.memmap(self.vectors_path, dtype=np.float32, mode=mode, shape=shape)
+            if self.rerank else None
+        )
+
+    def refresh(self):
+        """(Re)load row bookkeeping and map the vector files"""
+        with self._lock:
+            meta = self._get_meta()
+            if 'dim' not in meta:
+                return
+            self._dim = meta['dim']
+            self._capacity = meta['capacity']
+            self._n_rows = meta['n_rows']
+            self.rerank = self.rerank and meta.get('rerank', False)
+            self._map('r' if self.read_only else 'r+')
+
+            self._live = np.zeros(self._capacity, dtype=bool)
+            rows = [row for (row,) in self._conn.execute("SELECT row FROM chunks")]
+            self._live[rows] = True
+            self._free_rows = sorted(set(range(self._n_rows)) - set(rows), reverse=True)
+
+    def _allocate(self, dim: int):
+        """Create the vector files on first write"""
+        self._dim = dim
+        self._capacity = self.initial_capacity
+        self._map('w+')
+        self._live = np.zeros(self._capacity, dtype=bool)
+        self._set_meta(dim=dim, capacity=self._capacity, n_rows=0, rerank=self.rerank)
+
+    def _grow(self, needed: int):
+        """Double the vector files until needed rows fit"""
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        if capacity == self._capacity:
+            return
+
+        for array in (self._codes, self._scales, self._norms, self._vectors):
+            if array is not None:
+                array.flush()
+        paths = [(self.codes_path, self._dim), (self.scales_path, 4), (self.norms_path, 4)]
+        if self.rerank:
+            paths.append((self.vectors_path, self._dim * 4))
+        self._codes = self._scales = self._norms = self._vectors = None
+        for path, row_bytes in paths:
+            with open(path, 'r+b') as f:
+                f.truncate(capacity * row_bytes)
+
+        self._capacity = capacity
+        self._map('r+')
+        self._live = np.concatenate([self._live, np.zeros(capacity - len(self._live), dtype=bool)])
+        self._set_meta(capacity=capacity)
+
+    @staticmethod
+    def quantize(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Symmetric per-vector int8 quantization -> (codes, scales)"""
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def upsert(self, ids: List[str], embeddings, documents: Optional[List[str]] = None,
+               metadatas: Optional[List[Dict[str, Any]]] = None):
+        """Insert or overwrite chunks"""
+        if self.read_only:
+            raise RuntimeError(f"Quantized index {self.directory} is open read-only")
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        documents = documents or [None] * len(ids)
+        metadatas = metadatas or [{} for _ in ids]
+
+        with self._lock:
+            if self._dim is None:
+                self._allocate(vectors.shape[1])
+            elif vectors.shape[1] != self._dim:
+                raise ValueError(f"Expected {self._dim}-dimensional embeddings, got {vectors.shape[1]}")
+
+            existing = self._rows_for_ids(ids)
+            rows = []
+            for doc_id in ids:
+                if doc_id in existing:
+                    rows.append(existing[doc_id])
+                elif self._free_rows:
+                    rows.append(self._free_rows.pop())
+                else:
+                    rows.append(self._n_rows)
+                    self._n_rows += 1
+            self._grow(self._n_rows)
+
+            rows_array = np.asarray(rows)
+            codes, scales = self.quantize(vectors)
+            self._codes[rows_array] = codes
+            self._scales[rows_array] = scales
+            self._norms[rows_array] = (vectors ** 2).sum(axis=1)
+            if self._vectors is not None:
+                self._vectors[rows_array] = vectors
+            self._live[rows_array] = True
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (row, id, document, metadata) VALUES (?, ?, ?, ?)",
+                [(row, doc_id, document, json.dumps(metadata or {}))
+                 for row, doc_id, document, metadata in zip(rows, ids, documents, metadatas)]
+            )
+            self._set_meta(n_rows=self._n_rows)
+            self._conn.commit()
+            self._flush()
+
+    add = upsert
+
+    def delete(self, ids: List[str]):
+        """Delete chunks by ID (their rows are reused by later inserts)"""
+        if self.read_only:
+            raise RuntimeError(f"Quantized index {self.directory} is open read-only")
+        with self._lock:
+            rows = list(self._rows_for_ids(ids).values())
+            self._conn.executemany("DELETE FROM chunks WHERE row = ?", [(row,) for row in rows])
+            self._conn.commit()
+            self._live[rows] = False
+            self._free_rows.extend(sorted(rows, reverse=True))
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+            limit: Optional[int] = None, offset: Optional[int] = None,
+            include: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Fetch chunks by ID and/or metadata filter"""
+        include = ['documents', 'metadatas'] if include is None else include
+        if ids is not None and len(ids) > 900:
+            # Stay under SQLite's bound-parameter limit
+            merged = {'ids': [], 'documents': [], 'metadatas': [], 'embeddings': []}
+            for i in range(0, len(ids), 900):
+                part = self.get(ids=ids[i:i + 900], where=where, include=include)
+                for key in merged:
+                    if part[key] is not None:
+                        merged[key].extend(part[key])
+            return {key: (value if key == 'ids' or key in include else None) for key, value in merged.items()}
+        clauses, params = [], []
+        if ids is not None:
+            clauses.append(f"id IN ({','.join('?' * len(ids))})")
+            params.extend(ids)
+        if where:
+            clause, where_params = self._where_sql(where)
+            clauses.append(clause)
+            params.extend(where_params)
+
+        sql = "SELECT row, id, document, metadata FROM chunks"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY row"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params.extend([limit, offset or 0])
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+            embeddings = None
+            if 'embeddings' in include:
+                embeddings = self._embeddings_for_rows([row for row, _, _, _ in rows]).tolist()
+
+        return {
+            'ids': [doc_id for _, doc_id, _, _ in rows],
+            'documents': [document for _, _, document, _ in rows] if 'documents' in include else None,
+            'metadatas': [json.loads(metadata) for _, _, _, metadata in rows] if 'metadatas' in include else None,
+            'embeddings': embeddings
+        }
+
+    def query(self, query_embeddings, n_results: int = 10, where: Optional[Dict[str, Any]] = None,
+              include: Optional[List[str]] = None) -> Dict[str, List[List[Any]]]:
+        """
+        Nearest neighbours by squared L2 distance (ChromaDB's default space)
+
+        Returns:
+            Dict of per-query lists: ids, documents, metadatas, distances
+        """
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[None, :]
+
+        with self._lock:
+            results = {'ids': [], 'documents': [], 'metadatas': [], 'distances': []}
+            if self._dim is None:
+                for key in results:
+                    results[key] = [[] for _ in range(len(queries))]
+                return results
+
+            mask = self._live[:self._n_rows].copy()
+            if where:
+                clause, params = self._where_sql(where)
+                allowed = np.zeros_like(mask)
+                allowed[[row for (row,) in self._conn.execute(f"SELECT row FROM chunks WHERE {clause}", params)]] = True
+                mask &= allowed
+
+            top_rows, top_distances = self._scan(queries, mask, n_results)
+
+            wanted = sorted({int(row) for rows in top_rows for row in rows})
+            records = {}
+            if wanted:
+                for row, doc_id, document, metadata in self._conn.execute(
+                    f"SELECT row, id, document, metadata FROM chunks WHERE row IN ({','.join('?' * len(wanted))})",
+                    wanted
+                ):
+                    records[row] = (doc_id, document, json.loads(metadata))
+
+        for rows, distances in zip(top_rows, top_distances):
+            results['ids'].append([records[int(row)][0] for row in rows])
+            results['documents'].append([records[int(row)][1] for row in rows])
+            results['metadatas'].append([records[int(row)][2] for row in rows])
+            results['distances'].append([float(d) for d in distances])
+        return results
+
+    def _scan(self, queries: np.ndarray, mask: np.ndarray,
+              n_results: int) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        """Blocked int8 scan, then exact re-rank of the shortlist"""
+        n_queries = len(queries)
+        n_candidates = int(mask.sum())
+        k = min(n_results, n_candidates)
+        if k == 0:
+            return [np.zeros(0, dtype=np.int64)] * n_queries, [np.zeros(0, dtype=np.float32)] * n_queries
+
+        shortlist = min(k * self.rerank_factor, n_candidates) if self._vectors is not None else k
+        query_norms = (queries ** 2).sum(axis=1)
+        best_rows = np.zeros((n_queries, 0), dtype=np.int64)
+        best_distances = np.zeros((n_queries, 0), dtype=np.float32)
+
+        for start in range(0, self._n_rows, self.block_rows):
+            end = min(start + self.block_rows, self._n_rows)
+            block_mask = mask[start:end]
+            if not block_mask.any():
+                continue
+            rows = np.arange(start, end)
+            # Score the whole block and mask afterwards; boolean indexing would copy it twice
+            codes = np.asarray(self._codes[start:end]).astype(np.float32)
+            dots = (codes @ queries.T) * np.asarray(self._scales[start:end])[:, None]
+            distances = (np.asarray(self._norms[start:end])[:, None] + query_norms[None, :] - 2 * dots).T
+            if not block_mask.all():
+                distances[:, ~block_mask] = np.inf
+
+            best_rows = np.concatenate([best_rows, np.broadcast_to(rows, distances.shape)], axis=1)
+            best_distances = np.concatenate([best_distances, distances], axis=1)
+            if best_distances.shape[1] > shortlist:
+                keep = np.argpartition(best_distances, shortlist - 1, axis=1)[:, :shortlist]
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+                best_distances = np.take_along_axis(best_distances, keep, axis=1)
+
+        if self._vectors is not None:
+            for q in range(n_queries):
+                vectors = np.asarray(self._vectors[np.sort(best_rows[q])], dtype=np.float32)
+                best_rows[q] = np.sort(best_rows[q])
+                best_distances[q] = ((vectors - queries[q]) ** 2).sum(axis=1)
+
+        order = best_distances.argsort(axis=1)[:, :k]
+        top_rows = np.take_along_axis(best_rows, order, axis=1)
+        top_distances = np.maximum(np.take_along_axis(best_distances, order, axis=1), 0)
+        return list(top_rows), list(top_distances)
+
+    def _embeddings_for_rows(self, rows: List[int]) -> np.ndarray:
+        if not rows:
+            return np.zeros((0, self._dim or 0), dtype=np.float32)
+        rows_array = np.asarray(rows)
+        if self._vectors is not None:
+            return np.asarray(self._vectors[rows_array], dtype=np.float32)
+        return np.asarray(self._codes[rows_array], dtype=np.float32) * self._scales[rows_array][:, None]
+
+    def _rows_for_ids(self, ids: List[str]) -> Dict[str, int]:
+        found = {}
+        for i in range(0, len(ids), 900):
+            batch = ids[i:i + 900]
+            for doc_id, row in self._conn.execute(
+                f"SELECT id, row FROM chunks WHERE id IN ({','.join('?' * len(batch))})", batch
+            ):
+                found[doc_id] = row
+        return found
+
+    @staticmethod
+    def _where_sql(where: Dict[str, Any]) -> Tuple[str, List[Any]]:
+        """Translate the where clauses RAGEngine builds ($and, $in, equality) to SQL"""
+        if "$and" in where:
+            parts = [QuantizedCollection._where_sql(clause) for clause in where["$and"]]
+            return (" AND ".join(f"({sql})" for sql, _ in parts),
+                    [param for _, params in parts for param in params])
+
+        (field, condition), = where.items()
+        if not _FIELD.match(field):
+            raise ValueError(f"Unsupported metadata field: {field!r}")
+        path = f"$.{field}"
+        if isinstance(condition, dict):
+            values = list(condition["$in"])
+            return f"json_extract(metadata, ?) IN ({','.join('?' * len(values))})", [path] + values
+        return "json_extract(metadata, ?) = ?", [path, condition]
+
+    def _flush(self):
+        for array in (self._codes, self._scales, self._norms, self._vectors):
+            if array is not None:
+                array.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get index size statistics"""
+        row_bytes = (self._dim or 0) + 8
+        return {
+            'name': self.name,
+            'chunks': self.count(),
+            'dim': self._dim,
+            'capacity': self._capacity,
+            'rerank': self._vectors is not None,
+            'scan_bytes': self._capacity * row_bytes,
+            'rerank_bytes': self._capacity * (self._dim or 0) * 4 if self._vectors is not None else 0
+        }
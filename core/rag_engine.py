@@ -3,41 +3,180 @@ RAG Engine - Retrieval-Augmented Generation Implementation
 """
 
 import os
-from typing import List, Dict, Any, Optional
-import chromadb
-from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
-from datetime import datetime
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterable, Optional, Set, Tuple
+import numpy as np
+from core import model_registry
+from core.bm25_index import BM25Index
+from core.quantized_index import QuantizedCollection
+
+class MetadataIndex:
+    """In-process inverted index from metadata values to document IDs"""
+    
+    def __init__(self, fields: tuple):
+        self.fields = fields
+        self._postings: Dict[str, Dict[Any, Set[str]]] = {field: {} for field in fields}
+    
+    def add(self, doc_id: str, metadata: Dict[str, Any]):
+        """Index the filterable fields of one document"""
+        for field in self.fields:
+            if field in metadata:
+                self._postings[field].setdefault(metadata[field], set()).add(doc_id)
+    
+    def remove(self, doc_id: str, metadata: Dict[str, Any]):
+        """Drop one document from the index"""
+        for field in self.fields:
+            postings = self._postings[field].get(metadata.get(field))
+            if postings is not None:
+                postings.discard(doc_id)
+    
+    def candidates(self, filters: Dict[str, Any]) -> Set[str]:
+        """Get IDs matching every filter (list values match any element)"""
+        posting_sets = []
+        for field, value in filters.items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            matched = set()
+            for v in values:
+                matched |= self._postings[field].get(v, set())
+            posting_sets.append(matched)
+        
+        if not posting_sets:
+            return set()
+        
+        posting_sets.sort(key=len)
+        result = set(posting_sets[0])
+        for postings in posting_sets[1:]:
+            result &= postings
+            if not result:
+                break
+        return result
+
 
 class RAGEngine:
     """RAG Engine for retrieving relevant documentation"""
     
+    # Metadata fields that can be used to pre-filter retrieval
+    FILTERABLE_FIELDS = ('language', 'type', 'title')
+    
+    # Vector index backends: ChromaDB (HNSW, float32) or a local memory-mapped int8 index
+    INDEX_BACKENDS = ('chroma', 'quantized')
+    
     def __init__(self, 
                  collection_name: str = "programming_docs",
                  embedding_model: str = "all-MiniLM-L6-v2",
-                 persist_directory: str = "./data/vector_db"):
-        """Initialize RAG Engine"""
+                 persist_directory: str = "./data/vector_db",
+                 exact_scan_threshold: int = 2000,
+                 embedding_cache_dir: Optional[str] = "./data/cache/embeddings",
+                 prewarm: bool = False,
+                 hybrid_weight: float = 0.5,
+                 rrf_k: int = 60,
+                 index_backend: str = "chroma",
+                 read_only: bool = False):
+        """
+        Initialize RAG Engine
+        
+        Args:
+            collection_name: ChromaDB collection name
+            embedding_model: SentenceTransformer model name
+            persist_directory: ChromaDB storage directory
+            exact_scan_threshold: Filtered queries matching at most this many
+                chunks are scored exactly in-process instead of via HNSW
+            embedding_cache_dir: On-disk embedding cache location (None disables it)
+            prewarm: Start loading the embedding model, vector store and
+                persisted BM25 index in a background thread instead of on
+                first use
+            hybrid_weight: Weight of BM25 vs. vector ranks in reciprocal rank
+                fusion (0 = vector only, 1 = BM25 only)
+            rrf_k: Reciprocal rank fusion constant (higher flattens rank differences)
+            index_backend: 'chroma' or 'quantized' (see QuantizedCollection)
+            read_only: Open the quantized index read-only, e.g. in extra
+                worker processes sharing it through the page cache
+        
+        The embedding model and ChromaDB client are loaded lazily through the
+        process-wide model registry and shared with other RAGEngine instances.
+        """
         self.collection_name = collection_name
+        self.embedding_model_name = embedding_model
         self.persist_directory = persist_directory
+        self.exact_scan_threshold = exact_scan_threshold
+        if not 0.0 <= hybrid_weight <= 1.0:
+            raise ValueError("hybrid_weight must be between 0 and 1")
+        self.hybrid_weight = hybrid_weight
+        self.rrf_k = rrf_k
+        if index_backend not in self.INDEX_BACKENDS:
+            raise ValueError(f"Unknown index backend '{index_backend}'. Choose from: {self.INDEX_BACKENDS}")
+        self.index_backend = index_backend
+        self.read_only = read_only
+        self._metadata_index: Optional[MetadataIndex] = None
+        self._bm25_index: Optional[BM25Index] = None
+        self._bm25_lock = threading.Lock()
+        # Runs the BM25 search while the vector search is in flight
+        self._lexical_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bm25")
+        self._collection = None
         
-        print(f"Loading embedding model: {embedding_model}")
-        self.embedding_model = SentenceTransformer(embedding_model)
+        # Shared per directory: instances must not allocate rows of one matrix independently
+        self.embedding_cache = (
+            model_registry.get_embedding_cache(embedding_model, embedding_cache_dir)
+            if embedding_cache_dir else None
+        )
         
-        self._initialize_chromadb()
+        self._embedding_model_key = model_registry.embedding_model_key(embedding_model)
+        self._chroma_client_key = model_registry.chroma_client_key(os.path.abspath(persist_directory))
+        if prewarm:
+            keys = [self._embedding_model_key]
+            if index_backend == 'chroma':
+                keys.insert(0, self._chroma_client_key)
+            loader = model_registry.registry.prewarm(keys)
+            if hybrid_weight > 0:
+                threading.Thread(target=self._prewarm_bm25, args=(loader,),
+                                 name="bm25-prewarm", daemon=True).start()
+    
+    def _prewarm_bm25(self, loader: threading.Thread):
+        loader.join()
+        try:
+            self._get_bm25_index()
+        except Exception as e:
+            print(f"Pre-warm of the BM25 index failed: {str(e)}")
+    
+    @property
+    def embedding_model(self):
+        """SentenceTransformer, loaded on first use and shared process-wide"""
+        return model_registry.registry.get(self._embedding_model_key)
+    
+    @property
+    def client(self):
+        """ChromaDB client, opened on first use and shared process-wide"""
+        return model_registry.registry.get(self._chroma_client_key)
+    
+    @property
+    def collection(self):
+        if self._collection is None:
+            if self.index_backend == 'quantized':
+                self._initialize_quantized_index()
+            else:
+                self._initialize_chromadb()
+        return self._collection
+    
+    def _initialize_quantized_index(self):
+        """Open (or create) the memory-mapped quantized index"""
+        directory = os.path.join(self.persist_directory, f"{self.collection_name}_quantized")
+        self._collection = QuantizedCollection(directory, name=self.collection_name,
+                                               read_only=self.read_only)
+        print(f"Opened quantized index: {self.collection_name} ({self._collection.count()} chunks)")
         
     def _initialize_chromadb(self):
         """Initialize ChromaDB client and collection"""
         try:
-            self.client = chromadb.PersistentClient(
-                path=self.persist_directory,
-                settings=Settings(anonymized_telemetry=False, allow_reset=True)
-            )
+            client = self.client
             
             try:
-                self.collection = self.client.get_collection(name=self.collection_name)
+                self._collection = client.get_collection(name=self.collection_name)
                 print(f"Loaded existing collection: {self.collection_name}")
             except:
-                self.collection = self.client.create_collection(
+                self._collection = client.create_collection(
                     name=self.collection_name,
                     metadata={"description": "Programming documentation for RAG"}
                 )
@@ -47,58 +186,501 @@ class RAGEngine:
             print(f"Error initializing ChromaDB: {str(e)}")
             raise
     
-    def add_documents(self, documents: List[Dict[str, Any]], batch_size: int = 100):
-        """Add documents to the vector database"""
+    def encode(self, texts: List[str], show_progress_bar: bool = False) -> np.ndarray:
+        """Embed texts as a float32 matrix, going through the embedding cache"""
+        def encode_fn(batch: List[str]) -> np.ndarray:
+            return self.embedding_model.encode(
+                batch, show_progress_bar=show_progress_bar, convert_to_numpy=True
+            )
+        
+        if self.embedding_cache is None:
+            return np.asarray(encode_fn(texts), dtype=np.float32)
+        return self.embedding_cache.encode(texts, encode_fn)
+    
+    @staticmethod
+    def chunk_id(doc: Dict[str, Any]) -> str:
+        """Content-addressed ID for a chunk (same text + metadata -> same ID)"""
+        payload = json.dumps(
+            {'text': doc['text'], 'metadata': doc.get('metadata', {})},
+            sort_keys=True, ensure_ascii=False
+        )
+        return "chunk_" + hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+    
+    @staticmethod
+    def source_of(doc: Dict[str, Any]) -> str:
+        """Source identifier a chunk belongs to (used by the ingest manifest)"""
+        metadata = doc.get('metadata', {})
+        return str(metadata.get('source') or metadata.get('title') or 'unknown')
+    
+    def add_documents(self, documents: List[Dict[str, Any]], batch_size: int = 100) -> int:
+        """
+        Add documents to the vector database
+        
+        Chunks are keyed by content hash, so chunks already stored are
+        skipped without being re-embedded and re-runs never duplicate.
+        
+        Returns:
+            Number of chunks that were embedded and written
+        """
         print(f"Adding {len(documents)} documents to vector database...")
+        added = 0
         
         for i in range(0, len(documents), batch_size):
-            batch = documents[i:i + batch_size]
+            batch = list({self.chunk_id(doc): doc for doc in documents[i:i + batch_size]}.items())
             
-            texts = [doc['text'] for doc in batch]
-            metadatas = [doc.get('metadata', {}) for doc in batch]
+            existing = self.existing_ids([doc_id for doc_id, _ in batch])
+            batch = [(doc_id, doc) for doc_id, doc in batch if doc_id not in existing]
             
-            embeddings = self.embedding_model.encode(texts, show_progress_bar=True).tolist()
+            if batch:
+                ids = [doc_id for doc_id, _ in batch]
+                texts = [doc['text'] for _, doc in batch]
+                metadatas = [doc.get('metadata', {}) for _, doc in batch]
+                
+                embeddings = self.encode(texts, show_progress_bar=True)
+                self.write_chunks(ids, texts, metadatas, embeddings)
+                added += len(batch)
             
-            ids = [f"doc_{i+j}_{datetime.now().timestamp()}" for j in range(len(batch))]
+            print(f"Added batch {i//batch_size + 1}/{(len(documents)-1)//batch_size + 1} "
+                  f"({len(batch)} new, {len(existing)} unchanged)")
+        
+        print("✅ All documents added successfully!")
+        return added
+    
+    def existing_ids(self, ids: List[str]) -> Set[str]:
+        """IDs among ids that are already stored"""
+        if not ids:
+            return set()
+        return set(self.collection.get(ids=ids, include=[])['ids'])
+    
+    def write_chunks(self, ids: List[str], texts: List[str],
+                     metadatas: List[Dict[str, Any]], embeddings: np.ndarray):
+        """Upsert already-embedded chunks and keep the in-process indexes current"""
+        # ChromaDB 0.4 only accepts plain lists at its API boundary
+        self.collection.upsert(
+            documents=texts,
+            embeddings=np.asarray(embeddings, dtype=np.float32).tolist(),
+            metadatas=metadatas,
+            ids=ids
+        )
+        
+        if self._metadata_index is not None:
+            for doc_id, metadata in zip(ids, metadatas):
+                self._metadata_index.add(doc_id, metadata)
+        # The BM25 index is built (and persisted) as chunks are written
+        self._get_bm25_index().add_many(zip(ids, texts))
+    
+    def delete_documents(self, ids: List[str]):
+        """Delete chunks by ID"""
+        if not ids:
+            return
+        if self._metadata_index is not None:
+            # Read the metadata first so the postings can be removed in place
+            stored = self.collection.get(ids=ids, include=['metadatas'])
+            for doc_id, metadata in zip(stored['ids'], stored['metadatas']):
+                self._metadata_index.remove(doc_id, metadata or {})
+        self.collection.delete(ids=ids)
+        self._get_bm25_index().remove_many(ids)
+    
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.persist_directory, f"{self.collection_name}_manifest.json")
+    
+    def _load_manifest(self) -> Dict[str, Any]:
+        if not os.path.exists(self.manifest_path):
+            return {'sources': {}}
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def _save_manifest(self, manifest: Dict[str, Any]):
+        os.makedirs(self.persist_directory, exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+    
+    def ingest_corpus(self, documents: List[Dict[str, Any]], prune: bool = True,
+                      batch_size: int = 100) -> Dict[str, int]:
+        """
+        Incrementally synchronize the collection with a full corpus
+        
+        Sources whose content hash matches the manifest are skipped, changed
+        sources only embed their new chunks and drop stale ones, and (with
+        prune) sources missing from the corpus are deleted.
+        
+        Args:
+            documents: Every chunk of the corpus, with 'text' and 'metadata'
+            prune: Delete sources that are no longer in the corpus
+            batch_size: Embedding batch size
             
-            self.collection.add(
-                documents=texts,
-                embeddings=embeddings,
-                metadatas=metadatas,
-                ids=ids
-            )
+        Returns:
+            Counts of unchanged/changed/removed sources and added/deleted chunks
+        """
+        known_sources = self.manifest_sources()
+        
+        by_source: Dict[str, List[Dict[str, Any]]] = {}
+        for doc in documents:
+            by_source.setdefault(self.source_of(doc), []).append(doc)
+        
+        stats = {'unchanged_sources': 0, 'changed_sources': 0, 'removed_sources': 0,
+                 'added_chunks': 0, 'deleted_chunks': 0}
+        to_add: List[Dict[str, Any]] = []
+        updates: Dict[str, Dict[str, Any]] = {}
+        
+        for source, docs in by_source.items():
+            chunk_ids = [self.chunk_id(doc) for doc in docs]
+            previous = known_sources.get(source)
+            if previous and previous['hash'] == self._source_hash(chunk_ids):
+                stats['unchanged_sources'] += 1
+                continue
             
-            print(f"Added batch {i//batch_size + 1}/{(len(documents)-1)//batch_size + 1}")
+            stats['changed_sources'] += 1
+            to_add.extend(docs)
+            updates[source] = {'chunk_ids': chunk_ids}
         
-        print("✅ All documents added successfully!")
+        removed = []
+        if prune:
+            # Sources recorded by the ingestion pipeline carry an origin and
+            # are not part of this corpus
+            removed = [s for s, entry in known_sources.items()
+                       if s not in by_source and 'origin' not in entry]
+            stats['removed_sources'] = len(removed)
+        
+        if to_add:
+            stats['added_chunks'] = self.add_documents(to_add, batch_size=batch_size)
+        stats['deleted_chunks'] = self.sync_manifest(updates, removed)
+        return stats
+    
+    @staticmethod
+    def _source_hash(chunk_ids: List[str]) -> str:
+        return hashlib.sha256("\n".join(chunk_ids).encode('utf-8')).hexdigest()
+    
+    def manifest_sources(self) -> Dict[str, Dict[str, Any]]:
+        """Manifest entries by source: {'hash', 'chunk_ids'[, 'origin']}"""
+        return self._load_manifest()['sources']
     
-    def retrieve(self, query: str, n_results: int = 5) -> List[Dict[str, Any]]:
-        """Retrieve relevant documents for a query"""
-        query_embedding = self.embedding_model.encode([query])[0].tolist()
+    def sync_manifest(self,
+                      sources: Dict[str, Dict[str, Any]],
+                      removed: Iterable[str] = (),
+                      merge: bool = False) -> int:
+        """
+        Record the current chunks of sources and delete the ones that disappeared
         
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=n_results
-        )
+        Args:
+            sources: source -> {'chunk_ids': [...], optional 'origin'}; the
+                chunks must already be stored
+            removed: Sources that no longer exist; all their chunks are deleted
+            merge: Add to the recorded chunk IDs instead of replacing them
+                (for sources only partly seen), so nothing is deleted
+            
+        Returns:
+            Number of deleted chunks
+        """
+        manifest = self._load_manifest()
+        known_sources = manifest['sources']
+        to_delete: Set[str] = set()
+        
+        for source, entry in sources.items():
+            chunk_ids = list(entry['chunk_ids'])
+            previous = known_sources.get(source)
+            if previous:
+                if merge:
+                    chunk_ids = sorted(set(previous['chunk_ids']) | set(chunk_ids))
+                else:
+                    to_delete.update(set(previous['chunk_ids']) - set(chunk_ids))
+            known_sources[source] = dict(entry, chunk_ids=chunk_ids, hash=self._source_hash(chunk_ids))
+        
+        for source in removed:
+            previous = known_sources.pop(source, None)
+            if previous:
+                to_delete.update(previous['chunk_ids'])
         
+        if to_delete:
+            self.delete_documents(sorted(to_delete))
+        self._save_manifest(manifest)
+        return len(to_delete)
+    
+    def _scan_collection(self, field: str, page_size: int = 10000):
+        """Yield (id, value) for every stored chunk, one page at a time"""
+        offset = 0
+        while True:
+            page = self.collection.get(include=[field], limit=page_size, offset=offset)
+            yield from zip(page['ids'], page[field])
+            if len(page['ids']) < page_size:
+                break
+            offset += page_size
+    
+    def _get_metadata_index(self) -> MetadataIndex:
+        """Build the metadata inverted index on first use"""
+        if self._metadata_index is None:
+            index = MetadataIndex(self.FILTERABLE_FIELDS)
+            for doc_id, metadata in self._scan_collection('metadatas'):
+                index.add(doc_id, metadata or {})
+            self._metadata_index = index
+        return self._metadata_index
+    
+    @property
+    def bm25_path(self) -> str:
+        return os.path.join(self.persist_directory, f"{self.collection_name}_bm25.sqlite3")
+    
+    def _get_bm25_index(self) -> BM25Index:
+        """
+        Load the persisted BM25 index on first use; writes and deletes keep it current
+        
+        A collection written before the index existed (or by a process that
+        did not maintain it) is scanned once and the result persisted.
+        """
+        if self._bm25_index is None:
+            with self._bm25_lock:
+                if self._bm25_index is None:
+                    store_path = self.bm25_path
+                    if self.read_only and not os.path.exists(store_path):
+                        store_path = None
+                    index = BM25Index(store_path=store_path)
+                    if len(index) != self.collection.count():
+                        print(f"Building BM25 index for {self.collection_name}...")
+                        if self.read_only:
+                            # Leave the writer's persisted index alone
+                            index = BM25Index()
+                        else:
+                            index.clear()
+                        page: List[Tuple[str, str]] = []
+                        for doc_id, text in self._scan_collection('documents'):
+                            page.append((doc_id, text))
+                            if len(page) >= 10000:
+                                index.add_many(page)
+                                page = []
+                        index.add_many(page)
+                    self._bm25_index = index
+        return self._bm25_index
+    
+    @staticmethod
+    def _build_where(filters: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Translate metadata filters into a ChromaDB where clause"""
+        clauses = []
+        for field, value in filters.items():
+            if isinstance(value, (list, tuple, set)):
+                clauses.append({field: {"$in": list(value)}})
+            else:
+                clauses.append({field: value})
+        
+        if not clauses:
+            return None
+        if len(clauses) == 1:
+            return clauses[0]
+        return {"$and": clauses}
+    
+    @staticmethod
+    def _format_results(results: Dict[str, Any], query_index: int = 0) -> List[Dict[str, Any]]:
+        """Convert one query's slice of a ChromaDB result into document dicts"""
         retrieved_docs = []
-        for i in range(len(results['documents'][0])):
+        for i in range(len(results['documents'][query_index])):
+            distance = results['distances'][query_index][i]
             doc = {
-                'content': results['documents'][0][i],
-                'metadata': results['metadatas'][0][i] if results['metadatas'] else {},
-                'distance': results['distances'][0][i],
-                'relevance': 1 - (results['distances'][0][i] / 2)
+                'id': results['ids'][query_index][i],
+                'content': results['documents'][query_index][i],
+                'metadata': results['metadatas'][query_index][i] if results['metadatas'] else {},
+                'distance': distance,
+                'relevance': 1 - (distance / 2)
             }
             retrieved_docs.append(doc)
         
         return retrieved_docs
     
-    def semantic_search(self, query: str, language: Optional[str] = None, 
-                       n_results: int = 5) -> List[Dict[str, Any]]:
-        """Semantic search with optional filters"""
-        results = self.retrieve(query=query, n_results=n_results)
+    def _exact_search(self, query_embeddings: np.ndarray, candidate_ids: List[str],
+                      n_results: int) -> List[List[Dict[str, Any]]]:
+        """Score a small candidate set exactly instead of scanning the HNSW index"""
+        candidates = self.collection.get(
+            ids=candidate_ids,
+            include=['embeddings', 'documents', 'metadatas']
+        )
+        matrix = np.asarray(candidates['embeddings'], dtype=np.float32)
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        
+        # Squared L2 for every (query, candidate) pair, matching ChromaDB's
+        # default distance space
+        distances = (
+            (queries ** 2).sum(axis=1)[:, None]
+            + (matrix ** 2).sum(axis=1)[None, :]
+            - 2 * queries @ matrix.T
+        )
+        np.maximum(distances, 0, out=distances)
+        
+        k = min(n_results, matrix.shape[0])
+        top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        order = np.take_along_axis(distances, top, axis=1).argsort(axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        
+        results = {
+            'ids': [[candidates['ids'][i] for i in row] for row in top],
+            'documents': [[candidates['documents'][i] for i in row] for row in top],
+            'metadatas': [[candidates['metadatas'][i] for i in row] for row in top],
+            'distances': [[float(distances[q, i]) for i in row] for q, row in enumerate(top)]
+        }
+        return [self._format_results(results, q) for q in range(len(top))]
+    
+    def _vector_search(self, query_embeddings: np.ndarray, n_results: int,
+                       filters: Dict[str, Any],
+                       candidate_ids: Optional[Set[str]]) -> List[List[Dict[str, Any]]]:
+        """Dense search, exact over small filtered candidate sets, HNSW otherwise"""
+        where = None
+        if candidate_ids is not None:
+            if len(candidate_ids) <= self.exact_scan_threshold:
+                return self._exact_search(query_embeddings, sorted(candidate_ids), n_results)
+            
+            n_results = min(n_results, len(candidate_ids))
+            where = self._build_where(filters)
+        
+        results = self.collection.query(
+            query_embeddings=query_embeddings.tolist(),
+            n_results=n_results,
+            where=where
+        )
+        return [self._format_results(results, q) for q in range(len(query_embeddings))]
+    
+    def _fuse(self, dense_docs: List[Dict[str, Any]], lexical_hits: List[Tuple[str, float]],
+              n_results: int, query_embedding: np.ndarray) -> List[Dict[str, Any]]:
+        """
+        Merge vector and BM25 rankings with weighted reciprocal rank fusion
+        
+        Results are ordered by the fused 'rrf_score'; 'distance' and
+        'relevance' stay the dense similarity to the query, computed from
+        the stored embedding for chunks only BM25 found.
+        """
+        scores: Dict[str, float] = {}
+        for rank, doc in enumerate(dense_docs):
+            scores[doc['id']] = (1 - self.hybrid_weight) / (self.rrf_k + rank + 1)
+        for rank, (doc_id, _) in enumerate(lexical_hits):
+            scores[doc_id] = scores.get(doc_id, 0.0) + self.hybrid_weight / (self.rrf_k + rank + 1)
+        
+        top = sorted(scores, key=lambda doc_id: -scores[doc_id])[:n_results]
+        docs = {doc['id']: doc for doc in dense_docs}
+        missing = [doc_id for doc_id in top if doc_id not in docs]
+        if missing:
+            fetched = self.collection.get(ids=missing, include=['embeddings', 'documents', 'metadatas'])
+            if len(fetched['ids']):
+                # Squared L2, as in _exact_search
+                matrix = np.asarray(fetched['embeddings'], dtype=np.float32)
+                distances = np.maximum(((matrix - query_embedding) ** 2).sum(axis=1), 0)
+                for doc_id, content, metadata, distance in zip(fetched['ids'], fetched['documents'],
+                                                               fetched['metadatas'], distances):
+                    docs[doc_id] = {'id': doc_id, 'content': content, 'metadata': metadata or {},
+                                    'distance': float(distance), 'relevance': 1 - float(distance) / 2}
+        
+        bm25_scores = dict(lexical_hits)
+        fused = []
+        for doc_id in top:
+            if doc_id not in docs:
+                continue
+            fused.append({
+                **docs[doc_id],
+                'rrf_score': scores[doc_id],
+                'bm25_score': bm25_scores.get(doc_id, 0.0)
+            })
+        return fused
+    
+    def _search_many(self, query_embeddings: np.ndarray, n_results: int,
+                     filters: Optional[Dict[str, Any]] = None,
+                     queries: Optional[List[str]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Search the collection with already-computed query embeddings
+        
+        When the query texts are given and hybrid_weight > 0, a BM25 search
+        runs in parallel with the vector search and both rankings are fused.
+        """
+        query_embeddings = np.asarray(query_embeddings, dtype=np.float32)
+        if query_embeddings.ndim == 1:
+            query_embeddings = query_embeddings[None, :]
+        filters = {k: v for k, v in (filters or {}).items() if v is not None}
+        
+        candidate_ids = None
+        if filters:
+            candidate_ids = self._get_metadata_index().candidates(filters)
+            if not candidate_ids:
+                return [[] for _ in range(len(query_embeddings))]
+        
+        if queries is None or self.hybrid_weight == 0.0:
+            return self._vector_search(query_embeddings, n_results, filters, candidate_ids)
+        
+        # Over-fetch both rankings so fusion can promote chunks ranked lower by one of them
+        bm25_index = self._get_bm25_index()
+        fetch_k = max(n_results * 4, 20)
+        fetch_k = max(1, min(fetch_k, len(candidate_ids) if candidate_ids is not None else len(bm25_index)))
+        lexical = self._lexical_executor.submit(bm25_index.search_many, queries, fetch_k, candidate_ids)
+        dense = self._vector_search(query_embeddings, fetch_k, filters, candidate_ids)
+        return [
+            self._fuse(dense_docs, lexical_hits, n_results, query_embedding)
+            for dense_docs, lexical_hits, query_embedding in zip(dense, lexical.result(), query_embeddings)
+        ]
+    
+    def _search(self, query_embedding: np.ndarray, n_results: int,
+                filters: Optional[Dict[str, Any]] = None,
+                query: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Search the collection with a single query embedding"""
+        queries = [query] if query is not None else None
+        return self._search_many(query_embedding, n_results, filters, queries)[0]
+    
+    def _check_filters(self, filters: Optional[Dict[str, Any]]):
+        if filters:
+            unknown = set(filters) - set(self.FILTERABLE_FIELDS)
+            if unknown:
+                raise ValueError(f"Unsupported filter fields: {sorted(unknown)}")
+    
+    def retrieve(self, query: str, n_results: int = 5,
+                 filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Retrieve relevant documents for a query
+        
+        Vector and BM25 results are fused by reciprocal rank fusion unless
+        hybrid_weight is 0, so exact identifiers (e.g. ZeroDivisionError)
+        are found even when the embedding misses them.
+        
+        Args:
+            query: Search query
+            n_results: Number of documents to return
+            filters: Optional metadata filters (field -> value or list of values)
+                on any of FILTERABLE_FIELDS
+        
+        Returns:
+            Retrieved documents ordered by relevance
+        """
+        self._check_filters(filters)
+        query_embedding = self.encode([query])[0]
+        return self._search(query_embedding, n_results, filters, query)
+    
+    def retrieve_many(self, queries: List[str], n_results: int = 5,
+                      filters: Optional[Dict[str, Any]] = None,
+                      batch_size: int = 1024) -> List[List[Dict[str, Any]]]:
+        """
+        Retrieve relevant documents for many queries at once
+        
+        Queries are embedded in batched forward passes and each batch is
+        sent to ChromaDB as a single vectorized query (fused with BM25 like
+        retrieve()).
+        
+        Args:
+            queries: Search queries
+            n_results: Number of documents to return per query
+            filters: Optional metadata filters applied to every query
+            batch_size: Queries per encode/query round trip
+        
+        Returns:
+            One list of retrieved documents per query, in input order
+        """
+        self._check_filters(filters)
+        results: List[List[Dict[str, Any]]] = []
+        for i in range(0, len(queries), batch_size):
+            batch = queries[i:i + batch_size]
+            query_embeddings = self.encode(batch)
+            results.extend(self._search_many(query_embeddings, n_results, filters, batch))
         return results
     
+    def semantic_search(self, query: str, language: Optional[str] = None, 
+                       n_results: int = 5, doc_type: Optional[str] = None,
+                       title: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Semantic search with optional metadata filters"""
+        filters = {'language': language, 'type': doc_type, 'title': title}
+        return self.retrieve(query=query, n_results=n_results, filters=filters)
+    
     def get_collection_stats(self) -> Dict[str, Any]:
         """Get statistics about the vector database"""
         count = self.collection.count()
@@ -106,9 +688,18 @@ class RAGEngine:
         return {
             'collection_name': self.collection_name,
             'document_count': count,
-            'embedding_model': str(self.embedding_model),
-            'persist_directory': self.persist_directory
+            'embedding_model': self.embedding_model_name,
+            'persist_directory': self.persist_directory,
+            'index_backend': self.index_backend,
+            'hybrid_weight': self.hybrid_weight,
+            'embedding_cache': self.get_embedding_cache_stats()
         }
+    
+    def get_embedding_cache_stats(self) -> Dict[str, Any]:
+        """Get statistics about the embedding cache"""
+        if self.embedding_cache is None:
+            return {'enabled': False}
+        return {'enabled': True, **self.embedding_cache.get_stats()}
 
 
 class DocumentChunker:
@@ -116,20 +707,28 @@ class DocumentChunker:
     
     @staticmethod
     def chunk_by_paragraphs(text: str, max_length: int = 1000) -> List[str]:
-        """Chunk text by paragraphs with max length"""
+        """
+        Chunk text by paragraphs with max length (in characters)
+        
+        Kept for compatibility; core.chunker.StructuredChunker sizes chunks
+        in tokens, keeps code blocks intact and streams large files.
+        """
         paragraphs = text.split('\n\n')
         chunks = []
-        current_chunk = ""
+        current_parts: List[str] = []
+        current_length = 0
         
         for para in paragraphs:
-            if len(current_chunk) + len(para) < max_length:
-                current_chunk += para + "\n\n"
+            if current_length + len(para) < max_length:
+                current_parts.append(para)
+                current_length += len(para) + 2
             else:
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                current_chunk = para + "\n\n"
+                if current_parts:
+                    chunks.append("\n\n".join(current_parts).strip())
+                current_parts = [para]
+                current_length = len(para) + 2
         
-        if current_chunk:
-            chunks.append(current_chunk.strip())
+        if current_parts:
+            chunks.append("\n\n".join(current_parts).strip())
         
         return chunks
\ No newline at end of file
@@ -0,0 +1,159 @@
+"""
+Reranker - Cross-encoder rescoring of retrieved chunks
+"""
+
+import time
+import hashlib
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from core import model_registry
+
+
+class CrossEncoderReranker:
+    """
+    Rescores (query, chunk) pairs with a small local cross-encoder.
+
+    Retrieval over-fetches candidates; the reranker scores them in batches,
+    keeps the best N and caches every (query hash, chunk ID) score with
+    LRU eviction, so repeated and overlapping questions skip the model.
+    Rerank latency is tracked on its own so over-fetch depth can be tuned
+    against the latency budget.
+    """
+
+    def __init__(self,
+                 model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+                 batch_size: int = 32,
+                 max_cached_scores: int = 100000,
+                 max_latency_records: int = 500):
+        """
+        Initialize Cross-Encoder Reranker
+
+        Args:
+            model_name: sentence-transformers CrossEncoder model name
+            batch_size: Pairs per forward pass
+            max_cached_scores: Maximum cached pair scores (LRU)
+            max_latency_records: Rerank calls kept for latency percentiles
+        """
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_cached_scores = max_cached_scores
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._scores: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._latencies = deque(maxlen=max_latency_records)
+        self._lock = threading.Lock()
+        self._model_key = model_registry.cross_encoder_key(model_name)
+
+    @property
+    def model(self):
+        """CrossEncoder, loaded on first use and shared process-wide"""
+        return model_registry.registry.get(self._model_key)
+
+    @staticmethod
+    def _query_hash(query: str) -> str:
+        return hashlib.sha1(query.strip().encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _chunk_key(doc: Dict[str, Any]) -> str:
+        if doc.get('id'):
+            return doc['id']
+        return hashlib.sha1(doc['content'].encode('utf-8')).hexdigest()
+
+    def score(self, query: str, docs: List[Dict[str, Any]]) -> np.ndarray:
+        """Cross-encoder score for each doc, served from the cache when possible"""
+        query_hash = self._query_hash(query)
+        keys = [(query_hash, self._chunk_key(doc)) for doc in docs]
+        scores = np.zeros(len(docs), dtype=np.float32)
+        missing: Dict[Tuple[str, str], List[int]] = {}
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                cached = self._scores.get(key)
+                if cached is None:
+                    missing.setdefault(key, []).append(i)
+                else:
+                    self._scores.move_to_end(key)
+                    scores[i] = cached
+            self.hits += len(docs) - sum(len(positions) for positions in missing.values())
+            self.misses += sum(len(positions) for positions in missing.values())
+
+        if missing:
+            miss_keys = list(missing)
+            pairs = [(query, docs[missing[key][0]]['content']) for key in miss_keys]
+            predicted = np.asarray(
+                self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False),
+                dtype=np.float32
+            )
+
+            with self._lock:
+                for key, value in zip(miss_keys, predicted):
+                    for i in missing[key]:
+                        scores[i] = value
+                    self._scores[key] = float(value)
+                while len(self._scores) > self.max_cached_scores:
+                    self._scores.popitem(last=False)
+                    self.evictions += 1
+
+        return scores
+
+    def rerank(self, query: str, docs: List[Dict[str, Any]],
+               top_n: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Reorder retrieved chunks by cross-encoder score
+
+        Args:
+            query: User question
+            docs: Retrieved chunks with 'content' (and 'id' if known)
+            top_n: Number of chunks to keep (default: all)
+
+        Returns:
+            Copies of the best chunks, best first, with 'rerank_score' and
+            'relevance' (the sigmoid of the score, so later stages that sort
+            by relevance keep the reranked order)
+        """
+        if not docs:
+            return []
+
+        start = time.perf_counter()
+        scores = self.score(query, docs)
+        order = np.argsort(-scores, kind='stable')[:top_n]
+        reranked = [
+            {**docs[i], 'rerank_score': float(scores[i]),
+             'relevance': float(1.0 / (1.0 + np.exp(-scores[i])))}
+            for i in order
+        ]
+
+        with self._lock:
+            self._latencies.append((len(docs), time.perf_counter() - start))
+        return reranked
+
+    def clear(self):
+        """Drop every cached score"""
+        with self._lock:
+            self._scores.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache and rerank latency statistics"""
+        with self._lock:
+            latencies = sorted(seconds for _, seconds in self._latencies)
+            depths = [depth for depth, _ in self._latencies]
+        lookups = self.hits + self.misses
+        return {
+            'model': self.model_name,
+            'cached_scores': len(self._scores),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'reranks': len(latencies),
+            'mean_candidates': sum(depths) / len(depths) if depths else 0.0,
+            'latency_p50': latencies[len(latencies) // 2] if latencies else None,
+            'latency_p95': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else None
+        }
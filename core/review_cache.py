@@ -0,0 +1,253 @@
+"""
+Review Cache - Reuse code reviews across formatting-only resubmissions
+"""
+
+import io
+import os
+import re
+import ast
+import json
+import time
+import sqlite3
+import hashlib
+import tokenize
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+# Languages whose comments start with '#'; everything else is treated as
+# C-family ('//' and '/* */'), and PHP accepts both
+HASH_COMMENT_LANGUAGES = {'ruby', 'shell', 'bash', 'r', 'perl'}
+
+_STRING = r"\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*'|`(?:\\.|[^`\\])*`"
+_SLASH_TOKENS = re.compile(rf"({_STRING})|(//[^\n]*|/\*.*?\*/)|(\s+)", re.DOTALL)
+_HASH_TOKENS = re.compile(rf"({_STRING})|(#[^\n]*)|(\s+)", re.DOTALL)
+_BOTH_TOKENS = re.compile(rf"({_STRING})|(//[^\n]*|/\*.*?\*/|#[^\n]*)|(\s+)", re.DOTALL)
+_WORD_CHAR = re.compile(r"\w")
+
+
+def _normalize_python(code: str) -> str:
+    """AST dump, or the token stream without comments for code that does not parse"""
+    try:
+        return "ast:" + ast.dump(ast.parse(code), annotate_fields=False)
+    except (SyntaxError, ValueError):
+        pass
+
+    try:
+        tokens = [
+            f"{token.type}:{token.string}"
+            for token in tokenize.generate_tokens(io.StringIO(code).readline)
+            if token.type not in (tokenize.COMMENT, tokenize.NL, tokenize.ENDMARKER)
+        ]
+        return "tok:" + "\x1f".join(tokens)
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return "text:" + _normalize_text(code, _HASH_TOKENS)
+
+
+def _normalize_text(code: str, pattern: "re.Pattern") -> str:
+    """
+    Drop comments and insignificant whitespace outside string literals
+
+    Whitespace survives only as a single space between two word characters
+    (e.g. "int x"), so re-indenting or re-spacing operators does not change
+    the result.
+    """
+    out = []
+    position = 0
+    for match in pattern.finditer(code):
+        out.append(code[position:match.start()])
+        position = match.end()
+        string, comment, space = match.groups()
+        if string:
+            out.append(string)
+        elif comment or space:
+            out.append("\x00")
+    out.append(code[position:])
+
+    parts = "".join(out).split("\x00")
+    normalized = parts[0]
+    for part in parts[1:]:
+        if not part:
+            continue
+        if normalized and _WORD_CHAR.match(normalized[-1]) and _WORD_CHAR.match(part[0]):
+            normalized += " "
+        normalized += part
+    return normalized
+
+
+def normalize_code(code: str, language: str) -> str:
+    """
+    Canonical form of a submission for cache keys
+
+    Python is compared by AST (falling back to its token stream for code
+    with syntax errors); other languages by their text with comments and
+    formatting whitespace removed.
+    """
+    language = language.lower()
+    if language == 'python':
+        return _normalize_python(code)
+    if language == 'php':
+        return "text:" + _normalize_text(code, _BOTH_TOKENS)
+    if language in HASH_COMMENT_LANGUAGES:
+        return "text:" + _normalize_text(code, _HASH_TOKENS)
+    return "text:" + _normalize_text(code, _SLASH_TOKENS)
+
+
+def code_hash(code: str, language: str) -> str:
+    """SHA-256 of the normalized submission"""
+    return hashlib.sha256(normalize_code(code, language).encode('utf-8')).hexdigest()
+
+
+class ReviewCache:
+    """
+    Persistent exact-match review cache with TTL and LRU eviction.
+
+    Entries are keyed on (normalized code hash, language, review_type,
+    level), so whitespace- or comment-only edits hit the same entry.
+    """
+
+    def __init__(self,
+                 cache_path: str = "./data/cache/review_cache.sqlite3",
+                 max_entries: int = 5000,
+                 ttl_seconds: Optional[float] = 30 * 24 * 3600):
+        """
+        Initialize Review Cache
+
+        Args:
+            cache_path: SQLite file used to persist entries
+            max_entries: Maximum entries kept before LRU eviction
+            ttl_seconds: Entry lifetime in seconds (None disables expiry)
+        """
+        self.cache_path = cache_path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+        self._initialize_store()
+
+    def _initialize_store(self):
+        """Open the SQLite store and load live entries into memory"""
+        directory = os.path.dirname(self.cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.cache_path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS reviews (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+
+        if self.ttl_seconds is not None:
+            self._conn.execute(
+                "DELETE FROM reviews WHERE created_at < ?",
+                (time.time() - self.ttl_seconds,)
+            )
+            self._conn.commit()
+
+        rows = self._conn.execute(
+            "SELECT key, response, created_at FROM reviews ORDER BY last_access ASC"
+        ).fetchall()
+        for key, response, created_at in rows:
+            self._entries[key] = {'response': json.loads(response), 'created_at': created_at}
+
+        self._evict_overflow()
+
+    @staticmethod
+    def cache_key(code: str, language: str, review_type: str, level: str) -> str:
+        """Build the cache key for a review request"""
+        return f"{code_hash(code, language)}|{language.lower()}|{review_type.lower()}|{level.lower()}"
+
+    def _forget(self, key: str):
+        self._entries.pop(key, None)
+        self._conn.execute("DELETE FROM reviews WHERE key = ?", (key,))
+
+    def _evict_overflow(self):
+        """Evict least recently used entries above max_entries"""
+        while len(self._entries) > self.max_entries:
+            self._forget(next(iter(self._entries)))
+            self.evictions += 1
+        self._conn.commit()
+
+    def lookup(self,
+               code: str,
+               language: str,
+               review_type: str,
+               level: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached review
+
+        Returns:
+            Cached response dictionary, or None on a miss
+        """
+        key = self.cache_key(code, language, review_type, level)
+        with self._lock:
+            entry = self._entries.get(key)
+            now = time.time()
+            if entry is not None and self.ttl_seconds is not None and now - entry['created_at'] > self.ttl_seconds:
+                self._forget(key)
+                self._conn.commit()
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._conn.execute("UPDATE reviews SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+
+            response = dict(entry['response'])
+            response['cached'] = True
+            return response
+
+    def store(self,
+              code: str,
+              language: str,
+              review_type: str,
+              level: str,
+              response: Dict[str, Any]):
+        """
+        Store a review
+
+        Args:
+            response: JSON-serializable response dictionary
+        """
+        key = self.cache_key(code, language, review_type, level)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO reviews (key, response, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(response), now, now)
+            )
+            self._entries.pop(key, None)
+            self._entries[key] = {'response': response, 'created_at': now}
+            self._evict_overflow()
+
+    def clear(self):
+        """Remove every cached entry"""
+        with self._lock:
+            self._conn.execute("DELETE FROM reviews")
+            self._conn.commit()
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss statistics"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions
+        }
@@ -0,0 +1,267 @@
+"""
+Sandbox - Run generated Python solutions against their test cases in
+resource-limited subprocesses
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import hashlib
+import tempfile
+import threading
+import subprocess
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+
+# Runs inside the child interpreter. Reads {code, function_name, tests,
+# limits} from stdin, applies the rlimits to itself, and writes one JSON line
+# per test as soon as it finishes, so a test that hangs or exhausts a limit
+# still leaves the earlier results behind.
+HARNESS = r'''
+import io, sys, json, math, contextlib
+try:
+    import resource
+except ImportError:  # Windows: only the wall-clock limit applies
+    resource = None
+
+def same(actual, expected):
+    if isinstance(expected, float) or isinstance(actual, float):
+        try:
+            return math.isclose(actual, expected, rel_tol=1e-6, abs_tol=1e-9)
+        except TypeError:
+            return False
+    if isinstance(expected, list) and isinstance(actual, list):
+        return len(actual) == len(expected) and all(same(a, e) for a, e in zip(actual, expected))
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        return actual.keys() == expected.keys() and all(same(actual[k], expected[k]) for k in expected)
+    return actual == expected
+
+def emit(record):
+    sys.__stdout__.write(json.dumps(record) + "\n")
+    sys.__stdout__.flush()
+
+payload = json.loads(sys.stdin.read())
+if resource is not None:
+    for name, (soft, hard) in payload["limits"].items():
+        if hasattr(resource, name):
+            try:
+                resource.setrlimit(getattr(resource, name), (soft, hard))
+            except (ValueError, OSError):
+                pass
+namespace = {"__name__": "solution"}
+try:
+    with contextlib.redirect_stdout(io.StringIO()):
+        exec(compile(payload["code"], "solution.py", "exec"), namespace)
+    function = namespace[payload["function_name"]]
+except BaseException as e:
+    emit({"load_error": f"{type(e).__name__}: {e}"})
+    sys.exit(0)
+
+for index, test in enumerate(payload["tests"]):
+    record = {"index": index}
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            actual = function(*test["args"])
+        actual = json.loads(json.dumps(actual, default=repr))
+        record["actual"] = actual
+        record["passed"] = same(actual, test["expected"])
+    except BaseException as e:
+        record["passed"] = False
+        record["error"] = f"{type(e).__name__}: {e}"
+    emit(record)
+'''
+
+
+def _hash(value: Any) -> str:
+    if not isinstance(value, str):
+        value = json.dumps(value, sort_keys=True)
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+
+class SandboxRunner:
+    """
+    Runs untrusted solutions in throwaway interpreters.
+
+    Each run gets a fresh `python -I` subprocess in an empty temporary
+    directory with a scrubbed environment and rlimits on CPU time, address
+    space, open files, file size and process count; a wall-clock timer
+    kills the whole process group. Runs are spread over max_workers
+    concurrent subprocesses, and results are cached in memory by
+    (solution hash, tests hash).
+
+    This contains runaway and resource-hungry code; it is not a security
+    boundary (there is no filesystem or network isolation).
+    """
+
+    def __init__(self,
+                 max_workers: Optional[int] = None,
+                 cpu_seconds: int = 2,
+                 memory_mb: int = 256,
+                 wall_seconds: float = 5.0,
+                 max_cached_results: int = 2000):
+        """
+        Initialize Sandbox Runner
+
+        Args:
+            max_workers: Concurrent sandboxes (default: CPU count)
+            cpu_seconds: CPU-time limit per run
+            memory_mb: Address-space limit per run
+            wall_seconds: Wall-clock limit per run (covers sleeping code)
+            max_cached_results: Results kept in the LRU cache
+        """
+        self.max_workers = max_workers or os.cpu_count() or 2
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.wall_seconds = wall_seconds
+        self.max_cached_results = max_cached_results
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="sandbox")
+        self._cache: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'runs': 0, 'cache_hits': 0, 'timeouts': 0, 'total_seconds': 0.0}
+
+    def _limits(self) -> Dict[str, Tuple[int, int]]:
+        """(soft, hard) rlimits the harness applies to itself before loading the solution"""
+        memory = self.memory_mb * 1024 * 1024
+        return {
+            # SIGXCPU at the soft limit, SIGKILL a second later
+            'RLIMIT_CPU': (self.cpu_seconds, self.cpu_seconds + 1),
+            'RLIMIT_AS': (memory, memory),
+            'RLIMIT_NOFILE': (32, 32),
+            'RLIMIT_FSIZE': (1024 * 1024, 1024 * 1024),
+            'RLIMIT_NPROC': (0, 0)
+        }
+
+    def _execute(self, code: str, function_name: str, tests: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Run one solution in a fresh subprocess"""
+        payload = json.dumps({'code': code, 'function_name': function_name, 'tests': tests,
+                              'limits': self._limits()})
+        start = time.perf_counter()
+        timed_out = False
+
+        with tempfile.TemporaryDirectory(prefix="codementor_sandbox_") as workdir:
+            process = subprocess.Popen(
+                [sys.executable, "-I", "-c", HARNESS],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                cwd=workdir,
+                env={'PATH': os.environ.get('PATH', ''), 'PYTHONHASHSEED': '0'},
+                start_new_session=True,
+                text=True
+            )
+            try:
+                stdout, stderr = process.communicate(payload, timeout=self.wall_seconds)
+            except subprocess.TimeoutExpired:
+                timed_out = True
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except (OSError, AttributeError):
+                    process.kill()
+                stdout, stderr = process.communicate()
+
+        elapsed = time.perf_counter() - start
+        results: Dict[int, Dict[str, Any]] = {}
+        load_error = None
+        for line in stdout.splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if 'load_error' in record:
+                load_error = record['load_error']
+            elif 'index' in record:
+                results[record['index']] = record
+
+        # Tests without a result were running (or queued) when the process died
+        killed_by = None
+        if timed_out:
+            killed_by = f"wall-clock limit ({self.wall_seconds:g}s)"
+        elif process.returncode and process.returncode < 0:
+            killed_by = {signal.SIGXCPU: f"CPU limit ({self.cpu_seconds}s)",
+                         signal.SIGKILL: "killed"}.get(-process.returncode, f"signal {-process.returncode}")
+        elif process.returncode:
+            tail = stderr.strip().splitlines()[-1:] if stderr else []
+            killed_by = tail[0] if tail else f"exit code {process.returncode}"
+            if 'MemoryError' in killed_by:
+                killed_by = f"memory limit ({self.memory_mb} MB)"
+
+        test_results = []
+        for index, test in enumerate(tests):
+            record = results.get(index)
+            if record is None:
+                record = {'index': index, 'passed': False,
+                          'error': load_error or (killed_by if index == len(results) else "not run")}
+            record['args'] = test['args']
+            record['expected'] = test['expected']
+            test_results.append(record)
+
+        with self._lock:
+            self._stats['runs'] += 1
+            self._stats['total_seconds'] += elapsed
+            if timed_out:
+                self._stats['timeouts'] += 1
+
+        return {
+            'passed': bool(tests) and load_error is None and all(r['passed'] for r in test_results),
+            'n_passed': sum(1 for r in test_results if r['passed']),
+            'n_tests': len(tests),
+            'results': test_results,
+            'error': load_error or killed_by,
+            'elapsed': elapsed
+        }
+
+    def run(self, code: str, function_name: str, tests: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Run a solution against its test cases
+
+        Args:
+            code: Python source defining function_name
+            function_name: Function under test
+            tests: [{'args': [...], 'expected': ...}] with JSON values
+
+        Returns:
+            Dictionary with 'passed', 'n_passed', 'n_tests', per-test
+            'results', 'error' (load error or the limit that was hit),
+            'elapsed' and 'cached'
+        """
+        return self.run_many([(code, function_name, tests)])[0]
+
+    def run_many(self, jobs: List[Tuple[str, str, List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+        """Run several (code, function_name, tests) jobs concurrently, in order"""
+        outputs: List[Optional[Dict[str, Any]]] = [None] * len(jobs)
+        futures = {}
+        for i, (code, function_name, tests) in enumerate(jobs):
+            key = (_hash(code), _hash({'function_name': function_name, 'tests': tests}))
+            with self._lock:
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    self._stats['cache_hits'] += 1
+            if cached is not None:
+                outputs[i] = dict(cached, cached=True)
+            else:
+                futures[i] = (key, self._executor.submit(self._execute, code, function_name, tests))
+
+        for i, (key, future) in futures.items():
+            result = future.result()
+            with self._lock:
+                self._cache[key] = result
+                while len(self._cache) > self.max_cached_results:
+                    self._cache.popitem(last=False)
+            outputs[i] = dict(result, cached=False)
+        return outputs
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get run, cache and timing counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['cached_results'] = len(self._cache)
+        lookups = stats['runs'] + stats['cache_hits']
+        stats['cache_hit_rate'] = stats['cache_hits'] / lookups if lookups else 0.0
+        stats['mean_run_seconds'] = stats['total_seconds'] / stats['runs'] if stats['runs'] else 0.0
+        return stats
+
+    def close(self):
+        self._executor.shutdown(wait=False)
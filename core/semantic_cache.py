@@ -0,0 +1,280 @@
+"""
+Semantic Cache - Reuse answers for near-duplicate questions
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+
+class SemanticCache:
+    """
+    Persistent semantic response cache with TTL and LRU eviction.
+
+    Entries are scoped by (language, level, n_context_docs, include_examples)
+    and matched on the cosine similarity of normalized question embeddings.
+    """
+
+    def __init__(self,
+                 embedding_model,
+                 cache_path: str = "./data/cache/semantic_cache.sqlite3",
+                 similarity_threshold: float = 0.92,
+                 ttl_seconds: Optional[float] = 7 * 24 * 3600,
+                 max_entries: int = 10000):
+        """
+        Initialize Semantic Cache
+
+        Args:
+            embedding_model: Loaded SentenceTransformer (shared with RAGEngine)
+            cache_path: SQLite file used to persist entries
+            similarity_threshold: Minimum cosine similarity for a hit
+            ttl_seconds: Entry lifetime in seconds (None disables expiry)
+            max_entries: Maximum entries kept before LRU eviction
+        """
+        self.embedding_model = embedding_model
+        self.cache_path = cache_path
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._scope_ids: Dict[str, List[int]] = {}
+        self._scope_matrix: Dict[str, np.ndarray] = {}
+        self._last_embedding: Tuple[str, Optional[np.ndarray]] = ("", None)
+
+        self._initialize_store()
+
+    def _initialize_store(self):
+        """Open the SQLite store and load live entries into memory"""
+        directory = os.path.dirname(self.cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.cache_path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                scope TEXT NOT NULL,
+                question TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+
+        if self.ttl_seconds is not None:
+            self._conn.execute(
+                "DELETE FROM entries WHERE created_at < ?",
+                (time.time() - self.ttl_seconds,)
+            )
+            self._conn.commit()
+
+        rows = self._conn.execute(
+            "SELECT id, scope, question, embedding, response, created_at "
+            "FROM entries ORDER BY last_access ASC"
+        ).fetchall()
+
+        for entry_id, scope, question, blob, response, created_at in rows:
+            self._remember(entry_id, {
+                'scope': scope,
+                'question': question,
+                'embedding': np.frombuffer(blob, dtype=np.float32),
+                'response': json.loads(response),
+                'created_at': created_at
+            })
+
+        self._evict_overflow()
+
+    @staticmethod
+    def normalize_question(question: str) -> str:
+        """Normalize question text before embedding"""
+        text = re.sub(r"\s+", " ", question.strip().lower())
+        return text.rstrip("?!. ")
+
+    @staticmethod
+    def scope_key(language: str, level: str, n_context_docs: int, include_examples: bool = True) -> str:
+        """Build the cache scope for a request"""
+        examples = "examples" if include_examples else "no-examples"
+        return f"{language.lower()}|{level.lower()}|{n_context_docs}|{examples}"
+
+    def _embed(self, question: str) -> np.ndarray:
+        """Embed a normalized question, reusing the last embedding if possible"""
+        normalized = self.normalize_question(question)
+        last_question, last_vector = self._last_embedding
+        if last_vector is not None and last_question == normalized:
+            return last_vector
+
+        vector = self.embedding_model.encode(
+            [normalized], normalize_embeddings=True
+        )[0]
+        vector = np.asarray(vector, dtype=np.float32)
+        self._last_embedding = (normalized, vector)
+        return vector
+
+    def _remember(self, entry_id: int, entry: Dict[str, Any]):
+        """Add an entry to the in-memory index"""
+        self._entries[entry_id] = entry
+        self._scope_ids.setdefault(entry['scope'], []).append(entry_id)
+        self._scope_matrix.pop(entry['scope'], None)
+
+    def _forget(self, entry_id: int):
+        """Remove an entry from memory and disk"""
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        self._scope_ids[entry['scope']].remove(entry_id)
+        self._scope_matrix.pop(entry['scope'], None)
+        self._conn.execute("DELETE FROM entries WHERE id = ?", (entry_id,))
+
+    def _evict_overflow(self):
+        """Evict least recently used entries above max_entries"""
+        while len(self._entries) > self.max_entries:
+            entry_id = next(iter(self._entries))
+            self._forget(entry_id)
+            self.evictions += 1
+        self._conn.commit()
+
+    def _is_expired(self, entry: Dict[str, Any], now: float) -> bool:
+        return self.ttl_seconds is not None and now - entry['created_at'] > self.ttl_seconds
+
+    def _matrix_for(self, scope: str) -> Tuple[List[int], Optional[np.ndarray]]:
+        """Get (ids, embedding matrix) for a scope, stacking lazily"""
+        ids = self._scope_ids.get(scope) or []
+        if not ids:
+            return ids, None
+
+        matrix = self._scope_matrix.get(scope)
+        if matrix is None:
+            matrix = np.vstack([self._entries[i]['embedding'] for i in ids])
+            self._scope_matrix[scope] = matrix
+        return ids, matrix
+
+    def lookup(self,
+               question: str,
+               language: str,
+               level: str,
+               n_context_docs: int,
+               include_examples: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached response for a near-duplicate question
+
+        Args:
+            question: User's question
+            language: Programming language context
+            level: User's skill level
+            n_context_docs: Number of context documents requested
+            include_examples: Whether the answer was asked to include code examples
+
+        Returns:
+            Cached response dictionary, or None on a miss
+        """
+        vector = self._embed(question)
+        scope = self.scope_key(language, level, n_context_docs, include_examples)
+
+        with self._lock:
+            now = time.time()
+            # Drop expired entries first so an expired best match cannot
+            # hide a live one above the threshold
+            expired = [i for i in self._scope_ids.get(scope, []) if self._is_expired(self._entries[i], now)]
+            if expired:
+                for entry_id in expired:
+                    self._forget(entry_id)
+                self._conn.commit()
+
+            ids, matrix = self._matrix_for(scope)
+            if matrix is None:
+                self.misses += 1
+                return None
+
+            similarities = matrix @ vector
+            best = int(np.argmax(similarities))
+            entry_id = ids[best]
+            entry = self._entries[entry_id]
+
+            if similarities[best] < self.similarity_threshold:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(entry_id)
+            self._conn.execute(
+                "UPDATE entries SET last_access = ? WHERE id = ?", (now, entry_id)
+            )
+            self._conn.commit()
+            self.hits += 1
+
+            response = dict(entry['response'])
+            response['cached'] = True
+            response['cache_similarity'] = float(similarities[best])
+            return response
+
+    def store(self,
+              question: str,
+              language: str,
+              level: str,
+              n_context_docs: int,
+              response: Dict[str, Any],
+              include_examples: bool = True):
+        """
+        Store a response for a question
+
+        Args:
+            question: User's question
+            language: Programming language context
+            level: User's skill level
+            n_context_docs: Number of context documents requested
+            response: JSON-serializable response dictionary
+            include_examples: Whether the answer was asked to include code examples
+        """
+        vector = self._embed(question)
+        scope = self.scope_key(language, level, n_context_docs, include_examples)
+        now = time.time()
+
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO entries (scope, question, embedding, response, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (scope, question, vector.tobytes(), json.dumps(response), now, now)
+            )
+            self._remember(cursor.lastrowid, {
+                'scope': scope,
+                'question': question,
+                'embedding': vector,
+                'response': response,
+                'created_at': now
+            })
+            self._evict_overflow()
+
+    def clear(self):
+        """Remove every cached entry"""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+            self._entries.clear()
+            self._scope_ids.clear()
+            self._scope_matrix.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss statistics"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'similarity_threshold': self.similarity_threshold
+        }
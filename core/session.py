@@ -0,0 +1,389 @@
+"""
+Session - Multi-turn conversations with rolling history compression
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Dict, List, Any, Optional, Set
+
+SUMMARY_SYSTEM_PROMPT = """You maintain a running summary of a programming tutoring conversation.
+Keep the student's goals, level, code they shared, conclusions reached and open questions.
+Drop pleasantries and repeated explanations. Write compact prose, no headings."""
+
+
+class ConversationSession:
+    """
+    One user's conversation: a rolling summary of older turns, the recent
+    turns verbatim, and the RAG chunks retrieved so far.
+    """
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.summary = ""
+        self.summary_tokens = 0
+        self.messages: List[Dict[str, Any]] = []
+        self.context: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.turn_count = 0
+        self.updated_at = time.time()
+        self.lock = threading.Lock()
+        # Set while the oldest messages are being summarized in the background
+        self.compacting = False
+        self.discarded = False
+
+    @property
+    def history_tokens(self) -> int:
+        """Tokens of the recent messages kept verbatim"""
+        return sum(message['tokens'] for message in self.messages)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'session_id': self.session_id,
+            'summary': self.summary,
+            'summary_tokens': self.summary_tokens,
+            'messages': [dict(message) for message in self.messages],
+            'context': [(key, dict(doc)) for key, doc in self.context.items()],
+            'turn_count': self.turn_count,
+            'updated_at': self.updated_at
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ConversationSession":
+        session = cls(data['session_id'])
+        session.summary = data.get('summary', "")
+        session.summary_tokens = data.get('summary_tokens', 0)
+        session.messages = data.get('messages', [])
+        session.context = OrderedDict(data.get('context', []))
+        session.turn_count = data.get('turn_count', 0)
+        session.updated_at = data.get('updated_at', time.time())
+        return session
+
+
+class SessionManager:
+    """
+    Keeps per-user conversation state under a token budget.
+
+    Recent messages are kept verbatim until they exceed
+    history_token_budget; the oldest ones are then folded into the rolling
+    summary with one LLM call that sees only the previous summary and the
+    evicted messages. The call runs on a background thread, off the request
+    path and without holding the session lock; the evicted messages stay in
+    the prompt until the new summary is swapped in. The prompt for turn N
+    is therefore bounded by summary + history budget + packed context
+    instead of growing with N.
+    Chunks retrieved in earlier turns stay in a small, decaying working set
+    so follow-up questions keep the context they refer to.
+    """
+
+    def __init__(self,
+                 llm_handler,
+                 history_token_budget: int = 1000,
+                 summary_token_budget: int = 250,
+                 min_recent_messages: int = 2,
+                 max_context_docs: int = 12,
+                 context_decay: float = 0.85,
+                 max_sessions: int = 1000,
+                 ttl_seconds: Optional[float] = 24 * 3600,
+                 store_path: Optional[str] = None,
+                 summary_workers: int = 2):
+        """
+        Initialize Session Manager
+
+        Args:
+            llm_handler: LLM handler used for token counting and summaries
+            history_token_budget: Tokens of recent messages kept verbatim
+            summary_token_budget: Maximum tokens of the rolling summary
+            min_recent_messages: Messages never summarized away (the last exchange)
+            max_context_docs: Size of each session's retrieved-chunk working set
+            context_decay: Relevance multiplier applied to older chunks every turn
+            max_sessions: Sessions kept in memory (LRU)
+            ttl_seconds: Idle time after which a session expires (None disables expiry)
+            store_path: Optional SQLite file to persist sessions across restarts
+            summary_workers: Background threads running summary LLM calls
+        """
+        self.llm_handler = llm_handler
+        self.history_token_budget = history_token_budget
+        self.summary_token_budget = summary_token_budget
+        self.min_recent_messages = min_recent_messages
+        self.max_context_docs = max_context_docs
+        self.context_decay = context_decay
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+
+        self._sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=summary_workers, thread_name_prefix="session-summary")
+        self._pending: Set[Future] = set()
+        self._stats = {'turns': 0, 'compactions': 0, 'summarized_messages': 0,
+                       'summary_failures': 0, 'prompt_tokens': 0, 'prompts': 0}
+
+        self._conn = None
+        if store_path:
+            directory = os.path.dirname(store_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(store_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions "
+                "(session_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    # ------------------------------------------------------------------
+    # Session lifecycle
+    # ------------------------------------------------------------------
+
+    def _expired(self, session: ConversationSession) -> bool:
+        return self.ttl_seconds is not None and time.time() - session.updated_at > self.ttl_seconds
+
+    def get_session(self, session_id: str) -> ConversationSession:
+        """Get a session, loading it from the store or creating it"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and not self._expired(session):
+                self._sessions.move_to_end(session_id)
+                return session
+
+            session = self._load(session_id)
+            if session is None or self._expired(session):
+                session = ConversationSession(session_id)
+            self._sessions[session_id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return session
+
+    def reset_session(self, session_id: str):
+        """Forget a session's history and context"""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                # A summary still running must not write the session back
+                session.discarded = True
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                self._conn.commit()
+
+    def _load(self, session_id: str) -> Optional[ConversationSession]:
+        if self._conn is None:
+            return None
+        row = self._conn.execute(
+            "SELECT data FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return ConversationSession.from_dict(json.loads(row[0])) if row else None
+
+    def _save(self, data: Dict[str, Any]):
+        if self._conn is None:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, data, updated_at) VALUES (?, ?, ?)",
+                (data['session_id'], json.dumps(data), data['updated_at'])
+            )
+            self._conn.commit()
+
+    # ------------------------------------------------------------------
+    # Context reuse
+    # ------------------------------------------------------------------
+
+    def merge_context(self,
+                      session: ConversationSession,
+                      docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Merge this turn's retrieved chunks into the session working set
+
+        This turn's chunks come first, in the order given (fused or
+        reranked, best first). Chunks from earlier turns follow, ranked by
+        relevance that loses context_decay per turn, so a follow-up like
+        "show another example" still sees the chunks the previous answer
+        was based on.
+
+        Returns:
+            The working set, best first (ready for pack_context)
+        """
+        with session.lock:
+            for doc in session.context.values():
+                doc['relevance'] = doc.get('relevance', 0.0) * self.context_decay
+
+            fresh = []
+            for doc in docs:
+                key = doc.get('id') or hashlib.sha1(doc['content'].encode('utf-8')).hexdigest()
+                previous = session.context.pop(key, None)
+                merged = {'content': doc['content'], 'id': key,
+                          'metadata': doc.get('metadata', {}),
+                          'relevance': doc.get('relevance', 0.0)}
+                if previous is not None:
+                    merged['relevance'] = max(merged['relevance'], previous['relevance'])
+                if key not in fresh:
+                    fresh.append(key)
+                session.context[key] = merged
+
+            fresh = fresh[:self.max_context_docs]
+            earlier = sorted((key for key in session.context if key not in fresh),
+                             key=lambda key: session.context[key]['relevance'], reverse=True)
+            order = fresh + earlier[:self.max_context_docs - len(fresh)]
+            for key in [key for key in session.context if key not in order]:
+                del session.context[key]
+
+            return [dict(session.context[key]) for key in order]
+
+    # ------------------------------------------------------------------
+    # Prompt assembly and history compression
+    # ------------------------------------------------------------------
+
+    def build_messages(self,
+                       session: ConversationSession,
+                       user_message: str,
+                       system_message: Optional[str] = None) -> List[Dict[str, str]]:
+        """
+        Chat messages for the next turn: system prompt, rolling summary,
+        recent messages and the new user message
+        """
+        messages = []
+        if system_message:
+            messages.append({"role": "system", "content": system_message})
+        with session.lock:
+            if session.summary:
+                messages.append({"role": "system",
+                                 "content": f"Summary of the earlier conversation:\n{session.summary}"})
+            messages.extend({"role": m['role'], "content": m['content']} for m in session.messages)
+            history_tokens = session.summary_tokens + session.history_tokens
+        messages.append({"role": "user", "content": user_message})
+
+        with self._lock:
+            self._stats['prompts'] += 1
+            self._stats['prompt_tokens'] += history_tokens + self.llm_handler.count_tokens(user_message)
+        return messages
+
+    def record_turn(self, session: ConversationSession, user_message: str, assistant_message: str):
+        """
+        Append a finished exchange and compress older history if needed
+
+        Store the user's own words here, not the RAG-augmented prompt, so
+        retrieved context is never accumulated in the history.
+        """
+        with session.lock:
+            for role, content in (("user", user_message), ("assistant", assistant_message)):
+                session.messages.append({'role': role, 'content': content,
+                                         'tokens': self.llm_handler.count_tokens(content)})
+            session.turn_count += 1
+            session.updated_at = time.time()
+            self._start_compaction(session)
+            data = session.to_dict() if self._conn is not None else None
+        with self._lock:
+            self._stats['turns'] += 1
+        if data is not None:
+            self._save(data)
+
+    def _start_compaction(self, session: ConversationSession):
+        """Summarize the oldest messages in the background if the history is over budget (lock held)"""
+        if session.compacting or session.history_tokens <= self.history_token_budget:
+            return
+
+        tokens = session.history_tokens
+        n_evicted = 0
+        while tokens > self.history_token_budget and len(session.messages) - n_evicted > self.min_recent_messages:
+            tokens -= session.messages[n_evicted]['tokens']
+            n_evicted += 1
+        if not n_evicted:
+            return
+
+        session.compacting = True
+        future = self._executor.submit(self._compact, session, session.summary,
+                                       [dict(message) for message in session.messages[:n_evicted]])
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._finished)
+
+    def _finished(self, future: Future):
+        with self._lock:
+            self._pending.discard(future)
+
+    def _compact(self, session: ConversationSession, summary: str, evicted: List[Dict[str, Any]]):
+        """Fold the evicted messages into the summary, then swap it in (background thread)"""
+        updated = self._summarize(summary, evicted)
+        summary_tokens = self.llm_handler.count_tokens(updated)
+
+        with session.lock:
+            # Messages are only appended meanwhile, so the evicted ones are still first
+            session.summary = updated
+            session.summary_tokens = summary_tokens
+            del session.messages[:len(evicted)]
+            session.compacting = False
+            # Turns recorded during the call may have filled the budget again
+            self._start_compaction(session)
+            data = session.to_dict() if self._conn is not None and not session.discarded else None
+        with self._lock:
+            self._stats['compactions'] += 1
+            self._stats['summarized_messages'] += len(evicted)
+        if data is not None:
+            self._save(data)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait for background summaries; False if some are still running after timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                pending = set(self._pending)
+            if not pending:
+                return True
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            wait(pending, timeout=remaining)
+
+    def close(self):
+        """Finish background summaries and stop the worker threads"""
+        self._executor.shutdown(wait=True)
+
+    def _summarize(self, summary: str, messages: List[Dict[str, Any]]) -> str:
+        """Update the rolling summary with evicted messages (one bounded LLM call)"""
+        transcript = "\n\n".join(f"{m['role'].title()}: {m['content']}" for m in messages)
+        prompt = f"""Current summary:
+{summary or "(none yet)"}
+
+New conversation turns:
+{transcript}
+
+Rewrite the summary so it also covers the new turns, in at most {int(self.summary_token_budget * 0.75)} words."""
+
+        try:
+            updated = self.llm_handler.generate(
+                prompt=prompt,
+                system_message=SUMMARY_SYSTEM_PROMPT,
+                temperature=0.2,
+                max_tokens=self.summary_token_budget
+            ).strip()
+            if updated:
+                return self._truncate(updated)
+        except Exception as e:
+            print(f"Error summarizing conversation: {str(e)}")
+        with self._lock:
+            self._stats['summary_failures'] += 1
+
+        # Fall back to keeping the first line of each evicted message
+        lines = [summary] if summary else []
+        lines += [f"{m['role'].title()}: {m['content'].strip().splitlines()[0][:200]}"
+                  for m in messages if m['content'].strip()]
+        return self._truncate("\n".join(lines), keep_end=True)
+
+    def _truncate(self, text: str, keep_end: bool = False) -> str:
+        """Trim text to the summary budget by whole lines"""
+        lines = text.splitlines()
+        while len(lines) > 1 and self.llm_handler.count_tokens("\n".join(lines)) > self.summary_token_budget:
+            lines.pop(0 if keep_end else -1)
+        return "\n".join(lines)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get turn, compaction and prompt-size counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['sessions'] = len(self._sessions)
+            stats['pending_summaries'] = len(self._pending)
+        # Summary + recent history + new user prompt, excluding the system prompt
+        stats['mean_prompt_tokens'] = stats['prompt_tokens'] / stats['prompts'] if stats['prompts'] else 0.0
+        return stats
@@ -0,0 +1,237 @@
+"""
+Single Flight - Coalesce identical in-flight requests into one upstream call
+"""
+
+import json
+import asyncio
+import hashlib
+import threading
+import weakref
+from typing import Any, Awaitable, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional
+
+
+def request_key(**fields) -> str:
+    """Stable hash of request fields (model, messages, temperature, ...)"""
+    payload = json.dumps(fields, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class _FlightStats:
+    """Leader/follower counters shared by the sync and async variants"""
+
+    def __init__(self):
+        self.leaders = 0
+        self.coalesced = 0
+        self._stats_lock = threading.Lock()
+
+    def _count(self, leader: bool):
+        with self._stats_lock:
+            if leader:
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        calls = self.leaders + self.coalesced
+        return {
+            'calls': calls,
+            'upstream_calls': self.leaders,
+            'coalesced': self.coalesced,
+            'coalesce_rate': self.coalesced / calls if calls else 0.0
+        }
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class _StreamBuffer:
+    """Chunks produced so far by one upstream stream, readable by many"""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.condition = threading.Condition()
+
+    def read(self) -> Iterator[str]:
+        index = 0
+        while True:
+            with self.condition:
+                while index >= len(self.chunks) and not self.finished:
+                    self.condition.wait()
+                pending = self.chunks[index:]
+                finished = self.finished
+                error = self.error
+            for chunk in pending:
+                yield chunk
+            index += len(pending)
+            if finished and index >= len(self.chunks):
+                if error is not None:
+                    raise error
+                return
+
+
+class SingleFlight(_FlightStats):
+    """
+    Thread-based request coalescing.
+
+    The first caller for a key runs the upstream call; concurrent callers
+    with the same key wait for and share its result (or exception).
+    Streams are pumped by a background thread into a buffer that every
+    caller replays from the start, so late joiners still get the full text.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._streams: Dict[str, _StreamBuffer] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Run fn once per key across concurrent callers and share its result"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+        self._count(leader)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def do_stream(self, key: str, fn: Callable[[], Iterable[str]]) -> Iterator[str]:
+        """Share one upstream stream per key across concurrent callers"""
+        with self._lock:
+            buffer = self._streams.get(key)
+            leader = buffer is None
+            if leader:
+                buffer = _StreamBuffer()
+                self._streams[key] = buffer
+        self._count(leader)
+
+        if leader:
+            threading.Thread(target=self._pump, args=(key, buffer, fn), daemon=True).start()
+        return buffer.read()
+
+    def _pump(self, key: str, buffer: _StreamBuffer, fn: Callable[[], Iterable[str]]):
+        try:
+            for chunk in fn():
+                with buffer.condition:
+                    buffer.chunks.append(chunk)
+                    buffer.condition.notify_all()
+        except Exception as e:
+            buffer.error = e
+        finally:
+            with self._lock:
+                del self._streams[key]
+            with buffer.condition:
+                buffer.finished = True
+                buffer.condition.notify_all()
+
+
+class _AsyncStreamBuffer:
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Condition()
+        self.task: Optional[asyncio.Future] = None
+
+    async def read(self) -> AsyncIterator[str]:
+        index = 0
+        while True:
+            async with self.changed:
+                await self.changed.wait_for(lambda: index < len(self.chunks) or self.finished)
+                pending = self.chunks[index:]
+            for chunk in pending:
+                yield chunk
+            index += len(pending)
+            if self.finished and index >= len(self.chunks):
+                if self.error is not None:
+                    raise self.error
+                return
+
+
+class AsyncSingleFlight(_FlightStats):
+    """
+    asyncio request coalescing.
+
+    The upstream call runs in its own task, so cancelling one waiter
+    (e.g. a closed browser tab) does not cancel it for the others.
+    """
+
+    def __init__(self):
+        super().__init__()
+        # In-flight work is bound to an event loop, so track it per loop
+        self._calls = weakref.WeakKeyDictionary()
+        self._streams = weakref.WeakKeyDictionary()
+
+    def _for_loop(self, registry) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        table = registry.get(loop)
+        if table is None:
+            table = {}
+            registry[loop] = table
+        return table
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await fn once per key across concurrent callers and share its result"""
+        calls = self._for_loop(self._calls)
+        task = calls.get(key)
+        leader = task is None
+        if leader:
+            task = asyncio.ensure_future(fn())
+            calls[key] = task
+            task.add_done_callback(lambda _: calls.pop(key, None))
+        self._count(leader)
+        return await asyncio.shield(task)
+
+    async def do_stream(self, key: str, fn: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Share one upstream async stream per key across concurrent callers"""
+        streams = self._for_loop(self._streams)
+        buffer = streams.get(key)
+        leader = buffer is None
+        if leader:
+            buffer = _AsyncStreamBuffer()
+            streams[key] = buffer
+            # Keep a reference so the pump task is not garbage collected
+            buffer.task = asyncio.ensure_future(self._pump(streams, key, buffer, fn))
+        self._count(leader)
+
+        async for chunk in buffer.read():
+            yield chunk
+
+    @staticmethod
+    async def _pump(streams: Dict[str, Any], key: str, buffer: _AsyncStreamBuffer,
+                    fn: Callable[[], AsyncIterator[str]]):
+        try:
+            async for chunk in fn():
+                async with buffer.changed:
+                    buffer.chunks.append(chunk)
+                    buffer.changed.notify_all()
+        except Exception as e:
+            buffer.error = e
+        finally:
+            streams.pop(key, None)
+            async with buffer.changed:
+                buffer.finished = True
+                buffer.changed.notify_all()
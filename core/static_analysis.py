@@ -0,0 +1,360 @@
+"""
+Static Analysis - Fast local pre-review of Python submissions
+"""
+
+import ast
+import time
+from typing import Dict, List, Any, Set
+
+SEVERITY_PENALTY = {'error': 25, 'warning': 8, 'info': 3}
+COMPLEXITY_LIMIT = 10
+
+# Follows format_hints() in review prompts
+HINTS_INSTRUCTION = ("These findings were verified locally: explain the relevant ones instead of "
+                     "re-deriving them, and focus on what static analysis cannot see (logic bugs, "
+                     "naming, design).")
+
+_LOOPS = (ast.For, ast.AsyncFor, ast.While)
+_FUNCTIONS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)
+_LIST_BUILDERS = (ast.List, ast.ListComp)
+_STR_FUNCTIONS = ('str', 'repr', 'chr', 'format')
+_STR_METHODS = ('format', 'join', 'strip', 'lower', 'upper', 'replace')
+
+
+def _complexity(node: ast.AST) -> int:
+    """McCabe-style cyclomatic complexity of one function body"""
+    complexity = 1
+    for child in ast.walk(node):
+        if child is not node and isinstance(child, _FUNCTIONS):
+            continue
+        if isinstance(child, (ast.If, ast.IfExp, ast.Assert) + _LOOPS):
+            complexity += 1
+        elif isinstance(child, ast.ExceptHandler):
+            complexity += 1
+        elif isinstance(child, ast.BoolOp):
+            complexity += len(child.values) - 1
+        elif isinstance(child, ast.comprehension):
+            complexity += 1 + len(child.ifs)
+        elif type(child).__name__ == 'match_case':
+            complexity += 1
+    return complexity
+
+
+class _Analyzer(ast.NodeVisitor):
+    """Single pass collecting findings, loop depth and name usage"""
+
+    def __init__(self):
+        self.findings: List[Dict[str, Any]] = []
+        self.functions: List[Dict[str, Any]] = []
+        self.loop_depth = 0
+        self.max_loop_depth = 0
+        self.function_stack: List[str] = []
+        # Names bound to lists (module scope first) and assigned locals per function
+        self.list_names: List[Set[str]] = [set()]
+        self.str_names: List[Set[str]] = [set()]
+        self.local_scopes: List[Dict[str, int]] = []
+        self.imports: Dict[str, int] = {}
+        self.loaded: Set[str] = set()
+
+    def add(self, node: ast.AST, severity: str, kind: str, message: str):
+        self.findings.append({
+            'line': getattr(node, 'lineno', 0),
+            'severity': severity,
+            'kind': kind,
+            'message': message
+        })
+
+    def _is_list(self, name: str) -> bool:
+        return name in self.list_names[-1] or name in self.list_names[0]
+
+    def _is_str(self, name: str) -> bool:
+        return name in self.str_names[-1] or name in self.str_names[0]
+
+    @staticmethod
+    def _builds_string(value: ast.AST) -> bool:
+        """String literal, f-string, str()/repr() call or string method call"""
+        if isinstance(value, ast.Constant):
+            return isinstance(value.value, str)
+        if isinstance(value, ast.JoinedStr):
+            return True
+        if isinstance(value, ast.Call):
+            func = value.func
+            if isinstance(func, ast.Name):
+                return func.id in _STR_FUNCTIONS
+            return isinstance(func, ast.Attribute) and func.attr in _STR_METHODS
+        if isinstance(value, ast.BinOp) and isinstance(value.op, ast.Add):
+            return _Analyzer._builds_string(value.left) or _Analyzer._builds_string(value.right)
+        return False
+
+    @property
+    def where(self) -> str:
+        return f" in {self.function_stack[-1]}()" if self.function_stack else ""
+
+    # Scopes -------------------------------------------------------------
+
+    def _visit_function(self, node):
+        self.functions.append({'name': node.name, 'line': node.lineno,
+                               'complexity': _complexity(node)})
+        outer_depth = self.loop_depth
+        self.loop_depth = 0
+        self.function_stack.append(node.name)
+        self.list_names.append(set())
+        self.str_names.append(set())
+        self.local_scopes.append({})
+
+        self.generic_visit(node)
+
+        for name, line in self.local_scopes.pop().items():
+            if name not in self.loaded and not name.startswith('_'):
+                self.findings.append({'line': line, 'severity': 'info', 'kind': 'unused-variable',
+                                      'message': f"'{name}' is assigned but never used in {node.name}()"})
+        self.list_names.pop()
+        self.str_names.pop()
+        self.function_stack.pop()
+        self.loop_depth = outer_depth
+
+    visit_FunctionDef = _visit_function
+    visit_AsyncFunctionDef = _visit_function
+
+    # Names --------------------------------------------------------------
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            self.imports[(alias.asname or alias.name).split('.')[0]] = node.lineno
+
+    def visit_ImportFrom(self, node):
+        for alias in node.names:
+            if alias.name != '*':
+                self.imports[alias.asname or alias.name] = node.lineno
+
+    def visit_Name(self, node):
+        if isinstance(node.ctx, ast.Load):
+            self.loaded.add(node.id)
+
+    def visit_Global(self, node):
+        self.loaded.update(node.names)
+
+    visit_Nonlocal = visit_Global
+
+    def visit_Assign(self, node):
+        is_list = isinstance(node.value, _LIST_BUILDERS) or (
+            isinstance(node.value, ast.Call) and isinstance(node.value.func, ast.Name)
+            and node.value.func.id in ('list', 'sorted')
+        )
+        is_str = self._builds_string(node.value)
+        for target in node.targets:
+            if isinstance(target, ast.Name):
+                if self.local_scopes:
+                    self.local_scopes[-1].setdefault(target.id, node.lineno)
+                # Checked before the name's type is updated from this assignment
+                if self.loop_depth and self._is_self_concat(target.id, node.value):
+                    self.add(node, 'warning', 'quadratic-concat',
+                             f"'{target.id} = {target.id} + ...' inside a loop{self.where} copies the "
+                             f"whole value each iteration; collect parts and join once")
+                if is_list:
+                    self.list_names[-1].add(target.id)
+                else:
+                    self.list_names[-1].discard(target.id)
+                if is_str:
+                    self.str_names[-1].add(target.id)
+                else:
+                    self.str_names[-1].discard(target.id)
+        self.generic_visit(node)
+
+    def _is_self_concat(self, name: str, value: ast.AST) -> bool:
+        """name = name + <string or list>; numeric accumulation is fine"""
+        if not (isinstance(value, ast.BinOp) and isinstance(value.op, ast.Add)
+                and isinstance(value.left, ast.Name) and value.left.id == name):
+            return False
+        return self._is_str(name) or self._builds_string(value.right) or isinstance(value.right, ast.List)
+
+    def visit_AnnAssign(self, node):
+        if isinstance(node.target, ast.Name) and self.local_scopes:
+            self.local_scopes[-1].setdefault(node.target.id, node.lineno)
+        self.generic_visit(node)
+
+    def visit_AugAssign(self, node):
+        # list += [...] extends in place, but str += copies the whole string
+        builds_string = self._builds_string(node.value) or (
+            isinstance(node.target, ast.Name) and self._is_str(node.target.id)
+        )
+        if (self.loop_depth and isinstance(node.op, ast.Add)
+                and isinstance(node.target, ast.Name) and builds_string):
+            self.add(node, 'warning', 'quadratic-concat',
+                     f"'{node.target.id} +=' builds a string inside a loop{self.where}; "
+                     f"collect parts in a list and ''.join() them once")
+        if isinstance(node.target, ast.Name):
+            self.loaded.add(node.target.id)
+        self.generic_visit(node)
+
+    # Loops ----------------------------------------------------------------
+
+    def _visit_loop(self, node):
+        self.loop_depth += 1
+        if self.loop_depth > self.max_loop_depth:
+            self.max_loop_depth = self.loop_depth
+        if self.loop_depth >= 2:
+            self.add(node, 'warning' if self.loop_depth >= 3 else 'info', 'nested-loop',
+                     f"Loop nested {self.loop_depth} deep{self.where}: O(n^{self.loop_depth}) "
+                     f"if each loop scans the input")
+        self.generic_visit(node)
+        self.loop_depth -= 1
+
+    visit_For = _visit_loop
+    visit_AsyncFor = _visit_loop
+    visit_While = _visit_loop
+
+    def _visit_comprehension(self, node):
+        depth = len(node.generators)
+        self.loop_depth += depth
+        self.max_loop_depth = max(self.max_loop_depth, self.loop_depth)
+        if self.loop_depth >= 2:
+            self.add(node, 'warning' if self.loop_depth >= 3 else 'info', 'nested-loop',
+                     f"Comprehension nested {self.loop_depth} deep{self.where}")
+        self.generic_visit(node)
+        self.loop_depth -= depth
+
+    visit_ListComp = _visit_comprehension
+    visit_SetComp = _visit_comprehension
+    visit_DictComp = _visit_comprehension
+    visit_GeneratorExp = _visit_comprehension
+
+    # Idioms ---------------------------------------------------------------
+
+    def visit_Compare(self, node):
+        if self.loop_depth:
+            for op, right in zip(node.ops, node.comparators):
+                if (isinstance(op, (ast.In, ast.NotIn)) and isinstance(right, ast.Name)
+                        and self._is_list(right.id)):
+                    self.add(node, 'warning', 'list-membership',
+                             f"'in {right.id}' scans a list inside a loop{self.where}; "
+                             f"use a set for O(1) lookups")
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        func = node.func
+        if self.loop_depth and isinstance(func, ast.Attribute):
+            if func.attr == 'insert' and node.args and isinstance(node.args[0], ast.Constant) and node.args[0].value == 0:
+                self.add(node, 'warning', 'list-front-insert',
+                         f".insert(0, ...) inside a loop{self.where} shifts the whole list; "
+                         f"use collections.deque.appendleft")
+            elif func.attr == 'pop' and node.args and isinstance(node.args[0], ast.Constant) and node.args[0].value == 0:
+                self.add(node, 'warning', 'list-front-pop',
+                         f".pop(0) inside a loop{self.where} shifts the whole list; "
+                         f"use collections.deque.popleft")
+            elif func.attr in ('count', 'index') and isinstance(func.value, ast.Name) \
+                    and self._is_list(func.value.id):
+                self.add(node, 'warning', 'list-scan',
+                         f".{func.attr}() on a list inside a loop{self.where} rescans it every "
+                         f"iteration; precompute a dict or collections.Counter")
+        if (isinstance(func, ast.Name) and func.id == 'sum' and len(node.args) == 2
+                and isinstance(node.args[1], ast.List)):
+            self.add(node, 'warning', 'quadratic-sum',
+                     "sum(lists, []) is quadratic; use itertools.chain.from_iterable")
+        self.generic_visit(node)
+
+    def visit_ExceptHandler(self, node):
+        if node.type is None:
+            self.add(node, 'warning', 'bare-except',
+                     f"Bare 'except:'{self.where} also catches KeyboardInterrupt and SystemExit; "
+                     f"catch specific exceptions")
+        self.generic_visit(node)
+
+    def visit_Attribute(self, node):
+        # Record the root name so 'os.path.join' marks 'os' as used
+        root = node
+        while isinstance(root, ast.Attribute):
+            root = root.value
+        if isinstance(root, ast.Name):
+            self.loaded.add(root.id)
+        self.generic_visit(node)
+
+
+def analyze_python(code: str) -> Dict[str, Any]:
+    """
+    Analyze a Python submission without running it
+
+    Returns:
+        Dictionary with 'parsed', 'findings' (line, severity, kind, message),
+        'metrics' (lines, functions, max/mean complexity, max loop depth),
+        'quality_score' (0-100) and 'elapsed_ms'
+    """
+    start = time.perf_counter()
+    lines = len([line for line in code.splitlines() if line.strip()])
+
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        return {
+            'parsed': False,
+            'findings': [{'line': e.lineno or 0, 'severity': 'error', 'kind': 'syntax-error',
+                          'message': f"Syntax error: {e.msg}"}],
+            'metrics': {'lines': lines, 'functions': 0, 'max_complexity': 0,
+                        'mean_complexity': 0.0, 'max_loop_depth': 0},
+            'quality_score': 20,
+            'elapsed_ms': (time.perf_counter() - start) * 1000
+        }
+
+    analyzer = _Analyzer()
+    analyzer.visit(tree)
+
+    # Module-level code counts as one more "function" for complexity
+    module_complexity = _complexity(ast.Module(
+        body=[stmt for stmt in tree.body if not isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))],
+        type_ignores=[]
+    ))
+    complexities = [f['complexity'] for f in analyzer.functions] or [module_complexity]
+
+    for name, line in analyzer.imports.items():
+        if name not in analyzer.loaded:
+            analyzer.findings.append({'line': line, 'severity': 'info', 'kind': 'unused-import',
+                                      'message': f"'{name}' is imported but never used"})
+    for function in analyzer.functions:
+        if function['complexity'] > COMPLEXITY_LIMIT:
+            analyzer.findings.append({
+                'line': function['line'], 'severity': 'warning', 'kind': 'complexity',
+                'message': f"{function['name']}() has cyclomatic complexity {function['complexity']} "
+                           f"(over {COMPLEXITY_LIMIT}); split it up"
+            })
+
+    findings = sorted(analyzer.findings, key=lambda f: f['line'])
+    score = 100 - sum(SEVERITY_PENALTY[f['severity']] for f in findings)
+
+    return {
+        'parsed': True,
+        'findings': findings,
+        'metrics': {
+            'lines': lines,
+            'functions': len(analyzer.functions),
+            'max_complexity': max(complexities),
+            'mean_complexity': round(sum(complexities) / len(complexities), 1),
+            'max_loop_depth': analyzer.max_loop_depth
+        },
+        'quality_score': max(0, min(100, score)),
+        'elapsed_ms': (time.perf_counter() - start) * 1000
+    }
+
+
+def is_trivially_clean(analysis: Dict[str, Any], max_lines: int = 40) -> bool:
+    """Short, parseable code with no findings and simple control flow"""
+    metrics = analysis['metrics']
+    return (analysis['parsed'] and not analysis['findings']
+            and metrics['lines'] <= max_lines and metrics['max_complexity'] <= 5)
+
+
+def format_hints(analysis: Dict[str, Any], max_findings: int = 15) -> str:
+    """Compact prompt block summarizing the analysis"""
+    metrics = analysis['metrics']
+    lines = [
+        f"Static analysis (local, score {analysis['quality_score']}/100): "
+        f"{metrics['lines']} lines, {metrics['functions']} functions, "
+        f"max complexity {metrics['max_complexity']}, max loop depth {metrics['max_loop_depth']}"
+    ]
+    for finding in analysis['findings'][:max_findings]:
+        lines.append(f"- L{finding['line']} [{finding['severity']}] {finding['kind']}: {finding['message']}")
+    hidden = len(analysis['findings']) - max_findings
+    if hidden > 0:
+        lines.append(f"- ... {hidden} more")
+    if not analysis['findings']:
+        lines.append("- No issues found")
+    return "\n".join(lines)
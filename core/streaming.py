@@ -0,0 +1,90 @@
+"""
+Streaming - Provider-agnostic token streams with latency metrics
+"""
+
+import time
+import threading
+from collections import deque
+from typing import Iterable, Iterator, Dict, List, Any, Optional
+
+
+class StreamMetricsLog:
+    """Bounded in-memory log of per-request streaming metrics"""
+
+    def __init__(self, max_records: int = 500):
+        self._records = deque(maxlen=max_records)
+        self._lock = threading.Lock()
+
+    def record(self, metrics: Dict[str, Any]):
+        with self._lock:
+            self._records.append(metrics)
+
+    def recent(self, n: int = 20) -> List[Dict[str, Any]]:
+        """Get the n most recent records, newest last"""
+        with self._lock:
+            return list(self._records)[-n:]
+
+    def summary(self, label: Optional[str] = None) -> Dict[str, Any]:
+        """Get time-to-first-token percentiles, optionally for one label"""
+        with self._lock:
+            ttfts = sorted(
+                r['ttft'] for r in self._records
+                if r['ttft'] is not None and (label is None or r['label'] == label)
+            )
+        if not ttfts:
+            return {'requests': 0, 'ttft_p50': None, 'ttft_p95': None}
+        return {
+            'requests': len(ttfts),
+            'ttft_p50': ttfts[len(ttfts) // 2],
+            'ttft_p95': ttfts[min(len(ttfts) - 1, int(len(ttfts) * 0.95))]
+        }
+
+
+# Process-wide log shared by every stream
+stream_metrics = StreamMetricsLog()
+
+
+class TimedStream:
+    """
+    Wraps any iterable of text chunks and records time-to-first-token.
+
+    Works with every provider's chunk iterator, so callers (the Streamlit
+    UI, LLMHandler) only deal with plain strings. After iteration,
+    `text` holds the full response and `metrics` the timings.
+    """
+
+    def __init__(self, chunks: Iterable[str], label: str = "",
+                 log: Optional[StreamMetricsLog] = stream_metrics):
+        self._chunks = chunks
+        self.label = label
+        self.log = log
+        self.text = ""
+        self.metrics: Dict[str, Any] = {}
+
+    def __iter__(self) -> Iterator[str]:
+        start = time.perf_counter()
+        ttft = None
+        n_chunks = 0
+        parts = []
+
+        try:
+            for chunk in self._chunks:
+                if not chunk:
+                    continue
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                n_chunks += 1
+                parts.append(chunk)
+                yield chunk
+        finally:
+            self.text = "".join(parts)
+            self.metrics = {
+                'label': self.label,
+                'ttft': ttft,
+                'total_time': time.perf_counter() - start,
+                'chunks': n_chunks,
+                'chars': len(self.text),
+                'timestamp': time.time()
+            }
+            if self.log is not None:
+                self.log.record(self.metrics)
@@ -0,0 +1,381 @@
+"""
+Structured Output - Schema-conforming JSON from LLM responses, parsed as it streams
+"""
+
+import re
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+_LITERALS = {'True': 'true', 'False': 'false', 'None': 'null'}
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def _first_container(text: str) -> Optional[int]:
+    """Index of the first '{' or '[' (skips prose and code fences before the JSON)"""
+    positions = [p for p in (text.find('{'), text.find('[')) if p != -1]
+    return min(positions) if positions else None
+
+
+def repair_json(text: str) -> Any:
+    """
+    Parse JSON from an LLM response, fixing common damage locally
+
+    Handles prose or code fences around the value, trailing commas, Python
+    literals (True/False/None), single-quoted strings, raw newlines inside
+    strings, mismatched closing brackets and truncation (unterminated
+    strings, missing values and closers).
+
+    Raises:
+        ValueError: If nothing usable can be recovered
+    """
+    start = _first_container(text)
+    if start is None:
+        raise ValueError("No JSON object found in response")
+    text = text[start:]
+
+    out: List[str] = []
+    # Frames: [closer, expect] with expect in key / colon / value / comma
+    stack: List[List[str]] = []
+    quote = None  # delimiter of the string being copied, if any
+    escape = False
+    i = 0
+
+    def settle_value():
+        if stack:
+            stack[-1][1] = 'comma'
+
+    while i < len(text):
+        ch = text[i]
+        if quote:
+            if escape:
+                escape = False
+                if quote == "'" and ch == "'":
+                    out[-1] = ch  # \' is not a JSON escape
+                    i += 1
+                    continue
+            elif ch == '\\':
+                escape = True
+            elif ch == quote:
+                quote = None
+                ch = '"'
+                frame = stack[-1] if stack else None
+                if frame and frame[0] == '}' and frame[1] == 'key':
+                    frame[1] = 'colon'
+                else:
+                    settle_value()
+            elif ch == '\n':
+                ch = '\\n'
+            elif ch == '"':
+                ch = '\\"'
+            out.append(ch)
+            i += 1
+            continue
+
+        if ch in '"\'':
+            quote = ch
+            out.append('"')
+        elif ch in '{[':
+            stack.append(['}' if ch == '{' else ']', 'key' if ch == '{' else 'value'])
+            out.append(ch)
+        elif ch in '}]':
+            if not stack:
+                break
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ',':
+                out.pop()
+            closer, expect = stack.pop()
+            if expect == 'colon':
+                out.append(': null')
+            out.append(closer)
+            settle_value()
+            if not stack:
+                break
+        elif ch == ':':
+            if stack:
+                stack[-1][1] = 'value'
+            out.append(ch)
+        elif ch == ',':
+            if stack:
+                stack[-1][1] = 'key' if stack[-1][0] == '}' else 'value'
+            out.append(ch)
+        elif ch.isalpha() or ch == '_':
+            j = i
+            while j < len(text) and (text[j].isalnum() or text[j] == '_'):
+                j += 1
+            word = text[i:j]
+            out.append(_LITERALS.get(word, word))
+            settle_value()
+            i = j
+            continue
+        else:
+            if not ch.isspace() and stack and stack[-1][1] == 'value':
+                settle_value()
+            out.append(ch)
+        i += 1
+
+    # Close whatever the response was cut off in the middle of
+    if quote:
+        if escape:
+            out.pop()
+        out.append('"')
+    while out and (out[-1].isspace() or out[-1] == ','):
+        out.pop()
+    for closer, expect in reversed(stack):
+        if expect == 'colon':
+            out.append(': null')
+        elif expect == 'value' and out and out[-1] == ':':
+            out.append(' null')
+        while out and out[-1] == ',':
+            out.pop()
+        out.append(closer)
+
+    try:
+        return json.loads("".join(out))
+    except ValueError:
+        raise ValueError("Could not repair JSON response")
+
+
+def loads(text: str) -> Tuple[Any, bool]:
+    """Parse a response: (value, whether it needed repair)"""
+    try:
+        return json.loads(text), False
+    except ValueError:
+        return repair_json(text), True
+
+
+def _default(schema: Dict[str, Any]) -> Any:
+    if 'default' in schema:
+        return schema['default']
+    return {'object': {}, 'array': [], 'string': "", 'integer': 0,
+            'number': 0.0, 'boolean': False}.get(schema.get('type'), None)
+
+
+def conform(value: Any, schema: Dict[str, Any], path: str = "$") -> Tuple[Any, List[str]]:
+    """
+    Coerce a parsed value to a schema (a small JSON Schema subset: type,
+    properties, required, items, enum, minimum, maximum, default)
+
+    Returns:
+        (conforming value, list of fixes applied); missing required fields
+        get defaults, scalars are wrapped in lists, numeric strings are
+        parsed and out-of-range numbers clamped
+    """
+    fixes: List[str] = []
+    kind = schema.get('type')
+
+    if kind == 'object':
+        if isinstance(value, list) and len(value) == 1 and isinstance(value[0], dict):
+            value = value[0]
+            fixes.append(f"{path}: unwrapped single-item list")
+        if not isinstance(value, dict):
+            fixes.append(f"{path}: expected object")
+            value = {}
+        result = dict(value)
+        properties = schema.get('properties', {})
+        for name, subschema in properties.items():
+            if name in result:
+                result[name], sub_fixes = conform(result[name], subschema, f"{path}.{name}")
+                fixes.extend(sub_fixes)
+            elif name in schema.get('required', []):
+                result[name] = _default(subschema)
+                fixes.append(f"{path}.{name}: missing, defaulted")
+        return result, fixes
+
+    if kind == 'array':
+        if value is None:
+            fixes.append(f"{path}: null list")
+            value = []
+        elif not isinstance(value, list):
+            fixes.append(f"{path}: wrapped scalar in list")
+            value = [value]
+        item_schema = schema.get('items')
+        if item_schema:
+            items = []
+            for index, item in enumerate(value):
+                item, sub_fixes = conform(item, item_schema, f"{path}[{index}]")
+                items.append(item)
+                fixes.extend(sub_fixes)
+            value = items
+        return value, fixes
+
+    if kind in ('integer', 'number'):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            match = _NUMBER.search(str(value)) if value is not None else None
+            fixes.append(f"{path}: expected {kind}")
+            value = float(match.group()) if match else _default(schema)
+        if kind == 'integer':
+            value = int(round(value))
+        if 'minimum' in schema and value < schema['minimum']:
+            value = schema['minimum']
+            fixes.append(f"{path}: clamped to minimum")
+        if 'maximum' in schema and value > schema['maximum']:
+            value = schema['maximum']
+            fixes.append(f"{path}: clamped to maximum")
+        return value, fixes
+
+    if kind == 'string':
+        if not isinstance(value, str):
+            fixes.append(f"{path}: expected string")
+            if value is None:
+                value = _default(schema)
+            elif isinstance(value, (dict, list)):
+                value = json.dumps(value)
+            else:
+                value = str(value)
+        if 'enum' in schema and value not in schema['enum']:
+            lowered = {option.lower(): option for option in schema['enum']}
+            fixes.append(f"{path}: not one of {schema['enum']}")
+            value = lowered.get(value.strip().lower(), _default(schema) or schema['enum'][0])
+        return value, fixes
+
+    if kind == 'boolean':
+        if not isinstance(value, bool):
+            fixes.append(f"{path}: expected boolean")
+            value = str(value).strip().lower() in ('true', 'yes', '1')
+        return value, fixes
+
+    return value, fixes
+
+
+def schema_skeleton(schema: Dict[str, Any]) -> Any:
+    """Example value showing the expected shape, for prompts"""
+    kind = schema.get('type')
+    if kind == 'object':
+        return {name: schema_skeleton(sub) for name, sub in schema.get('properties', {}).items()}
+    if kind == 'array':
+        return [schema_skeleton(schema.get('items', {'type': 'string'}))]
+    if 'enum' in schema:
+        return "|".join(schema['enum'])
+    if kind in ('integer', 'number'):
+        low, high = schema.get('minimum'), schema.get('maximum')
+        return f"<{kind} {low}-{high}>" if low is not None and high is not None else f"<{kind}>"
+    return schema.get('description', f"<{kind}>")
+
+
+def schema_prompt(schema: Dict[str, Any]) -> str:
+    """Instruction block asking for JSON in the schema's shape"""
+    return ("Respond with a single JSON object only (no prose, no code fences), shaped like:\n"
+            + json.dumps(schema_skeleton(schema), indent=1))
+
+
+class IncrementalJSONParser:
+    """
+    Parses a streamed JSON response chunk by chunk.
+
+    feed() returns an event for every value that completes at most
+    max_depth levels below the root, e.g. {'path': ('issues', 0), 'value':
+    {...}} as soon as the first issue's closing brace arrives and
+    {'path': ('issues',), 'value': [...]} once the list closes, so a UI can
+    render each section as it completes. A final {'path': (), 'value': ...,
+    'done': True} event carries the whole value; close() produces it from
+    a repaired buffer if the stream ended early or malformed.
+    """
+
+    def __init__(self, max_depth: int = 2):
+        self.max_depth = max_depth
+        self.text = ""
+        self.result = None
+        self.done = False
+        self.repaired = False
+        self._pos = 0
+        self._stack: List[Dict[str, Any]] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._scalar_start: Optional[int] = None
+
+    def _parse(self, start: int, end: int) -> Any:
+        value, repaired = loads(self.text[start:end])
+        self.repaired = self.repaired or repaired
+        return value
+
+    def _path(self) -> Tuple:
+        return tuple(frame['key'] if frame['object'] else frame['index'] for frame in self._stack)
+
+    def _value_done(self, start: int, end: int, events: List[Dict[str, Any]]):
+        frame = self._stack[-1]
+        if len(self._stack) <= self.max_depth:
+            try:
+                events.append({'path': self._path(), 'value': self._parse(start, end)})
+            except ValueError:
+                pass
+        if frame['object']:
+            frame['expect'] = 'comma'
+        else:
+            frame['index'] += 1
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consume a chunk and return the events it completed"""
+        self.text += chunk
+        events: List[Dict[str, Any]] = []
+        text = self.text
+        i = self._pos
+
+        while i < len(text) and not self.done:
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    frame = self._stack[-1]
+                    if frame['object'] and frame['expect'] == 'key':
+                        try:
+                            frame['key'] = json.loads(text[self._string_start:i + 1])
+                        except ValueError:
+                            frame['key'] = text[self._string_start + 1:i]
+                        frame['expect'] = 'colon'
+                    else:
+                        self._value_done(self._string_start, i + 1, events)
+                i += 1
+                continue
+
+            if self._scalar_start is not None and (ch in ',}]' or ch.isspace()):
+                self._value_done(self._scalar_start, i, events)
+                self._scalar_start = None
+
+            if not self._stack:
+                if ch in '{[':
+                    self._stack.append({'object': ch == '{', 'start': i, 'key': None, 'index': 0,
+                                        'expect': 'key' if ch == '{' else 'value'})
+                i += 1
+                continue
+
+            frame = self._stack[-1]
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch in '{[':
+                self._stack.append({'object': ch == '{', 'start': i, 'key': None, 'index': 0,
+                                    'expect': 'key' if ch == '{' else 'value'})
+            elif ch in '}]':
+                closed = self._stack.pop()
+                if self._stack:
+                    self._value_done(closed['start'], i + 1, events)
+                else:
+                    self.result = self._parse(closed['start'], i + 1)
+                    self.done = True
+                    events.append({'path': (), 'value': self.result, 'done': True})
+            elif ch == ':':
+                frame['expect'] = 'value'
+            elif ch == ',':
+                if frame['object']:
+                    frame['expect'] = 'key'
+            elif not ch.isspace() and self._scalar_start is None:
+                self._scalar_start = i
+            i += 1
+
+        self._pos = i
+        return events
+
+    def close(self) -> List[Dict[str, Any]]:
+        """Finish the stream, repairing a truncated or malformed response"""
+        if self.done:
+            return []
+        self.result = repair_json(self.text)
+        self.repaired = True
+        self.done = True
+        return [{'path': (), 'value': self.result, 'done': True}]
@@ -2,47 +2,136 @@
 Code Review Feature
 """
 
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Iterator, Optional, Tuple
 from core.llm_handler import LLMHandler, PromptTemplate
+from core.review_cache import ReviewCache
+from core.static_analysis import analyze_python, format_hints, is_trivially_clean, HINTS_INSTRUCTION
+from core.structured_output import schema_prompt
+
+REVIEW_SCHEMA = {
+    'type': 'object',
+    'required': ['quality_score', 'summary', 'strengths', 'issues', 'suggestions', 'refactored_code'],
+    'properties': {
+        'quality_score': {'type': 'integer', 'minimum': 0, 'maximum': 100, 'default': 75},
+        'summary': {'type': 'string', 'description': 'two-sentence overall assessment'},
+        'strengths': {'type': 'array', 'items': {'type': 'string'}},
+        'issues': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'required': ['title', 'description', 'severity'],
+                'properties': {
+                    'title': {'type': 'string'},
+                    'description': {'type': 'string'},
+                    'severity': {'type': 'string', 'enum': ['error', 'warning', 'info'], 'default': 'info'}
+                }
+            }
+        },
+        'suggestions': {'type': 'string', 'description': 'markdown list of concrete improvements'},
+        'refactored_code': {'type': 'string', 'description': 'improved code, or empty string'}
+    }
+}
 
 class CodeReviewer:
     """Code review and analysis system"""
     
-    def __init__(self, llm_handler: LLMHandler):
+    def __init__(self,
+                 llm_handler: LLMHandler,
+                 cache: Optional[ReviewCache] = None,
+                 skip_llm_when_clean: bool = False,
+                 clean_review_max_tokens: int = 500):
+        """
+        Args:
+            llm_handler: LLM handler used for reviews
+            cache: Optional review cache; resubmissions that differ only in
+                whitespace or comments are served from it
+            skip_llm_when_clean: Return the local analysis alone for short
+                Python code with no findings
+            clean_review_max_tokens: Response cap for the brief review of
+                clean code (when the LLM is not skipped)
+        """
         self.llm_handler = llm_handler
+        self.cache = cache
+        self.skip_llm_when_clean = skip_llm_when_clean
+        self.clean_review_max_tokens = clean_review_max_tokens
+    
+    @staticmethod
+    def analyze(code: str, language: str) -> Optional[Dict[str, Any]]:
+        """Local static analysis (Python only; None for other languages)"""
+        if language.lower() != "python":
+            return None
+        return analyze_python(code)
+    
+    def _build_prompt(self, code: str, language: str, review_type: str, level: str,
+                      analysis: Optional[Dict[str, Any]], clean: bool) -> Tuple[str, Optional[int]]:
+        """Review prompt (with local findings) and response token cap"""
+        prompt = PromptTemplate.build_code_review_prompt(code, language, review_type, level)
+        max_tokens = None
+        if analysis is not None:
+            prompt += f"\n{format_hints(analysis)}\n\n{HINTS_INSTRUCTION}"
+            if clean:
+                prompt += "\nThe code is short and clean, so keep the review brief."
+                max_tokens = self.clean_review_max_tokens
+        return prompt + "\n\n" + schema_prompt(REVIEW_SCHEMA), max_tokens
+    
+    @staticmethod
+    def _assemble(data: Dict[str, Any], analysis: Optional[Dict[str, Any]],
+                  language: str) -> Dict[str, Any]:
+        """Merge the model's review with the local analysis"""
+        result = dict(data, language=language)
+        if analysis is not None:
+            # The local score is deterministic; other languages use the
+            # model's own score
+            result['quality_score'] = analysis['quality_score']
+            result['issues'] = [
+                {'title': finding['kind'], 'description': finding['message'],
+                 'severity': finding['severity'], 'line': finding['line']}
+                for finding in analysis['findings']
+            ] + data['issues']
+            result['static_analysis'] = analysis
+        return result
+    
+    @staticmethod
+    def _clean_result(analysis: Dict[str, Any], language: str) -> Dict[str, Any]:
+        return {
+            'quality_score': analysis['quality_score'],
+            'summary': 'No issues found by static analysis',
+            'strengths': ['Simple control flow', 'No unused names or risky idioms'],
+            'issues': [],
+            'suggestions': '',
+            'refactored_code': '',
+            'language': language,
+            'static_analysis': analysis
+        }
     
     def review_code(self, code: str, language: str = "Python",
                    review_type: str = "Comprehensive", level: str = "Intermediate") -> Dict[str, Any]:
         """Review code and provide feedback"""
         try:
-            system_prompt = PromptTemplate.get_system_prompt("code_review")
+            if self.cache is not None:
+                cached = self.cache.lookup(code, language, review_type, level)
+                if cached is not None:
+                    return cached
             
-            user_prompt = f"""Review this {language} code for a {level} programmer.
-
-Code:
-```{language.lower()}
-{code}
-```
-
-Provide a {review_type} review with:
-1. Overall quality score (0-100)
-2. What the code does well
-3. Issues found (bugs, style, performance)
-4. Specific suggestions for improvement"""
-
-            response = self.llm_handler.generate(
-                prompt=user_prompt, system_message=system_prompt
-            )
+            analysis = self.analyze(code, language)
+            clean = analysis is not None and is_trivially_clean(analysis)
             
-            return {
-                'quality_score': 75,
-                'summary': 'Code review completed',
-                'strengths': ['Code is functional'],
-                'issues': [{'title': 'Review', 'description': response, 'severity': 'info'}],
-                'suggestions': response,
-                'refactored_code': '',
-                'language': language
-            }
+            if clean and self.skip_llm_when_clean:
+                result = self._clean_result(analysis, language)
+            else:
+                prompt, max_tokens = self._build_prompt(code, language, review_type, level, analysis, clean)
+                data = self.llm_handler.generate_json(
+                    prompt=prompt,
+                    system_message=PromptTemplate.get_system_prompt("code_review"),
+                    schema=REVIEW_SCHEMA,
+                    max_tokens=max_tokens
+                )
+                result = self._assemble(data, analysis, language)
+            
+            if self.cache is not None:
+                self.cache.store(code, language, review_type, level, result)
+            
+            return result
             
         except Exception as e:
             return {
@@ -53,4 +142,55 @@ Provide a {review_type} review with:
                 'suggestions': '',
                 'refactored_code': '',
                 'language': language
-            }
\ No newline at end of file
+            }
+    
+    def stream_review(self, code: str, language: str = "Python",
+                      review_type: str = "Comprehensive", level: str = "Intermediate") -> Iterator[Dict[str, Any]]:
+        """
+        Review code, yielding each section of the review as it arrives
+        
+        Yields:
+            {'section': name, 'value': ...} for each completed top-level
+            field (quality_score, summary, strengths, suggestions,
+            refactored_code), {'section': 'issues', 'item': {...}} for each
+            issue as soon as it is complete (local findings first), then {'section': 'done', 'value': <review_code result>}.
+            Cached and locally-answered reviews yield every section at once.
+        """
+        result = self.cache.lookup(code, language, review_type, level) if self.cache is not None else None
+        analysis = None
+        if result is None:
+            analysis = self.analyze(code, language)
+            clean = analysis is not None and is_trivially_clean(analysis)
+            if clean and self.skip_llm_when_clean:
+                result = self._clean_result(analysis, language)
+        
+        if result is None:
+            if analysis is not None:
+                # Local findings are known before the first token
+                yield {'section': 'quality_score', 'value': analysis['quality_score']}
+                for finding in analysis['findings']:
+                    yield {'section': 'issues', 'item': {'title': finding['kind'], 'description': finding['message'],
+                                                         'severity': finding['severity'], 'line': finding['line']}}
+            prompt, _ = self._build_prompt(code, language, review_type, level, analysis, clean)
+            for event in self.llm_handler.stream_json(prompt=prompt,
+                                                      system_message=PromptTemplate.get_system_prompt("code_review"),
+                                                      schema=REVIEW_SCHEMA,
+                                                      label="stream_review"):
+                path = event['path']
+                if event.get('done'):
+                    result = self._assemble(event['value'], analysis, language)
+                elif analysis is not None and path[0] == 'quality_score':
+                    continue
+                elif len(path) == 2 and path[0] == 'issues':
+                    yield {'section': 'issues', 'item': event['value']}
+                elif len(path) == 1 and path[0] != 'issues':
+                    yield {'section': path[0], 'value': event['value']}
+            if self.cache is not None:
+                self.cache.store(code, language, review_type, level, result)
+        else:
+            for section in ('quality_score', 'summary', 'strengths', 'suggestions', 'refactored_code'):
+                yield {'section': section, 'value': result.get(section)}
+            for issue in result.get('issues', []):
+                yield {'section': 'issues', 'item': issue}
+        
+        yield {'section': 'done', 'value': result}
@@ -0,0 +1,336 @@
+"""
+Exercise Bank - Pre-generated exercises served without waiting on the LLM
+"""
+
+import os
+import re
+import json
+import time
+import queue
+import sqlite3
+import threading
+import itertools
+from collections import deque
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+from features.exercise_generator import ExerciseGenerator
+
+
+class ExerciseBank:
+    """
+    Persistent pool of ready exercises per (topic, language, difficulty, level).
+
+    Requests are served from an in-memory deque per bucket in O(1), rotating
+    through the bucket so consecutive students get different exercises and
+    a student is not shown one they have already seen. When a bucket drops
+    below low_watermark it is queued for refill; background workers refill
+    the most requested buckets first. A request for an empty bucket falls
+    back to generating synchronously (and seeds the bucket).
+    """
+
+    def __init__(self,
+                 generator: ExerciseGenerator,
+                 store_path: str = "./data/cache/exercise_bank.sqlite3",
+                 target_per_bucket: int = 5,
+                 low_watermark: int = 2,
+                 max_serves: int = 25,
+                 workers: int = 2,
+                 popularity_half_life: float = 7 * 24 * 3600):
+        """
+        Initialize Exercise Bank
+
+        Args:
+            generator: Exercise generator used to fill buckets
+            store_path: SQLite file holding exercises and request counts
+            target_per_bucket: Exercises a refill tops each bucket up to
+            low_watermark: Refill a bucket once fewer exercises remain
+            max_serves: Retire an exercise after it was served this often
+            workers: Background refill threads (0 disables background refill)
+            popularity_half_life: Seconds after which a request counts half
+                as much when prioritizing refills
+        """
+        self.generator = generator
+        self.target_per_bucket = target_per_bucket
+        self.low_watermark = low_watermark
+        self.max_serves = max_serves
+        self.popularity_half_life = popularity_half_life
+
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, deque] = {}
+        self._exercises: Dict[int, Dict[str, Any]] = {}
+        self._serves: Dict[int, int] = {}
+        self._popularity: Dict[str, Tuple[float, float]] = {}
+        self._bucket_params: Dict[str, Tuple[str, str, str, str]] = {}
+        self._seen: Dict[str, Set[int]] = {}
+        self._pending: Set[str] = set()
+        self._refill_queue: "queue.PriorityQueue" = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._stats = {'requests': 0, 'hits': 0, 'misses': 0, 'generated': 0,
+                       'generation_failures': 0, 'generation_seconds': 0.0, 'retired': 0}
+
+        self._initialize_store(store_path)
+
+        self._stop = threading.Event()
+        self._workers = [
+            threading.Thread(target=self._refill_loop, name=f"exercise-refill-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    def _initialize_store(self, store_path: str):
+        """Open the SQLite store and load exercises and request counts"""
+        directory = os.path.dirname(store_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(store_path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS exercises (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                bucket TEXT NOT NULL,
+                data TEXT NOT NULL,
+                served INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS buckets (
+                bucket TEXT PRIMARY KEY,
+                params TEXT NOT NULL,
+                requests REAL NOT NULL,
+                last_request REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+
+        for bucket, params, requests, last_request in self._conn.execute(
+                "SELECT bucket, params, requests, last_request FROM buckets"):
+            self._bucket_params[bucket] = tuple(json.loads(params))
+            self._popularity[bucket] = (requests, last_request)
+
+        for exercise_id, bucket, data, served in self._conn.execute(
+                "SELECT id, bucket, data, served FROM exercises ORDER BY served ASC, id ASC"):
+            self._exercises[exercise_id] = json.loads(data)
+            self._serves[exercise_id] = served
+            self._buckets.setdefault(bucket, deque()).append(exercise_id)
+
+    @staticmethod
+    def bucket_key(topic: str, language: str, difficulty: str, level: str) -> str:
+        """Normalize a request into its bucket key"""
+        topic = re.sub(r"\s+", " ", topic.strip().lower())
+        return f"{topic}|{language.lower()}|{difficulty.lower()}|{level.lower()}"
+
+    def _store(self, bucket: str, exercise: Dict[str, Any]) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO exercises (bucket, data, created_at) VALUES (?, ?, ?)",
+                (bucket, json.dumps(exercise), time.time())
+            )
+            self._conn.commit()
+            exercise_id = cursor.lastrowid
+            self._exercises[exercise_id] = exercise
+            self._serves[exercise_id] = 0
+            self._buckets.setdefault(bucket, deque()).append(exercise_id)
+            return exercise_id
+
+    # ------------------------------------------------------------------
+    # Serving
+    # ------------------------------------------------------------------
+
+    def _score(self, bucket: str, now: float) -> float:
+        """Request count decayed by age, used as refill priority"""
+        requests, last_request = self._popularity.get(bucket, (0.0, now))
+        return requests * 0.5 ** ((now - last_request) / self.popularity_half_life)
+
+    def _record_request(self, bucket: str, params: Tuple[str, str, str, str], now: float):
+        score = self._score(bucket, now) + 1
+        self._popularity[bucket] = (score, now)
+        self._bucket_params[bucket] = params
+        self._conn.execute(
+            "INSERT OR REPLACE INTO buckets (bucket, params, requests, last_request) VALUES (?, ?, ?, ?)",
+            (bucket, json.dumps(params), score, now)
+        )
+
+    def _take(self, bucket: str, user_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Serve the next exercise of a bucket the user has not seen (lock held)"""
+        exercises = self._buckets.get(bucket)
+        if not exercises:
+            return None
+        seen = self._seen.setdefault(user_id, set()) if user_id is not None else set()
+
+        for _ in range(len(exercises)):
+            exercise_id = exercises.popleft()
+            if exercise_id in seen:
+                exercises.append(exercise_id)
+                continue
+
+            served = self._serves[exercise_id] + 1
+            self._serves[exercise_id] = served
+            if served >= self.max_serves:
+                # Retire it so the bucket keeps turning over
+                self._conn.execute("DELETE FROM exercises WHERE id = ?", (exercise_id,))
+                self._stats['retired'] += 1
+                exercise = self._exercises.pop(exercise_id)
+                del self._serves[exercise_id]
+            else:
+                self._conn.execute("UPDATE exercises SET served = ? WHERE id = ?", (served, exercise_id))
+                exercises.append(exercise_id)
+                exercise = self._exercises[exercise_id]
+            if user_id is not None:
+                seen.add(exercise_id)
+            return exercise
+        return None
+
+    def get_exercise(self,
+                     topic: str,
+                     language: str = "Python",
+                     difficulty: str = "Medium",
+                     level: str = "Intermediate",
+                     user_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get an exercise, from the bank when possible
+
+        Args:
+            topic: Exercise topic
+            language: Programming language
+            difficulty: Exercise difficulty
+            level: Student's skill level
+            user_id: Student to avoid repeats for
+
+        Returns:
+            Exercise dictionary with 'bank_hit' set
+        """
+        params = (topic.strip(), language, difficulty, level)
+        bucket = self.bucket_key(*params)
+        now = time.time()
+
+        with self._lock:
+            self._stats['requests'] += 1
+            self._record_request(bucket, params, now)
+            exercise = self._take(bucket, user_id)
+            self._conn.commit()
+            remaining = len(self._buckets.get(bucket, ()))
+            self._stats['hits' if exercise is not None else 'misses'] += 1
+
+        if remaining < self.low_watermark or exercise is None:
+            self.schedule_refill(bucket)
+        if exercise is not None:
+            return dict(exercise, bank_hit=True)
+
+        # Cold bucket: generate on the critical path once, and keep the
+        # result if it is good enough for other students
+        exercise, usable = self._generate(bucket)
+        if usable:
+            exercise_id = self._store(bucket, exercise)
+            if user_id is not None:
+                with self._lock:
+                    self._seen.setdefault(user_id, set()).add(exercise_id)
+        return dict(exercise, bank_hit=False)
+
+    # ------------------------------------------------------------------
+    # Refill
+    # ------------------------------------------------------------------
+
+    def _generate(self, bucket: str) -> Tuple[Dict[str, Any], bool]:
+        """Generate one exercise for a bucket: (exercise, fit to bank)"""
+        topic, language, difficulty, level = self._bucket_params[bucket]
+        start = time.perf_counter()
+        exercise = self.generator.generate_exercise(topic, language, difficulty, user_level=level)
+        elapsed = time.perf_counter() - start
+
+        usable = bool(exercise.get('solution')) and exercise.get('verified', True)
+        with self._lock:
+            self._stats['generation_seconds'] += elapsed
+            self._stats['generated' if usable else 'generation_failures'] += 1
+        return exercise, usable
+
+    def schedule_refill(self, bucket: str):
+        """Queue a bucket for background refill, by popularity"""
+        with self._lock:
+            if bucket in self._pending or bucket not in self._bucket_params:
+                return
+            self._pending.add(bucket)
+            priority = -self._score(bucket, time.time())
+        self._refill_queue.put((priority, next(self._sequence), bucket))
+
+    def prewarm(self,
+                combinations: Optional[List[Tuple[str, str, str, str]]] = None,
+                top_n: int = 20):
+        """
+        Queue refills for the most requested buckets, plus any given
+        (topic, language, difficulty, level) combinations
+        """
+        now = time.time()
+        for params in combinations or []:
+            bucket = self.bucket_key(*params)
+            with self._lock:
+                self._bucket_params.setdefault(bucket, tuple(params))
+                self._popularity.setdefault(bucket, (0.0, now))
+        with self._lock:
+            ranked = sorted(self._bucket_params, key=lambda b: self._score(b, now), reverse=True)
+        for bucket in ranked[:top_n] + [self.bucket_key(*params) for params in combinations or []]:
+            with self._lock:
+                full = len(self._buckets.get(bucket, ())) >= self.target_per_bucket
+            if not full:
+                self.schedule_refill(bucket)
+
+    def _refill_loop(self):
+        """Worker: top up the highest-priority bucket one exercise at a time"""
+        while not self._stop.is_set():
+            try:
+                _, _, bucket = self._refill_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            usable = False
+            try:
+                exercise, usable = self._generate(bucket)
+                if usable:
+                    self._store(bucket, exercise)
+            except Exception as e:
+                print(f"Error refilling exercise bucket {bucket}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._pending.discard(bucket)
+                    short = len(self._buckets.get(bucket, ())) < self.target_per_bucket
+                self._refill_queue.task_done()
+
+            # Re-queue instead of looping so other popular buckets interleave;
+            # stop on failure to avoid hammering a topic the model cannot do
+            if short and usable:
+                self.schedule_refill(bucket)
+
+    def wait_until_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until no refills are queued or running"""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            with self._lock:
+                idle = not self._pending
+            if idle:
+                return True
+            if deadline is not None and time.time() > deadline:
+                return False
+            time.sleep(0.05)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit rate, queue depth and generation counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['queue_depth'] = len(self._pending)
+            stats['buckets'] = sum(1 for exercises in self._buckets.values() if exercises)
+            stats['exercises'] = len(self._exercises)
+        stats['hit_rate'] = stats['hits'] / stats['requests'] if stats['requests'] else 0.0
+        attempts = stats['generated'] + stats['generation_failures']
+        stats['mean_generation_seconds'] = stats['generation_seconds'] / attempts if attempts else 0.0
+        return stats
+
+    def close(self):
+        """Stop the refill workers"""
+        self._stop.set()
+        for worker in self._workers:
+            worker.join(timeout=1)
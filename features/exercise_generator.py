@@ -2,60 +2,264 @@
 Exercise Generator
 """
 
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Iterator, Optional
 from core.llm_handler import LLMHandler, PromptTemplate
+from core.sandbox import SandboxRunner
+from core.structured_output import schema_prompt
+
+EXERCISE_JSON_FORMAT = """Respond with JSON only, using these keys:
+- problem_statement: string
+- requirements: list of 3-5 strings
+- function_name: name of the function the student implements
+- examples: list of 2 objects {"input": string, "output": string} shown to the student
+- test_cases: list of 5-8 objects {"args": [positional arguments as JSON values], "expected": JSON value},
+  covering the examples and edge cases
+- hints: list of 3 progressive hints
+- solution: complete Python code defining function_name (standard library only, no input() or printing)
+- explanation: string"""
+
+_STRING_LIST = {'type': 'array', 'items': {'type': 'string'}}
+_EXERCISE_FIELDS = {
+    'problem_statement': {'type': 'string'},
+    'requirements': _STRING_LIST,
+    'examples': {
+        'type': 'array',
+        'items': {'type': 'object', 'required': ['input', 'output'],
+                  'properties': {'input': {'type': 'string'}, 'output': {'type': 'string'}}}
+    },
+    'hints': _STRING_LIST,
+    'solution': {'type': 'string', 'description': 'complete solution code'},
+    'explanation': {'type': 'string'}
+}
+
+EXERCISE_SCHEMA = {
+    'type': 'object',
+    'required': list(_EXERCISE_FIELDS) + ['test_cases'],
+    'properties': dict(_EXERCISE_FIELDS,
+                       test_cases={'type': 'string', 'description': 'test code the student can run'})
+}
+
+# Executable variant; 'expected' is deliberately not required so a test
+# missing it is dropped by _parse_exercise rather than defaulted
+VERIFIED_EXERCISE_SCHEMA = {
+    'type': 'object',
+    'required': list(_EXERCISE_FIELDS) + ['function_name', 'test_cases'],
+    'properties': dict(_EXERCISE_FIELDS,
+                       function_name={'type': 'string'},
+                       test_cases={'type': 'array',
+                                   'items': {'type': 'object', 'required': ['args'],
+                                             'properties': {'args': {'type': 'array'}}}})
+}
+
 
 class ExerciseGenerator:
     """Generates personalized coding exercises"""
     
-    def __init__(self, llm_handler: LLMHandler):
+    def __init__(self,
+                 llm_handler: LLMHandler,
+                 runner: Optional[SandboxRunner] = None,
+                 max_attempts: int = 3):
+        """
+        Args:
+            llm_handler: LLM handler used for generation
+            runner: Optional sandbox; when set, Python exercises are generated
+                with executable test cases and regenerated until the
+                solution passes them
+            max_attempts: Generation attempts per verified exercise
+        """
         self.llm_handler = llm_handler
+        self.runner = runner
+        self.max_attempts = max_attempts
     
     def generate_exercise(self, topic: str, language: str = "Python",
                          difficulty: str = "Medium", exercise_type: str = "Coding Challenge",
                          user_level: str = "Intermediate") -> Dict[str, Any]:
         """Generate a coding exercise"""
-        prompt = f"""Create a {difficulty} {exercise_type} in {language} about {topic}.
+        if self.runner is not None and language.lower() == "python":
+            return self._generate_verified(topic, language, difficulty, exercise_type, user_level)
+        
+        prompt = self._build_prompt(topic, language, difficulty, exercise_type, user_level)
+        system_prompt = PromptTemplate.get_system_prompt("exercise_gen")
+        
+        try:
+            data = self.llm_handler.generate_json(
+                prompt=prompt, system_message=system_prompt, schema=EXERCISE_SCHEMA
+            )
+            return dict(data, topic=topic, language=language, difficulty=difficulty)
+            
+        except Exception as e:
+            return self._error_result(str(e), topic, language, difficulty)
+    
+    @staticmethod
+    def _build_prompt(topic: str, language: str, difficulty: str,
+                      exercise_type: str, user_level: str) -> str:
+        return f"""Create a {difficulty} {exercise_type} in {language} about {topic}.
 
 Include:
 1. Clear problem statement
 2. 3-5 specific requirements
 3. 2 input/output examples
 4. 3 progressive hints
-5. A complete solution with explanation
+5. A complete solution with explanation, and tests for it
 
-Make it appropriate for a {user_level} programmer."""
+Make it appropriate for a {user_level} programmer.
 
-        system_prompt = PromptTemplate.get_system_prompt("exercise_gen")
+{schema_prompt(EXERCISE_SCHEMA)}"""
+    
+    def stream_exercise(self, topic: str, language: str = "Python",
+                        difficulty: str = "Medium", exercise_type: str = "Coding Challenge",
+                        user_level: str = "Intermediate") -> Iterator[Dict[str, Any]]:
+        """
+        Generate an exercise, yielding each field as soon as it is complete
+        
+        Yields:
+            {'section': name, 'value': ...} per field (problem_statement,
+            requirements, examples, hints, ...), then {'section': 'done',
+            'value': <generate_exercise result>}. Verified exercises are only
+            shown once their solution passed, so they arrive all at once.
+        """
+        if self.runner is not None and language.lower() == "python":
+            exercise = self._generate_verified(topic, language, difficulty, exercise_type, user_level)
+            for section in ('problem_statement', 'requirements', 'examples', 'hints',
+                            'test_cases', 'solution', 'explanation'):
+                yield {'section': section, 'value': exercise.get(section)}
+            yield {'section': 'done', 'value': exercise}
+            return
         
         try:
-            response = self.llm_handler.generate(
-                prompt=prompt, system_message=system_prompt
-            )
+            for event in self.llm_handler.stream_json(
+                    prompt=self._build_prompt(topic, language, difficulty, exercise_type, user_level),
+                    system_message=PromptTemplate.get_system_prompt("exercise_gen"),
+                    schema=EXERCISE_SCHEMA,
+                    label="stream_exercise"):
+                if event.get('done'):
+                    exercise = dict(event['value'], topic=topic, language=language, difficulty=difficulty)
+                    yield {'section': 'done', 'value': exercise}
+                elif len(event['path']) == 1:
+                    yield {'section': event['path'][0], 'value': event['value']}
+        except Exception as e:
+            yield {'section': 'done', 'value': self._error_result(str(e), topic, language, difficulty)}
+    
+    @staticmethod
+    def _error_result(message: str, topic: str, language: str, difficulty: str) -> Dict[str, Any]:
+        return {
+            'problem_statement': f'Error: {message}',
+            'requirements': [],
+            'examples': [],
+            'hints': [],
+            'test_cases': '',
+            'solution': '',
+            'explanation': '',
+            'topic': topic,
+            'language': language,
+            'difficulty': difficulty
+        }
+    
+    @staticmethod
+    def _parse_exercise(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Validate the generated JSON; None if it cannot be executed"""
+        function_name = data.get('function_name')
+        solution = data.get('solution')
+        tests = data.get('test_cases')
+        if not isinstance(function_name, str) or not function_name.isidentifier():
+            return None
+        if not isinstance(solution, str) or not solution.strip() or not isinstance(tests, list) or not tests:
+            return None
+        tests = [
+            {'args': test['args'], 'expected': test['expected']}
+            for test in tests
+            if isinstance(test, dict) and isinstance(test.get('args'), list) and 'expected' in test
+        ]
+        if not tests:
+            return None
+        return {'function_name': function_name, 'solution': solution, 'tests': tests}
+    
+    @staticmethod
+    def format_test_cases(function_name: str, tests: List[Dict[str, Any]]) -> str:
+        """Runnable assert statements for the student"""
+        return "\n".join(
+            f"assert {function_name}({', '.join(repr(arg) for arg in test['args'])}) == {test['expected']!r}"
+            for test in tests
+        )
+    
+    @staticmethod
+    def _failure_report(run: Dict[str, Any], limit: int = 3) -> str:
+        if run['error'] and not run['n_passed']:
+            return f"- the solution did not run: {run['error']}"
+        lines = []
+        for result in run['results']:
+            if result['passed']:
+                continue
+            got = result.get('error') or repr(result.get('actual'))
+            lines.append(f"- args={result['args']!r} expected={result['expected']!r} got {got}")
+            if len(lines) >= limit:
+                break
+        return "\n".join(lines)
+    
+    def verify(self, exercise: Dict[str, Any]) -> Dict[str, Any]:
+        """Run an exercise's solution against its tests (cached by hashes)"""
+        return self.verify_many([exercise])[0]
+    
+    def verify_many(self, exercises: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Verify several exercises concurrently in the sandbox"""
+        return self.runner.run_many([
+            (exercise['solution'], exercise['function_name'], exercise['tests'])
+            for exercise in exercises
+        ])
+    
+    def _generate_verified(self, topic: str, language: str, difficulty: str,
+                           exercise_type: str, user_level: str) -> Dict[str, Any]:
+        """Generate a Python exercise whose solution passes its own tests"""
+        base_prompt = f"""Create a {difficulty} {exercise_type} in {language} about {topic}
+for a {user_level} programmer. The student implements a single function.
+
+{EXERCISE_JSON_FORMAT}"""
+        system_prompt = PromptTemplate.get_system_prompt("exercise_gen")
+        
+        feedback = ""
+        exercise = None
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                data = self.llm_handler.generate_json(
+                    prompt=base_prompt + feedback, system_message=system_prompt,
+                    schema=VERIFIED_EXERCISE_SCHEMA
+                )
+            except Exception as e:
+                print(f"Error generating exercise (attempt {attempt}): {str(e)}")
+                continue
+            
+            parsed = self._parse_exercise(data)
+            if parsed is None:
+                feedback = ("\n\nThe previous attempt was rejected: it must include function_name, "
+                            "solution and test_cases with 'args' lists.")
+                continue
             
-            return {
-                'problem_statement': f"Exercise on {topic}",
-                'requirements': [f"Solve the {topic} problem"],
-                'examples': [{'input': 'Example input', 'output': 'Example output'}],
-                'hints': ['Think step by step', 'Break down the problem', 'Test edge cases'],
-                'test_cases': f'# Test cases for {topic}',
-                'solution': response,
-                'explanation': 'See solution above',
+            run = self.runner.run(parsed['solution'], parsed['function_name'], parsed['tests'])
+            exercise = {
+                'problem_statement': data['problem_statement'] or f"Exercise on {topic}",
+                'requirements': data['requirements'],
+                'examples': data['examples'],
+                'hints': data['hints'],
+                'function_name': parsed['function_name'],
+                'tests': parsed['tests'],
+                'test_cases': self.format_test_cases(parsed['function_name'], parsed['tests']),
+                'solution': parsed['solution'],
+                'explanation': data['explanation'],
                 'topic': topic,
                 'language': language,
-                'difficulty': difficulty
+                'difficulty': difficulty,
+                'verified': run['passed'],
+                'verification': {'n_passed': run['n_passed'], 'n_tests': run['n_tests'],
+                                 'error': run['error'], 'attempts': attempt}
             }
+            if run['passed']:
+                return exercise
             
-        except Exception as e:
-            return {
-                'problem_statement': f'Error: {str(e)}',
-                'requirements': [],
-                'examples': [],
-                'hints': [],
-                'test_cases': '',
-                'solution': '',
-                'explanation': '',
-                'topic': topic,
-                'language': language,
-                'difficulty': difficulty
-            }
\ No newline at end of file
+            feedback = ("\n\nThe previous attempt was rejected because its solution failed its own tests:\n"
+                        f"{self._failure_report(run)}\n"
+                        "Write a new exercise whose solution and test cases agree.")
+        
+        if exercise is not None:
+            # Out of attempts: return the last exercise, flagged as unverified
+            return exercise
+        return self._error_result("could not generate a valid exercise", topic, language, difficulty)
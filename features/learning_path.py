@@ -3,21 +3,109 @@
 Learning Path Creator
 """
 
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Iterator, Optional
 from core.llm_handler import LLMHandler, PromptTemplate
+from core.structured_output import schema_prompt
+from features.topic_graph import TopicGraph, parse_timeframe_weeks
+
+_STRING_LIST = {'type': 'array', 'items': {'type': 'string'}}
+
+LEARNING_PATH_SCHEMA = {
+    'type': 'object',
+    'required': ['overview', 'phases', 'milestones', 'success_tips'],
+    'properties': {
+        'overview': {'type': 'string', 'description': '2-3 sentence overview'},
+        'phases': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'required': ['title', 'duration', 'description', 'topics', 'projects', 'resources'],
+                'properties': {
+                    'title': {'type': 'string'},
+                    'duration': {'type': 'string', 'description': 'e.g. 3 weeks'},
+                    'description': {'type': 'string'},
+                    'topics': _STRING_LIST,
+                    'projects': _STRING_LIST,
+                    'resources': _STRING_LIST
+                }
+            }
+        },
+        'milestones': _STRING_LIST,
+        'success_tips': _STRING_LIST
+    }
+}
+
+# Topics a goal needs, when no node of the topic graph matches it
+GOAL_OUTLINE_SCHEMA = {
+    'type': 'object',
+    'required': ['topics'],
+    'properties': {
+        'topics': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'required': ['title', 'hours', 'prerequisites'],
+                'properties': {
+                    'title': {'type': 'string'},
+                    'hours': {'type': 'number', 'minimum': 1, 'maximum': 80, 'default': 10},
+                    'prerequisites': _STRING_LIST,
+                    'keywords': _STRING_LIST
+                }
+            }
+        }
+    }
+}
+
+# Reusable content of topic graph phases (independent of any one goal)
+PHASE_CONTENT_SCHEMA = {
+    'type': 'object',
+    'required': ['phases'],
+    'properties': {
+        'phases': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'required': ['title', 'description', 'topics', 'projects', 'resources'],
+                'properties': {
+                    'title': {'type': 'string'},
+                    'description': {'type': 'string'},
+                    'topics': _STRING_LIST,
+                    'projects': _STRING_LIST,
+                    'resources': _STRING_LIST
+                }
+            }
+        }
+    }
+}
+
+SUCCESS_TIPS = {
+    'beginner': ['Code a little every day', 'Type examples out instead of copying them',
+                 'Ask for help after 30 minutes stuck', 'Review earlier phases briefly each week'],
+    'intermediate': ['Finish each phase with its project', 'Read other people\'s code',
+                     'Write tests for your projects', 'Keep a log of what you learned'],
+    'advanced': ['Skim what you know and go deep on gaps', 'Contribute to an open-source project',
+                 'Teach or write about each phase', 'Profile and refactor your projects']
+}
 
 class LearningPathCreator:
     """Creates personalized learning paths"""
     
-    def __init__(self, llm_handler: LLMHandler):
+    def __init__(self, llm_handler: LLMHandler, graph: Optional[TopicGraph] = None):
+        """
+        Args:
+            llm_handler: LLM handler used for generation
+            graph: Optional topic graph; when set, paths are planned locally
+                from it and the LLM only writes phases it has not cached
+        """
         self.llm_handler = llm_handler
+        self.graph = graph
     
-    def create_path(self, goal: str, current_level: str, timeframe: str,
-                   time_commitment: int, current_knowledge: List[str]) -> Dict[str, Any]:
-        """Create a personalized learning path"""
+    @staticmethod
+    def _build_prompt(goal: str, current_level: str, timeframe: str,
+                      time_commitment: int, current_knowledge: List[str]) -> str:
         knowledge_str = ", ".join(current_knowledge) if current_knowledge else "no prior knowledge"
         
-        prompt = f"""Create a learning path for: "{goal}"
+        return f"""Create a learning path for: "{goal}"
 
 Student Profile:
 - Level: {current_level}
@@ -29,41 +117,199 @@ Provide:
 1. Overview (2-3 sentences)
 2. 4-6 learning phases with topics and projects
 3. Key milestones
-4. Success tips"""
+4. Success tips
 
+{schema_prompt(LEARNING_PATH_SCHEMA)}"""
+    
+    @staticmethod
+    def _error_result(message: str, goal: str, timeframe: str) -> Dict[str, Any]:
+        return {
+            'overview': f'Error: {message}',
+            'phases': [],
+            'milestones': [],
+            'success_tips': [],
+            'goal': goal,
+            'timeframe': timeframe,
+            'estimated_hours': 0
+        }
+    
+    def create_path(self, goal: str, current_level: str, timeframe: str,
+                   time_commitment: int, current_knowledge: List[str]) -> Dict[str, Any]:
+        """Create a personalized learning path"""
+        if self.graph is not None:
+            return self._create_from_graph(goal, current_level, timeframe, time_commitment, current_knowledge)
+        
+        prompt = self._build_prompt(goal, current_level, timeframe, time_commitment, current_knowledge)
         system_prompt = PromptTemplate.get_system_prompt("learning_path")
         
         try:
-            response = self.llm_handler.generate(
-                prompt=prompt, system_message=system_prompt
+            path = self.llm_handler.generate_json(
+                prompt=prompt, system_message=system_prompt, schema=LEARNING_PATH_SCHEMA
             )
+            return dict(path, goal=goal, timeframe=timeframe, estimated_hours=time_commitment * 12)
+        
+        except Exception as e:
+            return self._error_result(str(e), goal, timeframe)
+    
+    def stream_path(self, goal: str, current_level: str, timeframe: str,
+                    time_commitment: int, current_knowledge: List[str]) -> Iterator[Dict[str, Any]]:
+        """
+        Create a learning path, yielding each part as soon as it is complete
+        
+        Yields:
+            {'section': 'overview' | 'milestones' | 'success_tips', 'value': ...},
+            {'section': 'phases', 'item': {...}} per phase, then
+            {'section': 'done', 'value': <create_path result>}
+        """
+        if self.graph is not None:
+            # Planned locally, so there is nothing to stream
+            path = self._create_from_graph(goal, current_level, timeframe, time_commitment, current_knowledge)
+            yield {'section': 'overview', 'value': path['overview']}
+            for phase in path['phases']:
+                yield {'section': 'phases', 'item': phase}
+            yield {'section': 'milestones', 'value': path['milestones']}
+            yield {'section': 'success_tips', 'value': path['success_tips']}
+            yield {'section': 'done', 'value': path}
+            return
+        
+        try:
+            for event in self.llm_handler.stream_json(
+                    prompt=self._build_prompt(goal, current_level, timeframe, time_commitment, current_knowledge),
+                    system_message=PromptTemplate.get_system_prompt("learning_path"),
+                    schema=LEARNING_PATH_SCHEMA,
+                    label="stream_path"):
+                path = event['path']
+                if event.get('done'):
+                    yield {'section': 'done',
+                           'value': dict(event['value'], goal=goal, timeframe=timeframe,
+                                         estimated_hours=time_commitment * 12)}
+                elif len(path) == 2 and path[0] == 'phases':
+                    yield {'section': 'phases', 'item': event['value']}
+                elif len(path) == 1 and path[0] != 'phases':
+                    yield {'section': path[0], 'value': event['value']}
+        except Exception as e:
+            yield {'section': 'done', 'value': self._error_result(str(e), goal, timeframe)}
+    
+    # ------------------------------------------------------------------
+    # Topic graph
+    # ------------------------------------------------------------------
+    
+    def _outline_goal(self, goal: str, level: str) -> List[str]:
+        """Ask the LLM which topics a goal needs, add them to the graph"""
+        existing = ", ".join(self.graph.titles()[:50]) or "none"
+        prompt = f"""List the topics a {level} student must learn to reach this goal: "{goal}"
+
+Give 3-8 topics in learning order, each one phase of 5-40 hours, with the
+titles of the topics it depends on. Reuse these existing topic titles where
+they fit: {existing}
+
+{schema_prompt(GOAL_OUTLINE_SCHEMA)}"""
+        outline = self.llm_handler.generate_json(
+            prompt=prompt,
+            system_message=PromptTemplate.get_system_prompt("learning_path"),
+            schema=GOAL_OUTLINE_SCHEMA
+        )
+        targets = [
+            self.graph.add_topic(topic['title'], topic['hours'], topic['prerequisites'], topic.get('keywords'))
+            for topic in outline['topics'] if topic['title'].strip()
+        ]
+        if targets:
+            self.graph.remember_goal(goal, targets)
+        return targets
+    
+    def _generate_phases(self, topics: List[Dict[str, Any]], level: str) -> Dict[str, Dict[str, Any]]:
+        """Write and cache content for uncached topics in one request, by slug"""
+        titles = "\n".join(f"- {topic['title']} (~{topic['hours']:g} hours)" for topic in topics)
+        prompt = f"""Write one learning phase per topic below for a {level} student, in the same order.
+Keep each phase independent of any particular career goal so it can be reused.
+
+{titles}
+
+{schema_prompt(PHASE_CONTENT_SCHEMA)}"""
+        data = self.llm_handler.generate_json(
+            prompt=prompt,
+            system_message=PromptTemplate.get_system_prompt("learning_path"),
+            schema=PHASE_CONTENT_SCHEMA
+        )
+        by_title = {phase['title'].strip().lower(): phase for phase in data['phases']}
+        generated = {}
+        for index, topic in enumerate(topics):
+            phase = by_title.get(topic['title'].lower())
+            if phase is None and len(data['phases']) == len(topics):
+                phase = data['phases'][index]
+            if phase is not None and phase['description']:
+                generated[topic['slug']] = {key: phase[key] for key in
+                                            ('description', 'topics', 'projects', 'resources')}
+                self.graph.put_phase(topic['slug'], level, generated[topic['slug']])
+        return generated
+    
+    @staticmethod
+    def _format_duration(hours: float, hours_per_week: int) -> str:
+        weeks = hours / max(hours_per_week, 1)
+        if weeks < 1:
+            return f"{max(1, round(weeks * 7))} days"
+        weeks = round(weeks * 2) / 2
+        return f"{weeks:g} week{'s' if weeks != 1 else ''}"
+    
+    def _create_from_graph(self, goal: str, current_level: str, timeframe: str,
+                           time_commitment: int, current_knowledge: List[str]) -> Dict[str, Any]:
+        """Plan a path on the topic graph, generating only uncached phases"""
+        try:
+            weeks = parse_timeframe_weeks(timeframe)
+            budget = weeks * time_commitment
+            
+            targets = self.graph.match_goal(goal)
+            outlined = not targets
+            if outlined:
+                targets = self._outline_goal(goal, current_level)
+            known = [slug for item in current_knowledge for slug in self.graph.match(item)]
+            plan = self.graph.plan(targets, current_level, budget_hours=budget, known=known)
+            
+            contents = {topic['slug']: self.graph.get_phase(topic['slug'], current_level)
+                        for topic in plan['topics']}
+            missing = [topic for topic in plan['topics'] if contents[topic['slug']] is None]
+            generated = {}
+            if missing:
+                try:
+                    generated = self._generate_phases(missing, current_level)
+                except Exception as e:
+                    print(f"Error generating learning path phases: {str(e)}")
+            
+            phases = []
+            for topic in plan['topics']:
+                content = contents[topic['slug']] or generated.get(topic['slug']) or {
+                    'description': f"Study {topic['title']}.", 'topics': [topic['title']],
+                    'projects': [], 'resources': []
+                }
+                phases.append(dict(content, title=topic['title'],
+                                   duration=self._format_duration(topic['hours'], time_commitment)))
+            
+            overview = (f"{len(phases)} phases toward \"{goal}\", about {plan['total_hours']:g} hours "
+                        f"at {time_commitment} hours/week.")
+            if plan['deferred']:
+                later = ", ".join(self.graph.topic(slug)['title'] for slug in plan['deferred'])
+                overview += f" Beyond {timeframe}: {later}."
             
             return {
-                'overview': f'Learning path for: {goal}',
-                'phases': [
-                    {
-                        'title': 'Foundation Phase',
-                        'duration': '4 weeks',
-                        'description': response[:300],
-                        'topics': ['Core concepts', 'Basic syntax', 'Fundamentals'],
-                        'projects': ['Starter project'],
-                        'resources': []
-                    }
+                'overview': overview,
+                'phases': phases,
+                'milestones': [
+                    f"Finish {phase['title']}" + (f": {phase['projects'][0]}" if phase['projects'] else "")
+                    for phase in phases
                 ],
-                'milestones': ['Start learning', 'Complete basics', 'Build project', 'Achieve goal'],
-                'success_tips': ['Practice daily', 'Build projects', 'Join communities', 'Stay consistent'],
+                'success_tips': SUCCESS_TIPS.get(current_level.lower(), SUCCESS_TIPS['intermediate']),
                 'goal': goal,
                 'timeframe': timeframe,
-                'estimated_hours': time_commitment * 12
+                'estimated_hours': plan['total_hours'],
+                'plan': {
+                    'budget_hours': budget,
+                    'deferred': plan['deferred'],
+                    'cached_phases': len(plan['topics']) - len(missing),
+                    'generated_phases': len(generated),
+                    'outlined_goal': outlined
+                }
             }
             
         except Exception as e:
-            return {
-                'overview': f'Error: {str(e)}',
-                'phases': [],
-                'milestones': [],
-                'success_tips': [],
-                'goal': goal,
-                'timeframe': timeframe,
-                'estimated_hours': 0
-            }
\ No newline at end of file
+            return self._error_result(str(e), goal, timeframe)
+
@@ -2,25 +2,124 @@
 Q&A System - Question Answering with RAG
 """
 
-from typing import Dict, List, Any, Optional
+import re
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Dict, List, Any, Iterator, Optional, Tuple
 from core.rag_engine import RAGEngine
 from core.llm_handler import LLMHandler, PromptTemplate
+from core.semantic_cache import SemanticCache
+from core.reranker import CrossEncoderReranker
+from core.session import SessionManager
 
 class QASystem:
     """
     Question Answering system with RAG
     """
     
-    def __init__(self, rag_engine: RAGEngine, llm_handler: LLMHandler):
+    def __init__(self,
+                 rag_engine: RAGEngine,
+                 llm_handler: LLMHandler,
+                 cache: Optional[SemanticCache] = None,
+                 context_token_budget: Optional[int] = None,
+                 reranker: Optional[CrossEncoderReranker] = None,
+                 rerank_depth: int = 50,
+                 sessions: Optional[SessionManager] = None,
+                 slo_seconds: float = 8.0,
+                 max_workers: int = 4,
+                 latency_window: int = 200):
+        """
+        Args:
+            rag_engine: Retrieval engine
+            llm_handler: LLM handler used for generation and context packing
+            cache: Optional semantic response cache
+            context_token_budget: Override the handler's context token budget
+            reranker: Optional cross-encoder; when set, retrieval over-fetches
+                rerank_depth candidates and only the best n_context_docs are kept
+            rerank_depth: Candidates retrieved for reranking
+            sessions: Optional session manager enabling follow-up questions
+            slo_seconds: p95 latency target for stream_answer; optional
+                parts (related questions) are dropped rather than waited
+                for past it
+            max_workers: Threads for work running alongside the answer
+            latency_window: Recent requests kept for latency percentiles
+        """
         self.rag_engine = rag_engine
         self.llm_handler = llm_handler
+        self.cache = cache
+        self.context_token_budget = context_token_budget
+        self.reranker = reranker
+        self.rerank_depth = rerank_depth
+        self.sessions = sessions
+        self.slo_seconds = slo_seconds
+        
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="qa")
+        self._lock = threading.Lock()
+        self._latencies = {stage: deque(maxlen=latency_window) for stage in ('total', 'retrieval', 'related')}
+        self._stats = {'streamed': 0, 'related_served': 0, 'related_dropped': 0, 'related_skipped': 0}
+        self._skips_since_probe = 0
+    
+    def _prepare(self, question: str, language: str, level: str, include_examples: bool,
+                 n_context_docs: int, session) -> Tuple[List[Dict[str, Any]], str, str]:
+        """Retrieve, rerank and pack context; returns (packed docs, system prompt, user prompt)"""
+        # Retrieve relevant documentation (over-fetch when reranking)
+        n_results = n_context_docs
+        if self.reranker is not None:
+            n_results = max(self.rerank_depth, n_context_docs)
+        retrieved_docs = self.rag_engine.semantic_search(
+            query=question,
+            language=language,
+            n_results=n_results
+        )
+        
+        if self.reranker is not None:
+            retrieved_docs = self.reranker.rerank(question, retrieved_docs, top_n=n_context_docs)
+        
+        # Keep chunks from earlier turns available to follow-ups
+        if session is not None:
+            retrieved_docs = self.sessions.merge_context(session, retrieved_docs)
+        
+        # Fit the most relevant, non-duplicate chunks into the token budget
+        packed_docs = self.llm_handler.pack_context(
+            retrieved_docs, token_budget=self.context_token_budget
+        )
+        context = [doc['content'] for doc in packed_docs]
+        
+        # Build prompt
+        system_prompt = PromptTemplate.get_system_prompt("qa")
+        user_prompt = PromptTemplate.build_qa_prompt(
+            question=question,
+            context=context,
+            language=language,
+            level=level
+        )
+        
+        if include_examples:
+            user_prompt += "\n\nPlease include practical code examples in your answer."
+        
+        return packed_docs, system_prompt, user_prompt
+    
+    @staticmethod
+    def _format_sources(packed_docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [
+            {
+                'title': doc.get('metadata', {}).get('title', 'Documentation'),
+                'content': doc['content'][:200] + "...",
+                'relevance': doc['relevance'],
+                'url': doc.get('metadata', {}).get('url', '')
+            }
+            for doc in packed_docs[:3]
+        ]
     
     def answer_question(self,
                        question: str,
                        language: str = "Python",
                        level: str = "Intermediate",
                        include_examples: bool = True,
-                       n_context_docs: int = 5) -> Dict[str, Any]:
+                       n_context_docs: int = 5,
+                       session_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Answer a programming question using RAG
         
@@ -30,56 +129,57 @@ class QASystem:
             level: User's skill level
             include_examples: Whether to include code examples
             n_context_docs: Number of context documents to retrieve
+            session_id: Conversation to continue (requires a session manager);
+                earlier turns and their retrieved context carry over
             
         Returns:
             Dictionary with answer and sources
         """
+        session = None
+        if session_id is not None and self.sessions is not None:
+            session = self.sessions.get_session(session_id)
+        # Follow-ups depend on the conversation, so only first turns are cacheable
+        cacheable = self.cache is not None and (session is None or not session.messages)
+        
         try:
-            # Retrieve relevant documentation
-            retrieved_docs = self.rag_engine.semantic_search(
-                query=question,
-                language=language,
-                n_results=n_context_docs
-            )
-            
-            # Extract context
-            context = [doc['content'] for doc in retrieved_docs]
+            # Serve near-duplicate questions from the semantic cache
+            if cacheable:
+                cached = self.cache.lookup(question, language, level, n_context_docs, include_examples)
+                if cached is not None:
+                    if session is not None:
+                        self.sessions.record_turn(session, question, cached['answer'])
+                    return cached
             
-            # Build prompt
-            system_prompt = PromptTemplate.get_system_prompt("qa")
-            user_prompt = PromptTemplate.build_qa_prompt(
-                question=question,
-                context=context,
-                language=language,
-                level=level
+            packed_docs, system_prompt, user_prompt = self._prepare(
+                question, language, level, include_examples, n_context_docs, session
             )
             
-            if include_examples:
-                user_prompt += "\n\nPlease include practical code examples in your answer."
-            
             # Generate answer
-            answer = self.llm_handler.generate(
-                prompt=user_prompt,
-                system_message=system_prompt
-            )
+            if session is not None:
+                messages = self.sessions.build_messages(session, user_prompt, system_prompt)
+                answer = self.llm_handler.chat(messages)
+                self.sessions.record_turn(session, question, answer)
+            else:
+                answer = self.llm_handler.generate(
+                    prompt=user_prompt,
+                    system_message=system_prompt
+                )
             
-            # Format sources
-            sources = [
-                {
-                    'title': doc.get('metadata', {}).get('title', 'Documentation'),
-                    'content': doc['content'][:200] + "...",
-                    'relevance': doc['relevance'],
-                    'url': doc.get('metadata', {}).get('url', '')
-                }
-                for doc in retrieved_docs[:3]
-            ]
+            sources = self._format_sources(packed_docs)
             
-            return {
+            result = {
                 'answer': answer,
                 'sources': sources,
                 'language': language,
                 'level': level
             }
+            if session is not None:
+                result['session_id'] = session.session_id
+            
+            if cacheable:
+                self.cache.store(question, language, level, n_context_docs, result, include_examples)
+            
+            return result
             
         except Exception as e:
             print(f"Error answering question: {str(e)}")
@@ -90,6 +190,176 @@ class QASystem:
                 'level': level
             }
     
+    @staticmethod
+    def _percentile(values, fraction: float = 0.95) -> Optional[float]:
+        if not values:
+            return None
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+    
+    def _timed(self, stage: str, function, *args):
+        """Run a stage and record its latency"""
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            with self._lock:
+                self._latencies[stage].append(time.perf_counter() - start)
+    
+    def _start_related(self, question: str, n_related: int):
+        """Start related-question generation unless it would only be dropped"""
+        with self._lock:
+            related_p95 = self._percentile(self._latencies['related'])
+            # Recently too slow to ever make the deadline: skip it, but probe
+            # every tenth request so the estimate can recover
+            if related_p95 is not None and related_p95 > self.slo_seconds and self._skips_since_probe < 9:
+                self._skips_since_probe += 1
+                self._stats['related_skipped'] += 1
+                return None
+            self._skips_since_probe = 0
+        return self._executor.submit(self._timed, 'related', self.get_related_questions, question, n_related)
+    
+    def stream_answer(self,
+                      question: str,
+                      language: str = "Python",
+                      level: str = "Intermediate",
+                      include_examples: bool = True,
+                      n_context_docs: int = 5,
+                      session_id: Optional[str] = None,
+                      n_related: int = 3) -> Iterator[Dict[str, Any]]:
+        """
+        Answer a question with related questions and sources fanned out
+        
+        Related questions only depend on the question, so they are generated
+        in the background while documentation is retrieved and the answer
+        streams. Related questions are optional: after the answer they are
+        waited for only until slo_seconds after the request started, and not
+        requested at all while their recent p95 alone exceeds the SLO. A
+        dropped or abandoned request only cancels them if they have not
+        started yet; a running call finishes in the background and its
+        result is discarded.
+        
+        Args:
+            question: User's question
+            language: Programming language context
+            level: User's skill level
+            include_examples: Whether to include code examples
+            n_context_docs: Number of context documents to retrieve
+            session_id: Conversation to continue (see answer_question)
+            n_related: Related questions to suggest (0 disables them)
+            
+        Yields:
+            {'type': 'sources', 'sources': [...]},
+            {'type': 'chunk', 'text': ...} per answer chunk,
+            {'type': 'related', 'questions': [...]} if they made the deadline,
+            then {'type': 'done', 'result': {...}} with the answer_question
+            fields plus 'related_questions', 'dropped' and 'timings'. If the
+            answer fails part-way, 'answer' keeps the text already streamed
+            and 'error' says what went wrong.
+        """
+        start = time.perf_counter()
+        deadline = start + self.slo_seconds
+        timings: Dict[str, float] = {}
+        dropped: List[str] = []
+        with self._lock:
+            self._stats['streamed'] += 1
+        
+        related_future = self._start_related(question, n_related) if n_related > 0 else None
+        if n_related > 0 and related_future is None:
+            dropped.append('related_questions')
+        
+        session = None
+        if session_id is not None and self.sessions is not None:
+            session = self.sessions.get_session(session_id)
+        cacheable = self.cache is not None and (session is None or not session.messages)
+        
+        parts: List[str] = []
+        try:
+            try:
+                cached = self.cache.lookup(question, language, level, n_context_docs, include_examples) if cacheable else None
+                if cached is not None:
+                    if session is not None:
+                        self.sessions.record_turn(session, question, cached['answer'])
+                    result = dict(cached)
+                    yield {'type': 'sources', 'sources': result['sources']}
+                    yield {'type': 'chunk', 'text': result['answer']}
+                else:
+                    packed_docs, system_prompt, user_prompt = self._timed(
+                        'retrieval', self._prepare, question, language, level, include_examples, n_context_docs, session
+                    )
+                    timings['retrieval'] = time.perf_counter() - start
+                    sources = self._format_sources(packed_docs)
+                    yield {'type': 'sources', 'sources': sources}
+                    
+                    if session is not None:
+                        messages = self.sessions.build_messages(session, user_prompt, system_prompt)
+                        stream = self.llm_handler.chat_streaming(messages, label="qa")
+                    else:
+                        stream = self.llm_handler.generate_streaming(user_prompt, system_prompt, label="qa")
+                    
+                    for chunk in stream:
+                        if 'first_chunk' not in timings:
+                            timings['first_chunk'] = time.perf_counter() - start
+                        parts.append(chunk)
+                        yield {'type': 'chunk', 'text': chunk}
+                    
+                    answer = "".join(parts)
+                    if session is not None:
+                        self.sessions.record_turn(session, question, answer)
+                    result = {
+                        'answer': answer,
+                        'sources': sources,
+                        'language': language,
+                        'level': level
+                    }
+                    if session is not None:
+                        result['session_id'] = session.session_id
+                    if cacheable:
+                        self.cache.store(question, language, level, n_context_docs, dict(result), include_examples)
+                timings['answer'] = time.perf_counter() - start
+                
+            except Exception as e:
+                print(f"Error answering question: {str(e)}")
+                # Keep whatever the user has already seen
+                answer = "".join(parts) if parts else f"I encountered an error processing your question: {str(e)}"
+                result = {
+                    'answer': answer,
+                    'sources': [],
+                    'language': language,
+                    'level': level,
+                    'error': str(e)
+                }
+            
+            # Related questions are optional: their failure never touches the answer
+            related = []
+            if related_future is not None:
+                try:
+                    related = related_future.result(timeout=max(0.0, deadline - time.perf_counter()))
+                    with self._lock:
+                        self._stats['related_served'] += 1
+                    yield {'type': 'related', 'questions': related}
+                except FutureTimeout:
+                    dropped.append('related_questions')
+                    with self._lock:
+                        self._stats['related_dropped'] += 1
+                except Exception as e:
+                    print(f"Error generating related questions: {str(e)}")
+                    dropped.append('related_questions')
+                    with self._lock:
+                        self._stats['related_dropped'] += 1
+            result['related_questions'] = related
+        finally:
+            # Also runs when the consumer stops reading early
+            if related_future is not None:
+                related_future.cancel()
+        
+        timings['total'] = time.perf_counter() - start
+        with self._lock:
+            self._latencies['total'].append(timings['total'])
+        result['dropped'] = dropped
+        result['timings'] = timings
+        yield {'type': 'done', 'result': result}
+    
     def get_related_questions(self, 
                              question: str,
                              n_questions: int = 3) -> List[str]:
@@ -114,10 +384,10 @@ These should be:
 Return only the questions, numbered 1-{n_questions}."""
 
         try:
-            response = self.llm_handler.generate(prompt=prompt)
+            response = self.llm_handler.generate(prompt=prompt, max_tokens=60 * n_questions)
             # Parse numbered questions
             questions = [
-                line.strip()[3:] for line in response.split('\n') 
+                re.sub(r"^\d+[.)]?\s*", "", line.strip()) for line in response.split('\n') 
                 if line.strip() and line.strip()[0].isdigit()
             ]
             return questions[:n_questions]
@@ -160,4 +430,21 @@ Make it engaging and easy to understand."""
             )
             return explanation
         except Exception as e:
-            return f"Error generating explanation: {str(e)}"
\ No newline at end of file
+            return f"Error generating explanation: {str(e)}"
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get latency percentiles per stage, SLO attainment and related-question counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            latencies = {stage: list(values) for stage, values in self._latencies.items()}
+        for stage, values in latencies.items():
+            stats[f'{stage}_p50'] = self._percentile(values, 0.5)
+            stats[f'{stage}_p95'] = self._percentile(values)
+        totals = latencies['total']
+        stats['slo_seconds'] = self.slo_seconds
+        stats['slo_attainment'] = sum(1 for t in totals if t <= self.slo_seconds) / len(totals) if totals else None
+        return stats
+    
+    def close(self):
+        self._executor.shutdown(wait=False)
+
@@ -0,0 +1,357 @@
+"""
+Topic Graph - Reusable curriculum DAG with cached phase content per (topic, level)
+"""
+
+import os
+import re
+import json
+import time
+import heapq
+import sqlite3
+import threading
+from typing import Dict, List, Any, Iterable, Optional, Set
+
+# (title, hours at intermediate pace, prerequisite titles, goal keywords)
+SEED_TOPICS = [
+    ("Programming Fundamentals", 15, [], ["programming", "coding", "fundamentals", "beginner"]),
+    ("Python Basics", 20, ["Programming Fundamentals"], ["python"]),
+    ("Git and Version Control", 6, [], ["git", "github", "version control"]),
+    ("Data Structures", 20, ["Programming Fundamentals"], ["data structures"]),
+    ("Algorithms", 30, ["Data Structures"], ["algorithms", "algorithm", "leetcode", "interview", "interviews"]),
+    ("Object-Oriented Programming", 15, ["Python Basics"], ["oop", "object-oriented", "classes"]),
+    ("Testing", 10, ["Python Basics"], ["testing", "tests", "pytest", "tdd"]),
+    ("Async Programming", 12, ["Object-Oriented Programming"], ["async", "asyncio", "concurrency"]),
+    ("SQL and Databases", 15, ["Programming Fundamentals"], ["sql", "database", "databases", "postgres", "mysql"]),
+    ("HTML and CSS", 15, [], ["html", "css", "web", "frontend", "front-end"]),
+    ("JavaScript Basics", 20, ["Programming Fundamentals"], ["javascript", "js"]),
+    ("React", 25, ["JavaScript Basics", "HTML and CSS"], ["react"]),
+    ("HTTP and REST APIs", 10, ["Programming Fundamentals"], ["http", "rest", "api", "apis"]),
+    ("Backend Web Development", 30, ["Python Basics", "HTTP and REST APIs", "SQL and Databases"],
+     ["backend", "back-end", "django", "flask", "fastapi"]),
+    ("Data Analysis with Pandas", 20, ["Python Basics"], ["pandas", "data analysis", "data science", "analytics"]),
+    ("Statistics", 15, [], ["statistics", "probability"]),
+    ("Machine Learning", 40, ["Data Analysis with Pandas", "Statistics"],
+     ["machine learning", "ml", "ai", "scikit-learn"]),
+    ("Deep Learning", 40, ["Machine Learning"], ["deep learning", "neural networks", "pytorch", "tensorflow"]),
+    ("Linux Command Line", 8, [], ["linux", "shell", "bash", "terminal"]),
+    ("Docker and Deployment", 12, ["Linux Command Line", "Backend Web Development"],
+     ["docker", "deployment", "deploy", "devops"]),
+]
+
+# Study-time multiplier by student level
+LEVEL_PACE = {'beginner': 1.3, 'intermediate': 1.0, 'advanced': 0.7}
+
+# Keywords too broad to pick a goal's targets on their own ("Learn Rust
+# programming" is not about Programming Fundamentals)
+GENERIC_KEYWORDS = {
+    'programming', 'coding', 'fundamentals', 'beginner', 'web', 'api', 'apis', 'http', 'rest',
+    'classes', 'tests'
+}
+
+# Goal words that say nothing about what to study
+GOAL_FILLER = {
+    'a', 'an', 'the', 'and', 'or', 'to', 'for', 'with', 'in', 'on', 'of', 'as', 'at', 'by', 'from',
+    'into', 'i', 'me', 'my', 'want', 'would', 'like', 'how', 'become', 'learn', 'learning', 'study',
+    'master', 'get', 'start', 'job', 'jobs', 'career', 'role', 'developer', 'developers', 'engineer',
+    'engineering', 'development', 'programmer', 'skills', 'build', 'building', 'using', 'use', 'make',
+    'good', 'better', 'expert', 'professional', 'prepare', 'services', 'service', 'app', 'apps',
+    'application', 'applications', 'language', 'day', 'days', 'week', 'weeks', 'month', 'months',
+    'year', 'years', 'hours'
+}
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9+#.-]*")
+
+_TIMEFRAME = re.compile(r"(\d+(?:\.\d+)?)(?:\s*(?:-|to)\s*(\d+(?:\.\d+)?))?\s*(day|week|month|year)", re.IGNORECASE)
+_UNIT_WEEKS = {'day': 1 / 7, 'week': 1.0, 'month': 52 / 12, 'year': 52.0}
+
+
+def slugify(title: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", title.lower()).strip("-")
+
+
+def parse_timeframe_weeks(timeframe: str, default: float = 12.0) -> float:
+    """'3 months', '6-8 weeks', '1 year' -> weeks (upper bound of a range)"""
+    match = _TIMEFRAME.search(timeframe or "")
+    if not match:
+        return default
+    amount = float(match.group(2) or match.group(1))
+    return amount * _UNIT_WEEKS[match.group(3).lower()]
+
+
+class TopicGraph:
+    """
+    Persistent DAG of curriculum topics.
+
+    Each node is one learning phase with an estimated study time and
+    prerequisite edges; generated phase content is cached per (topic,
+    level) so goals that share phases ("Python Basics", "OOP", ...) reuse
+    it. Paths are planned locally: the goal is matched to target nodes, the
+    prerequisite closure is ordered topologically, known topics are dropped
+    and the rest is fitted into the student's hour budget. Only phases with
+    no cached content (and goals no node matches) need the LLM.
+    """
+
+    def __init__(self, store_path: str = "./data/cache/topic_graph.sqlite3", seed: bool = True):
+        """
+        Initialize Topic Graph
+
+        Args:
+            store_path: SQLite file holding topics, goals and phase content
+            seed: Add the built-in SEED_TOPICS on first use
+        """
+        self._lock = threading.Lock()
+        self._topics: Dict[str, Dict[str, Any]] = {}
+        self._phases: Dict[str, Dict[str, Any]] = {}
+        self._goals: Dict[str, List[str]] = {}
+        self._stats = {'plans': 0, 'phase_hits': 0, 'phase_misses': 0, 'goal_hits': 0, 'goal_misses': 0}
+
+        directory = os.path.dirname(store_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(store_path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS topics (
+                slug TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                hours REAL NOT NULL,
+                prerequisites TEXT NOT NULL,
+                keywords TEXT NOT NULL,
+                position INTEGER NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS phases (
+                slug TEXT NOT NULL,
+                level TEXT NOT NULL,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (slug, level)
+            )"""
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS goals (goal TEXT PRIMARY KEY, targets TEXT NOT NULL)")
+        self._conn.commit()
+
+        for slug, title, hours, prerequisites, keywords, position in self._conn.execute(
+                "SELECT slug, title, hours, prerequisites, keywords, position FROM topics"):
+            self._topics[slug] = {'slug': slug, 'title': title, 'hours': hours, 'position': position,
+                                  'prerequisites': json.loads(prerequisites), 'keywords': json.loads(keywords)}
+        for slug, level, data in self._conn.execute("SELECT slug, level, data FROM phases"):
+            self._phases[f"{slug}|{level}"] = json.loads(data)
+        for goal, targets in self._conn.execute("SELECT goal, targets FROM goals"):
+            self._goals[goal] = json.loads(targets)
+
+        if seed and not self._topics:
+            for title, hours, prerequisites, keywords in SEED_TOPICS:
+                self.add_topic(title, hours, prerequisites, keywords)
+
+    # ------------------------------------------------------------------
+    # Graph
+    # ------------------------------------------------------------------
+
+    def _ancestors(self, slugs: Iterable[str]) -> Set[str]:
+        """Slugs plus everything they transitively depend on (lock held)"""
+        seen: Set[str] = set()
+        stack = [slug for slug in slugs if slug in self._topics]
+        while stack:
+            slug = stack.pop()
+            if slug in seen:
+                continue
+            seen.add(slug)
+            stack.extend(p for p in self._topics[slug]['prerequisites'] if p in self._topics)
+        return seen
+
+    def add_topic(self,
+                  title: str,
+                  hours: float,
+                  prerequisites: Optional[List[str]] = None,
+                  keywords: Optional[List[str]] = None) -> str:
+        """
+        Add a topic (or merge into an existing one with the same slug)
+
+        Prerequisites are titles or slugs of known topics; unknown ones and
+        edges that would create a cycle are ignored.
+
+        Returns:
+            The topic's slug
+        """
+        slug = slugify(title)
+        with self._lock:
+            topic = self._topics.get(slug)
+            if topic is None:
+                topic = {'slug': slug, 'title': title, 'hours': float(hours), 'prerequisites': [],
+                         'keywords': [], 'position': len(self._topics)}
+            for prerequisite in prerequisites or []:
+                parent = slugify(prerequisite)
+                if (parent in self._topics and parent != slug and parent not in topic['prerequisites']
+                        and slug not in self._ancestors([parent])):
+                    topic['prerequisites'].append(parent)
+            for keyword in [title] + list(keywords or []):
+                keyword = keyword.strip().lower()
+                if keyword and keyword not in topic['keywords']:
+                    topic['keywords'].append(keyword)
+            self._topics[slug] = topic
+            self._conn.execute(
+                "INSERT OR REPLACE INTO topics (slug, title, hours, prerequisites, keywords, position) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (slug, topic['title'], topic['hours'], json.dumps(topic['prerequisites']),
+                 json.dumps(topic['keywords']), topic['position'])
+            )
+            self._conn.commit()
+        return slug
+
+    def topic(self, slug: str) -> Dict[str, Any]:
+        return dict(self._topics[slug])
+
+    def titles(self) -> List[str]:
+        """Topic titles in curriculum order"""
+        with self._lock:
+            return [topic['title'] for topic in sorted(self._topics.values(), key=lambda t: t['position'])]
+
+    @staticmethod
+    def _keyword_hits(topic: Dict[str, Any], text: str) -> List[str]:
+        return [keyword for keyword in topic['keywords']
+                if re.search(rf"(?<![\w-]){re.escape(keyword)}(?![\w-])", text)]
+
+    def match(self, text: str) -> List[str]:
+        """Topics whose keywords appear in the text, in curriculum order"""
+        text = text.lower()
+        with self._lock:
+            matched = [topic for topic in self._topics.values() if self._keyword_hits(topic, text)]
+        return [topic['slug'] for topic in sorted(matched, key=lambda t: t['position'])]
+
+    @staticmethod
+    def _words(text: str) -> Set[str]:
+        return {word.rstrip('.') for word in _WORD.findall(text)}
+
+    def _match_specific(self, goal: str) -> List[str]:
+        """
+        Topics a goal names specifically, or [] unless keywords cover every
+        specific word of the goal
+
+        Generic keywords (GENERIC_KEYWORDS) count toward coverage but never
+        make a topic a target by themselves.
+        """
+        text = goal.lower()
+        terms = {word for word in self._words(text) - GOAL_FILLER - GENERIC_KEYWORDS if not word.isdigit()}
+        covered: Set[str] = set()
+        targets = []
+        with self._lock:
+            for topic in sorted(self._topics.values(), key=lambda t: t['position']):
+                hits = self._keyword_hits(topic, text)
+                for keyword in hits:
+                    covered |= self._words(keyword)
+                if any(keyword not in GENERIC_KEYWORDS for keyword in hits):
+                    targets.append(topic['slug'])
+        return targets if targets and terms <= covered else []
+
+    @staticmethod
+    def goal_key(goal: str) -> str:
+        return re.sub(r"\s+", " ", goal.strip().lower())
+
+    def match_goal(self, goal: str) -> List[str]:
+        """
+        Target topics for a goal: a remembered outline, else keyword matches
+        that cover the whole goal ([] when part of it is off the graph)
+        """
+        with self._lock:
+            targets = self._goals.get(self.goal_key(goal))
+        if targets is None:
+            targets = self._match_specific(goal)
+        with self._lock:
+            self._stats['goal_hits' if targets else 'goal_misses'] += 1
+        return targets
+
+    def remember_goal(self, goal: str, targets: List[str]):
+        """Store the target topics of a goal that needed an LLM outline"""
+        with self._lock:
+            self._goals[self.goal_key(goal)] = list(targets)
+            self._conn.execute("INSERT OR REPLACE INTO goals (goal, targets) VALUES (?, ?)",
+                               (self.goal_key(goal), json.dumps(targets)))
+            self._conn.commit()
+
+    def plan(self,
+             targets: List[str],
+             level: str = "Intermediate",
+             budget_hours: Optional[float] = None,
+             known: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Order the topics needed for the targets and fit them into a budget
+
+        Args:
+            targets: Slugs the path should reach
+            level: Student level (scales study hours, see LEVEL_PACE)
+            budget_hours: Hours available; topics that do not fit, and
+                topics depending on them, are deferred
+            known: Slugs the student already knows (their prerequisites
+                are assumed known too)
+
+        Returns:
+            Dictionary with ordered 'topics' ([{'slug', 'title', 'hours'}]),
+            'deferred' slugs, 'total_hours' and 'budget_hours'
+        """
+        pace = LEVEL_PACE.get(level.lower(), 1.0)
+        with self._lock:
+            self._stats['plans'] += 1
+            needed = self._ancestors(targets) - self._ancestors(known or [])
+
+            # Kahn's algorithm within the closure; ties follow curriculum order
+            indegree = {slug: sum(1 for p in self._topics[slug]['prerequisites'] if p in needed)
+                        for slug in needed}
+            ready = [(self._topics[slug]['position'], slug) for slug, degree in indegree.items() if degree == 0]
+            heapq.heapify(ready)
+            order = []
+            while ready:
+                _, slug = heapq.heappop(ready)
+                order.append(slug)
+                for child in needed:
+                    if slug in self._topics[child]['prerequisites']:
+                        indegree[child] -= 1
+                        if indegree[child] == 0:
+                            heapq.heappush(ready, (self._topics[child]['position'], child))
+
+            topics, deferred, total = [], [], 0.0
+            for slug in order:
+                topic = self._topics[slug]
+                hours = round(topic['hours'] * pace, 1)
+                blocked = any(p in deferred for p in topic['prerequisites'])
+                if blocked or (budget_hours is not None and total + hours > budget_hours):
+                    deferred.append(slug)
+                    continue
+                topics.append({'slug': slug, 'title': topic['title'], 'hours': hours})
+                total += hours
+
+        return {'topics': topics, 'deferred': deferred, 'total_hours': round(total, 1),
+                'budget_hours': budget_hours}
+
+    # ------------------------------------------------------------------
+    # Phase content
+    # ------------------------------------------------------------------
+
+    def get_phase(self, slug: str, level: str) -> Optional[Dict[str, Any]]:
+        """Cached content of a topic at a level"""
+        with self._lock:
+            content = self._phases.get(f"{slug}|{level.lower()}")
+            self._stats['phase_hits' if content is not None else 'phase_misses'] += 1
+        return content
+
+    def put_phase(self, slug: str, level: str, content: Dict[str, Any]):
+        """Cache generated content of a topic at a level"""
+        with self._lock:
+            self._phases[f"{slug}|{level.lower()}"] = content
+            self._conn.execute(
+                "INSERT OR REPLACE INTO phases (slug, level, data, created_at) VALUES (?, ?, ?, ?)",
+                (slug, level.lower(), json.dumps(content), time.time())
+            )
+            self._conn.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get graph size and phase cache hit rate"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['topics'] = len(self._topics)
+            stats['edges'] = sum(len(topic['prerequisites']) for topic in self._topics.values())
+            stats['cached_phases'] = len(self._phases)
+            stats['goals'] = len(self._goals)
+        lookups = stats['phase_hits'] + stats['phase_misses']
+        stats['phase_hit_rate'] = stats['phase_hits'] / lookups if lookups else 0.0
+        return stats
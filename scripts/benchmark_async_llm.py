@@ -0,0 +1,72 @@
+"""
+Benchmark Async LLM Handler
+
+Fires many concurrent completions at the local fake OpenAI server and
+compares async throughput with the blocking client.
+
+Usage:
+    python scripts/benchmark_async_llm.py --requests 500 --concurrency 200 --latency 1.0
+"""
+
+import sys
+import os
+import time
+import asyncio
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.fake_openai_server import start_server
+
+
+async def run_async(handler, n_requests: int):
+    tasks = [handler.agenerate(f"Question {i}") for i in range(n_requests)]
+    results = await asyncio.gather(*tasks)
+
+    chunks = [chunk async for chunk in handler.astream("Stream this answer please")]
+    await handler.aclose()
+    return results, chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=1.0)
+    parser.add_argument('--sync-requests', type=int, default=5)
+    args = parser.parse_args()
+
+    server, base_url = start_server(latency=args.latency)
+    os.environ['OPENAI_BASE_URL'] = base_url
+    os.environ.setdefault('OPENAI_API_KEY', 'fake-key')
+
+    from core.llm_handler import LLMHandler
+    handler = LLMHandler(model="gpt-4o", max_concurrency=args.concurrency)
+
+    print("=" * 60)
+    print("CodeMentor - Async LLM Benchmark")
+    print("=" * 60)
+
+    try:
+        start = time.perf_counter()
+        for i in range(args.sync_requests):
+            handler.generate(f"Question {i}")
+        sync_rate = args.sync_requests / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        results, chunks = asyncio.run(run_async(handler, args.requests))
+        async_seconds = time.perf_counter() - start
+
+        print(f"\nUpstream latency:   {args.latency:.2f}s")
+        print(f"Blocking generate:  {sync_rate:8.1f} requests/s")
+        print(f"Async agenerate:    {args.requests / async_seconds:8.1f} requests/s "
+              f"({args.requests} requests, concurrency {args.concurrency})")
+        print(f"Completed:          {sum(1 for r in results if r)}/{args.requests}")
+        print(f"Stream chunks:      {len(chunks)}")
+    finally:
+        server.shutdown()
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
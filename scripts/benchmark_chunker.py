@@ -0,0 +1,104 @@
+"""
+Benchmark Chunker Throughput
+
+Streams a large documentation dump through StructuredChunker and reports
+MB/s, chunks/s and peak RSS (which should stay flat however big the input
+is). The legacy DocumentChunker.chunk_by_paragraphs is timed on a prefix
+of the same data for comparison, since it needs the whole text in memory.
+
+Without --input, a synthetic Markdown dump of --size-mb is generated.
+
+Usage:
+    python scripts/benchmark_chunker.py --size-mb 4096
+    python scripts/benchmark_chunker.py --input /path/to/docs_dump.md
+"""
+
+import sys
+import os
+import time
+import argparse
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.chunker import StructuredChunker
+from core.rag_engine import DocumentChunker
+from scripts.initialize_db import load_sample_documents
+
+
+def write_synthetic_dump(path: str, size_mb: int):
+    """Repeat the sample docs as Markdown sections until the file reaches size_mb"""
+    target = size_mb * 1024 * 1024
+    written = 0
+    section = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        while written < target:
+            for doc in load_sample_documents():
+                text = (f"# {doc['metadata']['title']} {section}\n\n"
+                        f"## Overview\n\n{doc['text']}\n\n"
+                        f"```python\n" + "\n".join(f"value_{i} = compute({i})" for i in range(40)) + "\n```\n\n")
+                f.write(text)
+                written += len(text.encode('utf-8'))
+            section += 1
+
+
+def peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            return next(int(line.split()[1]) for line in f if line.startswith("VmHWM")) / 1024.0
+    except (OSError, StopIteration):
+        return float('nan')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--input', default=None, help="Documentation dump to chunk")
+    parser.add_argument('--size-mb', type=int, default=256, help="Size of the synthetic dump")
+    parser.add_argument('--max-tokens', type=int, default=256)
+    parser.add_argument('--overlap-tokens', type=int, default=32)
+    parser.add_argument('--legacy-mb', type=int, default=32, help="Prefix used for the legacy chunker")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("CodeMentor - Chunker Throughput Benchmark")
+    print("=" * 60)
+
+    path = args.input
+    generated = path is None
+    if generated:
+        path = os.path.join(tempfile.mkdtemp(prefix="codementor_bench_"), "dump.md")
+        print(f"Generating {args.size_mb} MB synthetic dump...")
+        write_synthetic_dump(path, args.size_mb)
+
+    try:
+        size_mb = os.path.getsize(path) / 1024 ** 2
+        chunker = StructuredChunker(max_tokens=args.max_tokens, overlap_tokens=args.overlap_tokens)
+
+        start = time.perf_counter()
+        n_chunks = 0
+        for _ in chunker.chunk_file(path):
+            n_chunks += 1
+        seconds = time.perf_counter() - start
+
+        print(f"\nInput:             {size_mb:10.1f} MB")
+        print(f"StructuredChunker: {size_mb / seconds:10.2f} MB/s  {n_chunks / seconds:10.1f} chunks/s "
+              f"({n_chunks} chunks)")
+        print(f"Peak RSS:          {peak_rss_mb():10.1f} MB")
+
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            prefix = f.read(args.legacy_mb * 1024 * 1024)
+        start = time.perf_counter()
+        legacy_chunks = DocumentChunker.chunk_by_paragraphs(prefix, max_length=800)
+        seconds = time.perf_counter() - start
+        prefix_mb = len(prefix.encode('utf-8')) / 1024 ** 2
+        print(f"Legacy (prefix):   {prefix_mb / seconds:10.2f} MB/s  {len(legacy_chunks) / seconds:10.1f} chunks/s "
+              f"(character-sized, not token-sized)")
+    finally:
+        if generated:
+            os.remove(path)
+            os.rmdir(os.path.dirname(path))
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
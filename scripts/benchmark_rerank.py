@@ -0,0 +1,82 @@
+"""
+Benchmark Rerank Depth
+
+Measures retrieval and cross-encoder rerank latency separately for several
+over-fetch depths, cold (empty score cache) and warm, using the sample
+corpus from initialize_db repeated to a realistic size.
+
+Usage:
+    python scripts/benchmark_rerank.py --depths 10 25 50 100
+"""
+
+import sys
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.rag_engine import RAGEngine
+from core.reranker import CrossEncoderReranker
+from scripts.initialize_db import load_sample_documents
+from scripts.benchmark_hybrid_retrieval import LABELED_QUERIES
+
+
+def make_corpus(copies: int):
+    """Sample documents repeated with distinct suffixes so every chunk is unique"""
+    return [
+        {'text': f"{doc['text']}\n\n(variant {i})", 'metadata': dict(doc['metadata'])}
+        for i in range(copies)
+        for doc in load_sample_documents()
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--depths', type=int, nargs='+', default=[10, 25, 50, 100])
+    parser.add_argument('--top-n', type=int, default=5)
+    parser.add_argument('--copies', type=int, default=40)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("CodeMentor - Rerank Depth Benchmark")
+    print("=" * 60)
+
+    persist_directory = tempfile.mkdtemp(prefix="codementor_bench_")
+    try:
+        rag_engine = RAGEngine(collection_name="bench", persist_directory=persist_directory,
+                               embedding_cache_dir=None)
+        rag_engine.add_documents(make_corpus(args.copies))
+        reranker = CrossEncoderReranker()
+        rag_engine.retrieve(LABELED_QUERIES[0][0])
+        reranker.rerank("warm-up", [{'content': "warm-up"}])
+
+        print(f"\n{'depth':>6} {'retrieve ms':>12} {'rerank cold ms':>15} {'rerank warm ms':>15}")
+        for depth in args.depths:
+            retrieve_times, cold_times, warm_times = [], [], []
+            reranker.clear()
+            for query, _ in LABELED_QUERIES:
+                start = time.perf_counter()
+                docs = rag_engine.retrieve(query, n_results=depth)
+                retrieve_times.append(time.perf_counter() - start)
+
+                for times in (cold_times, warm_times):
+                    start = time.perf_counter()
+                    reranker.rerank(query, docs, top_n=args.top_n)
+                    times.append(time.perf_counter() - start)
+
+            print(f"{depth:6d} {statistics.median(retrieve_times) * 1000:12.1f} "
+                  f"{statistics.median(cold_times) * 1000:15.1f} "
+                  f"{statistics.median(warm_times) * 1000:15.1f}")
+
+        print(f"\nReranker stats: {reranker.get_stats()}")
+    finally:
+        shutil.rmtree(persist_directory, ignore_errors=True)
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,87 @@
+"""
+Benchmark Batched Retrieval
+
+Compares query throughput of RAGEngine.retrieve_many against looping over
+RAGEngine.retrieve, using the sample corpus from initialize_db.
+
+Usage:
+    python scripts/benchmark_retrieve_many.py --queries 2000
+"""
+
+import sys
+import os
+import time
+import shutil
+import argparse
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.rag_engine import RAGEngine
+from scripts.initialize_db import load_sample_documents
+
+TEMPLATES = [
+    "How do I use {} in {}?",
+    "What is the difference between {} and lists in {}?",
+    "Why does {} raise an error in {}?",
+    "Best practices for {} in {} code",
+]
+TOPICS = ['functions', 'exceptions', 'classes', 'promises', 'append(x)',
+          'ZeroDivisionError', 'async/await', 'decorators', 'inheritance']
+LANGUAGES = ['Python', 'JavaScript']
+
+
+def make_queries(n: int):
+    """Build n distinct queries so the embedding cache cannot help either side"""
+    return [
+        TEMPLATES[i % len(TEMPLATES)].format(TOPICS[i % len(TOPICS)], LANGUAGES[i % len(LANGUAGES)])
+        + f" (#{i})"
+        for i in range(n)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--n-results', type=int, default=5)
+    parser.add_argument('--language', default=None, help="Optional language filter")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("CodeMentor - Batched Retrieval Benchmark")
+    print("=" * 60)
+
+    persist_directory = tempfile.mkdtemp(prefix="codementor_bench_")
+    try:
+        rag_engine = RAGEngine(collection_name="bench", persist_directory=persist_directory,
+                               embedding_cache_dir=None)
+        rag_engine.add_documents(load_sample_documents())
+        filters = {'language': args.language} if args.language else None
+
+        queries = make_queries(args.queries)
+        rag_engine.retrieve(queries[0], n_results=args.n_results, filters=filters)  # warm-up
+
+        start = time.perf_counter()
+        looped = [rag_engine.retrieve(q, n_results=args.n_results, filters=filters) for q in queries]
+        loop_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batched = rag_engine.retrieve_many(queries, n_results=args.n_results, filters=filters)
+        batch_seconds = time.perf_counter() - start
+
+        agreement = sum(
+            [d['id'] for d in a] == [d['id'] for d in b] for a, b in zip(looped, batched)
+        ) / len(queries)
+
+        print(f"\nQueries:           {len(queries)}")
+        print(f"retrieve loop:     {len(queries) / loop_seconds:10.1f} queries/s")
+        print(f"retrieve_many:     {len(queries) / batch_seconds:10.1f} queries/s")
+        print(f"Speedup:           {loop_seconds / batch_seconds:10.1f}x")
+        print(f"Result agreement:  {agreement:10.1%}")
+    finally:
+        shutil.rmtree(persist_directory, ignore_errors=True)
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
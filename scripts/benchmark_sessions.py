@@ -0,0 +1,65 @@
+"""
+Benchmark Session Compression
+
+Compares prompt tokens per turn when a conversation re-sends its full
+history against SessionManager's rolling summary, using the offline fake
+provider so no API key is needed.
+
+Usage:
+    python scripts/benchmark_sessions.py --turns 40 --history-budget 1000
+"""
+
+import sys
+import os
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.llm_handler import LLMHandler
+from core.session import SessionManager
+
+ANSWER = ("Decorators wrap a function in another function. The wrapper receives the "
+          "original callable, adds behaviour before or after calling it, and is bound "
+          "to the original name. functools.wraps keeps the metadata intact. ")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--turns', type=int, default=40)
+    parser.add_argument('--history-budget', type=int, default=1000)
+    parser.add_argument('--summary-budget', type=int, default=250)
+    parser.add_argument('--answer-repeats', type=int, default=6)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("CodeMentor - Session Compression Benchmark")
+    print("=" * 60)
+
+    llm_handler = LLMHandler(provider='fake')
+    sessions = SessionManager(llm_handler, history_token_budget=args.history_budget,
+                              summary_token_budget=args.summary_budget)
+    session = sessions.get_session("benchmark")
+    full_history = []
+
+    def prompt_tokens(messages):
+        return sum(llm_handler.count_tokens(m['content']) for m in messages)
+
+    print(f"\n{'turn':>5} {'full history':>13} {'compressed':>11}")
+    for turn in range(1, args.turns + 1):
+        question = f"Follow-up {turn}: how would decorators handle case {turn}?"
+        full = full_history + [{"role": "user", "content": question}]
+        compressed = sessions.build_messages(session, question)
+        if turn == 1 or turn % 5 == 0:
+            print(f"{turn:5d} {prompt_tokens(full):13d} {prompt_tokens(compressed):11d}")
+
+        answer = ANSWER * args.answer_repeats
+        full_history += [{"role": "user", "content": question}, {"role": "assistant", "content": answer}]
+        sessions.record_turn(session, question, answer)
+        # Summaries run in the background; wait so every turn sees the compacted history
+        sessions.flush()
+
+    print(f"\nSession stats: {sessions.get_stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,90 @@
+"""
+Benchmark Cold Start
+
+Measures, in a fresh interpreter per run, how long it takes to import the
+core modules, construct a RAGEngine and answer the first query, plus the
+peak RSS. Compares lazy loading (default) with background pre-warming.
+
+Usage:
+    python scripts/benchmark_startup.py --runs 3
+"""
+
+import sys
+import os
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs inside a child interpreter so every measurement starts cold
+CHILD = r"""
+import sys, time, json, resource
+sys.path.insert(0, sys.argv[1])
+persist_directory, prewarm = sys.argv[2], sys.argv[3] == "1"
+
+start = time.perf_counter()
+from core.rag_engine import RAGEngine
+from core.llm_handler import LLMHandler
+imported = time.perf_counter()
+
+rag_engine = RAGEngine(collection_name="bench", persist_directory=persist_directory,
+                       embedding_cache_dir=None, prewarm=prewarm)
+constructed = time.perf_counter()
+
+# Simulate the user reading the page before asking the first question
+time.sleep(float(sys.argv[4]))
+before_query = time.perf_counter()
+rag_engine.retrieve("How do I define a function in Python?", n_results=3)
+first_query = time.perf_counter()
+
+print(json.dumps({
+    'import_s': imported - start,
+    'construct_s': constructed - imported,
+    'first_query_s': first_query - before_query,
+    'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+}))
+"""
+
+
+def run_once(persist_directory: str, prewarm: bool, idle: float) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD, ROOT, persist_directory, "1" if prewarm else "0", str(idle)],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--idle', type=float, default=2.0,
+                        help="Seconds between construction and the first query")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("CodeMentor - Cold Start Benchmark")
+    print("=" * 60)
+
+    persist_directory = tempfile.mkdtemp(prefix="codementor_bench_")
+    try:
+        # Create the collection once so every run opens an existing store
+        run_once(persist_directory, prewarm=False, idle=0.0)
+
+        for label, prewarm in (("lazy", False), ("prewarm", True)):
+            runs = [run_once(persist_directory, prewarm, args.idle) for _ in range(args.runs)]
+            print(f"\n{label} ({args.runs} runs, median):")
+            for field in ('import_s', 'construct_s', 'first_query_s'):
+                print(f"  {field:14s} {statistics.median(r[field] for r in runs):8.3f}s")
+            print(f"  {'peak_rss_mb':14s} {statistics.median(r['peak_rss_mb'] for r in runs):8.1f}")
+    finally:
+        shutil.rmtree(persist_directory, ignore_errors=True)
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,150 @@
+"""
+Benchmark Vector Index Backends
+
+Builds the ChromaDB and quantized backends over the same synthetic
+embeddings, then queries each one from a fresh process and reports
+peak RSS, recall@k against exact float32 search, and queries/s for
+one-at-a-time and batched queries (Linux only, RSS is read from /proc).
+
+Usage:
+    python scripts/benchmark_vector_index.py --chunks 100000 --queries 500
+"""
+
+import sys
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from core.rag_engine import RAGEngine
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs inside a child interpreter so RSS only reflects one backend
+CHILD = r"""
+import sys, time, json
+import numpy as np
+sys.path.insert(0, sys.argv[1])
+from core.rag_engine import RAGEngine
+
+persist_directory, backend, k = sys.argv[2], sys.argv[3], int(sys.argv[4])
+queries = np.load(f"{persist_directory}/queries.npy")
+truth = np.load(f"{persist_directory}/truth.npy")
+
+collection = RAGEngine(collection_name="bench", persist_directory=persist_directory,
+                       embedding_cache_dir=None, index_backend=backend, read_only=True).collection
+collection.query(query_embeddings=queries[:1].tolist(), n_results=k)
+
+start = time.perf_counter()
+found = []
+for query in queries:
+    found.extend(collection.query(query_embeddings=[query.tolist()], n_results=k)['ids'])
+seconds = time.perf_counter() - start
+
+start = time.perf_counter()
+collection.query(query_embeddings=queries.tolist(), n_results=k)
+batch_seconds = time.perf_counter() - start
+
+# ru_maxrss survives exec on Linux (it would report the parent's peak), so read VmHWM
+with open("/proc/self/status") as f:
+    peak_kb = next(int(line.split()[1]) for line in f if line.startswith("VmHWM"))
+
+recall = np.mean([
+    len({int(doc_id[4:]) for doc_id in ids} & set(expected.tolist())) / k
+    for ids, expected in zip(found, truth)
+])
+print(json.dumps({
+    'qps': len(queries) / seconds,
+    'batch_qps': len(queries) / batch_seconds,
+    'recall': float(recall),
+    'peak_rss_mb': peak_kb / 1024.0
+}))
+"""
+
+
+def make_embeddings(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    """Clustered unit vectors, closer to real sentence embeddings than uniform noise"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(n // 200, 1), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), n)] + 0.5 * rng.normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    top = []
+    for i in range(0, len(queries), 64):
+        distances = -2 * queries[i:i + 64] @ vectors.T + (vectors ** 2).sum(axis=1)[None, :]
+        top.append(np.argsort(distances, axis=1)[:, :k])
+    return np.vstack(top)
+
+
+def directory_size_mb(path: str) -> float:
+    return sum(
+        os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names
+    ) / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--chunks', type=int, default=50000)
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("CodeMentor - Vector Index Backend Benchmark")
+    print("=" * 60)
+
+    vectors = make_embeddings(args.chunks + args.queries, args.dim)
+    vectors, queries = vectors[:args.chunks], vectors[args.chunks:]
+    ids = [f"vec_{i}" for i in range(args.chunks)]
+
+    persist_directory = tempfile.mkdtemp(prefix="codementor_bench_")
+    try:
+        np.save(os.path.join(persist_directory, "queries.npy"), queries)
+        np.save(os.path.join(persist_directory, "truth.npy"), exact_top_k(vectors, queries, args.k))
+
+        for backend in RAGEngine.INDEX_BACKENDS:
+            collection = RAGEngine(collection_name="bench", persist_directory=persist_directory,
+                                   embedding_cache_dir=None, index_backend=backend).collection
+            start = time.perf_counter()
+            for i in range(0, args.chunks, args.batch_size):
+                collection.upsert(
+                    ids=ids[i:i + args.batch_size],
+                    embeddings=vectors[i:i + args.batch_size].tolist(),
+                    documents=[f"chunk {j}" for j in range(i, min(i + args.batch_size, args.chunks))],
+                    metadatas=[{'language': 'Python'}] * len(ids[i:i + args.batch_size])
+                )
+            print(f"Built {backend} index in {time.perf_counter() - start:.1f}s")
+
+        print(f"\n{'backend':>10} {'disk MB':>9} {'peak RSS MB':>12} "
+              f"{'recall@' + str(args.k):>10} {'QPS':>9} {'batch QPS':>10}")
+        for backend in RAGEngine.INDEX_BACKENDS:
+            output = subprocess.run(
+                [sys.executable, "-c", CHILD, ROOT, persist_directory, backend, str(args.k)],
+                capture_output=True, text=True, check=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            if backend == 'quantized':
+                disk = directory_size_mb(os.path.join(persist_directory, "bench_quantized"))
+            else:
+                disk = directory_size_mb(persist_directory) - directory_size_mb(
+                    os.path.join(persist_directory, "bench_quantized"))
+            print(f"{backend:>10} {disk:9.1f} {result['peak_rss_mb']:12.1f} "
+                  f"{result['recall']:10.3f} {result['qps']:9.1f} {result['batch_qps']:10.1f}")
+    finally:
+        shutil.rmtree(persist_directory, ignore_errors=True)
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
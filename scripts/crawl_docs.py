@@ -0,0 +1,88 @@
+"""
+Crawl Documentation Script
+
+Harvests a documentation site (live, or from a local HTML mirror) and
+streams the cleaned sections into the vector database. Re-running only
+re-ingests pages whose ETag / Last-Modified or content changed.
+
+Usage:
+    python scripts/crawl_docs.py https://docs.python.org/3/tutorial/index.html --language Python
+    python scripts/crawl_docs.py https://docs.python.org/3/index.html \\
+        --mirror ./mirrors/python-docs --language Python
+"""
+
+import sys
+import os
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.rag_engine import RAGEngine
+from core.ingestion import IngestionPipeline
+from utils.web_scraper import DocCrawler, HTTPFetcher, LocalMirrorFetcher, crawl_into_rag
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('start_urls', nargs='+', help="Pages to start crawling from")
+    parser.add_argument('--mirror', default=None,
+                        help="Serve URLs from this local mirror directory instead of the network")
+    parser.add_argument('--allow', nargs='*', default=None,
+                        help="URL prefixes to follow (default: directory of each start URL)")
+    parser.add_argument('--max-pages', type=int, default=1000)
+    parser.add_argument('--fetch-workers', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=2.0, help="Requests per second per host")
+    parser.add_argument('--cache-path', default="./data/cache/crawl.sqlite3")
+    parser.add_argument('--collection', default="programming_docs")
+    parser.add_argument('--persist-directory', default="./data/vector_db")
+    parser.add_argument('--index-backend', default="chroma", choices=RAGEngine.INDEX_BACKENDS)
+    parser.add_argument('--workers', type=int, default=None, help="Chunking processes (0 = in-process)")
+    parser.add_argument('--language', default=None, help="'language' metadata for every section")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("CodeMentor - Documentation Crawl")
+    print("=" * 60)
+
+    if args.mirror:
+        base_url = args.start_urls[0].rsplit('/', 1)[0] + '/'
+        fetcher = LocalMirrorFetcher(args.mirror, base_url)
+    else:
+        fetcher = HTTPFetcher(pool_size=args.fetch_workers)
+
+    crawler = DocCrawler(
+        args.start_urls,
+        fetcher=fetcher,
+        allowed_prefixes=args.allow,
+        max_pages=args.max_pages,
+        max_workers=args.fetch_workers,
+        requests_per_second=0 if args.mirror else args.rate,
+        cache_path=args.cache_path,
+        metadata={'language': args.language} if args.language else None
+    )
+
+    try:
+        rag_engine = RAGEngine(collection_name=args.collection,
+                               persist_directory=args.persist_directory,
+                               index_backend=args.index_backend,
+                               prewarm=True)
+        pipeline = IngestionPipeline(rag_engine, workers=args.workers)
+        stats = crawl_into_rag(crawler, pipeline)
+
+        crawl = stats['crawl']
+        print()
+        print(f"✅ Pages: {crawl['fetched']} changed, {crawl['unchanged']} unchanged, {crawl['failed']} failed")
+        print(f"✅ Sections: {crawl['sections']} -> {stats['chunks']} chunks "
+              f"({stats['embedded_chunks']} embedded, {stats['existing_chunks']} already stored)")
+        print(f"Collection now holds {rag_engine.collection.count()} chunks")
+    except KeyboardInterrupt:
+        print("\nInterrupted - unchanged pages are skipped on the next run")
+        return 130
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,82 @@
+"""
+Ingest Documentation Script
+
+Bulk-loads directory trees of Markdown / HTML / rst / text files, or JSONL
+files of {"text": ..., "metadata": {...}} records, into the vector database.
+Parsing and chunking run in a process pool, embedding batches adapt to the
+measured throughput, and vector-store writes overlap with embedding.
+Progress is checkpointed, so re-running after an interruption resumes.
+
+Usage:
+    python scripts/ingest_docs.py data/documentation --language Python
+    python scripts/ingest_docs.py dump.jsonl --workers 8 --max-tokens 384
+"""
+
+import sys
+import os
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.rag_engine import RAGEngine
+from core.ingestion import IngestionPipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+', help="Files or directories to ingest")
+    parser.add_argument('--collection', default="programming_docs")
+    parser.add_argument('--persist-directory', default="./data/vector_db")
+    parser.add_argument('--index-backend', default="chroma", choices=RAGEngine.INDEX_BACKENDS)
+    parser.add_argument('--workers', type=int, default=None, help="Parser processes (0 = in-process)")
+    parser.add_argument('--max-tokens', type=int, default=256)
+    parser.add_argument('--overlap-tokens', type=int, default=32)
+    parser.add_argument('--queue-size', type=int, default=4)
+    parser.add_argument('--initial-batch-size', type=int, default=64)
+    parser.add_argument('--max-batch-size', type=int, default=1024)
+    parser.add_argument('--language', default=None, help="Default 'language' metadata")
+    parser.add_argument('--doc-type', default=None, help="Default 'type' metadata")
+    parser.add_argument('--restart', action='store_true', help="Ignore the checkpoint and re-read everything")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("CodeMentor - Documentation Ingestion")
+    print("=" * 60)
+
+    try:
+        rag_engine = RAGEngine(collection_name=args.collection,
+                               persist_directory=args.persist_directory,
+                               index_backend=args.index_backend,
+                               prewarm=True)
+        pipeline = IngestionPipeline(
+            rag_engine,
+            workers=args.workers,
+            chunker_options={'max_tokens': args.max_tokens, 'overlap_tokens': args.overlap_tokens},
+            queue_size=args.queue_size,
+            initial_batch_size=args.initial_batch_size,
+            max_batch_size=args.max_batch_size
+        )
+        if args.restart:
+            pipeline.reset_checkpoint()
+
+        defaults = {'language': args.language, 'type': args.doc_type}
+        stats = pipeline.run(args.paths, defaults={k: v for k, v in defaults.items() if v})
+
+        print()
+        print(f"✅ Sources: {stats['sources']} processed, {stats['skipped_sources']} already done")
+        print(f"✅ Docs: {stats['docs']} ({stats['docs_per_sec']:.1f}/s)")
+        print(f"✅ Chunks: {stats['chunks']} ({stats['chunks_per_sec']:.1f}/s), "
+              f"{stats['embedded_chunks']} embedded, {stats['existing_chunks']} already stored")
+        print(f"✅ Final embedding batch size: {stats['final_batch_size']}")
+        print(f"Collection now holds {rag_engine.collection.count()} chunks")
+    except KeyboardInterrupt:
+        print("\nInterrupted - progress is checkpointed, re-run to resume")
+        return 130
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -6,7 +6,8 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from core.rag_engine import RAGEngine, DocumentChunker
+from core.rag_engine import RAGEngine
+from core.chunker import StructuredChunker
 
 def load_sample_documents():
     """Load sample programming documentation"""
@@ -106,27 +107,19 @@ def main():
         print()
         
         print("Step 3: Processing documents...")
-        chunker = DocumentChunker()
-        processed_docs = []
-        
-        for doc in documents:
-            if len(doc['text']) > 1000:
-                chunks = chunker.chunk_by_paragraphs(doc['text'], max_length=800)
-                for i, chunk in enumerate(chunks):
-                    processed_doc = {
-                        'text': chunk,
-                        'metadata': {**doc['metadata'], 'chunk': i + 1}
-                    }
-                    processed_docs.append(processed_doc)
-            else:
-                processed_docs.append(doc)
+        chunker = StructuredChunker(max_tokens=256, overlap_tokens=32)
+        processed_docs = [chunk for doc in documents for chunk in chunker.chunk_document(doc)]
         
         print(f"✅ Processed into {len(processed_docs)} document chunks")
         print()
         
-        print("Step 4: Adding documents to vector database...")
-        rag_engine.add_documents(processed_docs)
-        print("✅ Documents added successfully")
+        print("Step 4: Syncing documents with vector database...")
+        sync_stats = rag_engine.ingest_corpus(processed_docs)
+        print(f"✅ Sources: {sync_stats['changed_sources']} new/changed, "
+              f"{sync_stats['unchanged_sources']} unchanged, "
+              f"{sync_stats['removed_sources']} removed")
+        print(f"✅ Chunks: {sync_stats['added_chunks']} embedded, "
+              f"{sync_stats['deleted_chunks']} deleted")
         print()
         
         print("Step 5: Database statistics...")
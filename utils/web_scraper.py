@@ -0,0 +1,432 @@
+"""
+Web Scraper - Concurrent documentation crawler feeding the ingestion pipeline
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from email.utils import formatdate
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+from urllib.parse import urljoin, urldefrag, urlparse
+
+from bs4 import BeautifulSoup
+
+# Elements that never hold documentation content
+BOILERPLATE_TAGS = ['script', 'style', 'noscript', 'nav', 'header', 'footer', 'aside', 'form',
+                    'button', 'iframe', 'svg']
+# class/id fragments of navigation, sidebars, banners and similar chrome
+BOILERPLATE_PATTERN = re.compile(
+    r"(^|[\s_-])(nav|navbar|menu|sidebar|sphinxsidebar|footer|header|breadcrumbs?|toc|"
+    r"related|cookie|banner|advert|ads|social|share|skip|headerlink|edit-?page)([\s_-]|$)",
+    re.IGNORECASE
+)
+SECTION_HEADINGS = ['h1', 'h2', 'h3']
+
+
+class FetchResult:
+    """Outcome of one fetch: status 200 (text set), 304 (unchanged) or an error status"""
+
+    def __init__(self, url: str, status: int, text: str = "", etag: Optional[str] = None,
+                 last_modified: Optional[str] = None, content_type: str = "text/html"):
+        self.url = url
+        self.status = status
+        self.text = text
+        self.etag = etag
+        self.last_modified = last_modified
+        self.content_type = content_type
+
+
+class Fetcher:
+    """Fetches a URL, honouring conditional request headers"""
+
+    def fetch(self, url: str, etag: Optional[str] = None,
+              last_modified: Optional[str] = None) -> FetchResult:
+        raise NotImplementedError
+
+    def close(self):
+        """Release pooled connections"""
+
+
+class HTTPFetcher(Fetcher):
+    """requests-based fetcher with a pooled, retrying session"""
+
+    def __init__(self, pool_size: int = 16, timeout: float = 15.0, max_retries: int = 3,
+                 user_agent: str = "CodeMentor-DocCrawler/1.0"):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = user_agent
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=Retry(total=max_retries, backoff_factor=0.5,
+                              status_forcelist=[429, 500, 502, 503, 504])
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def fetch(self, url, etag=None, last_modified=None):
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+        return FetchResult(
+            url=response.url,
+            status=response.status_code,
+            text=response.text if response.status_code == 200 else "",
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified'),
+            content_type=response.headers.get('Content-Type', '')
+        )
+
+    def close(self):
+        self.session.close()
+
+
+class LocalMirrorFetcher(Fetcher):
+    """
+    Serves URLs under base_url from a local HTML mirror (e.g. a wget or
+    Sphinx build directory); file mtimes stand in for Last-Modified.
+    """
+
+    def __init__(self, root: str, base_url: str):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url if base_url.endswith('/') else base_url + '/'
+
+    def _path_for(self, url: str) -> Optional[str]:
+        if not url.startswith(self.base_url):
+            return None
+        relative = urlparse(url).path[len(urlparse(self.base_url).path):]
+        path = os.path.normpath(os.path.join(self.root, relative))
+        if not path.startswith(self.root):
+            return None
+        if os.path.isdir(path):
+            path = os.path.join(path, "index.html")
+        return path
+
+    def fetch(self, url, etag=None, last_modified=None):
+        path = self._path_for(url)
+        if path is None or not os.path.isfile(path):
+            return FetchResult(url, 404)
+        stat = os.stat(path)
+        modified = formatdate(stat.st_mtime, usegmt=True)
+        if last_modified == modified:
+            return FetchResult(url, 304, last_modified=modified)
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return FetchResult(url, 200, f.read(), last_modified=modified)
+
+
+class HostRateLimiter:
+    """Spaces out requests to each host to at most requests_per_second"""
+
+    def __init__(self, requests_per_second: float = 2.0):
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, url: str):
+        if not self.interval:
+            return
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class CrawlCache:
+    """Persistent ETag / Last-Modified / content hash and outlinks per URL"""
+
+    def __init__(self, cache_path: str = "./data/cache/crawl.sqlite3"):
+        directory = os.path.dirname(cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT,
+                links TEXT,
+                fetched_at REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+
+    def get(self, url: str) -> Tuple[Optional[str], Optional[str], Optional[str], List[str]]:
+        """(etag, last_modified, content_hash, links) recorded for url"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, content_hash, links FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        if not row:
+            return None, None, None, []
+        return row[0], row[1], row[2], json.loads(row[3] or "[]")
+
+    def put(self, url: str, etag: Optional[str], last_modified: Optional[str],
+            content_hash: str, links: List[str]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, etag, last_modified, content_hash, links, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, content_hash, json.dumps(links), time.time())
+            )
+            self._conn.commit()
+
+
+def _is_boilerplate(tag) -> bool:
+    if tag.attrs is None:
+        return False
+    names = " ".join(tag.get('class', [])) + " " + (tag.get('id') or "") + " " + (tag.get('role') or "")
+    return bool(BOILERPLATE_PATTERN.search(names)) or tag.get('role') in ('navigation', 'banner', 'contentinfo')
+
+
+def extract_links(soup: BeautifulSoup, page_url: str) -> List[str]:
+    """Absolute, fragment-free link targets of a page"""
+    links = []
+    for anchor in soup.find_all('a', href=True):
+        url, _ = urldefrag(urljoin(page_url, anchor['href']))
+        if urlparse(url).scheme in ('http', 'https'):
+            links.append(url)
+    return links
+
+
+def extract_sections(soup: BeautifulSoup, page_url: str) -> List[Dict[str, Any]]:
+    """
+    Strip boilerplate and split the main content into heading sections
+
+    Returns:
+        {'text', 'metadata'} per section; headings are kept as Markdown
+        headings and <pre> blocks as fenced code so the chunker sees structure
+    """
+    title = soup.title.get_text(" ", strip=True) if soup.title else page_url
+
+    for tag in soup(BOILERPLATE_TAGS):
+        tag.decompose()
+    for tag in soup.find_all(_is_boilerplate):
+        if tag.name not in ('html', 'body'):
+            tag.decompose()
+
+    main = soup.find('main') or soup.find('article') or soup.find(attrs={'role': 'main'}) or soup.body or soup
+    for pre in main.find_all('pre'):
+        pre.replace_with(f"\n\n```\n{pre.get_text().rstrip()}\n```\n\n")
+    for level, name in enumerate(SECTION_HEADINGS, start=1):
+        for heading in main.find_all(name):
+            heading.replace_with(f"\n\n\x00{'#' * level} {heading.get_text(' ', strip=True)}\n\n")
+
+    text = re.sub(r"\n{3,}", "\n\n", main.get_text())
+    sections = []
+    for part in text.split("\x00"):
+        part = part.strip()
+        if len(part) < 40:
+            continue
+        first_line = part.split("\n", 1)[0]
+        section = first_line.lstrip('#').strip() if first_line.startswith('#') else title
+        sections.append({
+            'text': part,
+            'metadata': {'title': title, 'section': section, 'source': page_url, 'url': page_url,
+                         'type': 'documentation'}
+        })
+    return sections
+
+
+class DocCrawler:
+    """
+    Concurrent documentation harvester.
+
+    Pages are fetched by a thread pool through a pluggable Fetcher (pooled
+    HTTP session or a local mirror), with a per-host rate limit and
+    conditional requests: pages whose ETag / Last-Modified or content hash
+    are unchanged since the last crawl are not re-emitted. Cleaned sections
+    are yielded as pages complete, so the whole site is never held in
+    memory and can be streamed straight into IngestionPipeline.
+    """
+
+    def __init__(self,
+                 start_urls: List[str],
+                 fetcher: Optional[Fetcher] = None,
+                 allowed_prefixes: Optional[List[str]] = None,
+                 max_pages: int = 1000,
+                 max_workers: int = 8,
+                 requests_per_second: float = 2.0,
+                 cache_path: Optional[str] = "./data/cache/crawl.sqlite3",
+                 metadata: Optional[Dict[str, Any]] = None):
+        """
+        Initialize Doc Crawler
+
+        Args:
+            start_urls: Pages to start from
+            fetcher: Page fetcher (default: HTTPFetcher)
+            allowed_prefixes: Only follow links starting with one of these
+                (default: the directory of each start URL)
+            max_pages: Stop after this many fetched pages
+            max_workers: Concurrent fetches
+            requests_per_second: Per-host request rate
+            cache_path: Conditional-fetch cache (None disables it)
+            metadata: Extra metadata for every section (e.g. {'language': 'Python'})
+        """
+        self.start_urls = start_urls
+        self.fetcher = fetcher or HTTPFetcher(pool_size=max_workers)
+        self.allowed_prefixes = allowed_prefixes or [url.rsplit('/', 1)[0] + '/' for url in start_urls]
+        self.max_pages = max_pages
+        self.max_workers = max_workers
+        self.rate_limiter = HostRateLimiter(requests_per_second)
+        self.cache = CrawlCache(cache_path) if cache_path else None
+        self.metadata = metadata or {}
+
+        # Cache entries of yielded pages waiting for mark_stored()
+        self._unconfirmed: Dict[int, str] = {}
+        self._pending_pages: Dict[str, List[Any]] = {}
+        self._confirm_lock = threading.Lock()
+
+        self.stats = {'fetched': 0, 'unchanged': 0, 'failed': 0, 'sections': 0}
+
+    def _allowed(self, url: str) -> bool:
+        return any(url.startswith(prefix) for prefix in self.allowed_prefixes)
+
+    def _visit(self, url: str) -> Tuple[str, List[Dict[str, Any]], List[str], Optional[tuple]]:
+        """
+        Fetch and parse one page (runs on a worker thread)
+
+        Returns:
+            (status, sections, links, cache entry to record)
+        """
+        etag, last_modified, previous_hash, known_links = (
+            self.cache.get(url) if self.cache else (None, None, None, [])
+        )
+        self.rate_limiter.acquire(url)
+        result = self.fetcher.fetch(url, etag=etag, last_modified=last_modified)
+
+        if result.status == 304:
+            # Still follow the links seen last time so changed pages deeper
+            # in the site are reached
+            return 'unchanged', [], [link for link in known_links if self._allowed(link)], None
+        if result.status != 200 or 'html' not in (result.content_type or 'html'):
+            return 'failed', [], [], None
+
+        soup = BeautifulSoup(result.text, 'html.parser')
+        links = [link for link in extract_links(soup, result.url) if self._allowed(link)]
+        content_hash = hashlib.sha256(result.text.encode('utf-8')).hexdigest()
+        entry = (url, result.etag, result.last_modified, content_hash, links)
+        if content_hash == previous_hash:
+            return 'unchanged', [], links, entry
+
+        sections = extract_sections(soup, result.url)
+        for section in sections:
+            section['metadata'].update(self.metadata)
+        return 'fetched', sections, links, entry
+
+    def crawl(self, confirm_writes: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Crawl from the start URLs and yield cleaned sections as they arrive
+
+        Unchanged pages (304, or an identical body) yield nothing but their
+        links are still followed, using the links cached from the previous
+        crawl on a 304.
+
+        Args:
+            confirm_writes: Record a page's validators only once the consumer
+                has passed every one of its sections to mark_stored(), so a
+                page that never reached the store is fetched again next
+                crawl. Otherwise they are recorded as soon as the page's
+                sections have been yielded.
+        """
+        seen: Set[str] = set()
+        frontier: List[str] = []
+        for url in self.start_urls:
+            url, _ = urldefrag(url)
+            if url not in seen:
+                seen.add(url)
+                frontier.append(url)
+
+        scheduled = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="crawler") as pool:
+            pending = {}
+            while frontier or pending:
+                while frontier and len(pending) < self.max_workers * 2 and scheduled < self.max_pages:
+                    url = frontier.pop(0)
+                    pending[pool.submit(self._visit, url)] = url
+                    scheduled += 1
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = pending.pop(future)
+                    try:
+                        status, sections, links, entry = future.result()
+                    except Exception as e:
+                        print(f"Error fetching {url}: {str(e)}")
+                        self.stats['failed'] += 1
+                        continue
+
+                    self.stats[status] += 1
+                    for link in links:
+                        if link not in seen:
+                            seen.add(link)
+                            frontier.append(link)
+
+                    confirm = bool(entry and self.cache and confirm_writes and sections)
+                    if confirm:
+                        with self._confirm_lock:
+                            self._pending_pages[url] = [len(sections), entry]
+                            for section in sections:
+                                self._unconfirmed[id(section)] = url
+                    for section in sections:
+                        self.stats['sections'] += 1
+                        yield section
+                    if entry and self.cache and not confirm:
+                        self.cache.put(*entry)
+
+    def mark_stored(self, sections: List[Dict[str, Any]]):
+        """Confirm yielded sections were stored (see crawl(confirm_writes=True))"""
+        entries = []
+        with self._confirm_lock:
+            for section in sections:
+                url = self._unconfirmed.pop(id(section), None)
+                if url is None:
+                    continue
+                page = self._pending_pages[url]
+                page[0] -= 1
+                if page[0] == 0:
+                    entries.append(self._pending_pages.pop(url)[1])
+        for entry in entries:
+            self.cache.put(*entry)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats)
+
+    def close(self):
+        self.fetcher.close()
+
+
+def crawl_into_rag(crawler: DocCrawler, pipeline, source: str = "crawl") -> Dict[str, Any]:
+    """
+    Stream a crawl straight into an IngestionPipeline
+
+    The crawl cache already makes re-crawls incremental, so the pipeline's
+    positional checkpoint is not used here. A page is marked as crawled only
+    after the pipeline has written all of its sections, so pages lost to an
+    interrupted or failed run are fetched again.
+    """
+    try:
+        stats = pipeline.ingest_documents(crawler.crawl(confirm_writes=True), source=source,
+                                          resume=False, on_stored=crawler.mark_stored)
+    finally:
+        crawler.close()
+    stats['crawl'] = crawler.get_stats()
+    return stats